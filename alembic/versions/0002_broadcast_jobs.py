@@ -0,0 +1,49 @@
+"""Broadcast jobs with progress cursor
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Таблица рассылок с курсором прогресса (last_user_id)."""
+    op.create_table(
+        'broadcast_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('admin_id', sa.Integer(), nullable=False),
+        sa.Column(
+            'status',
+            sa.Enum('QUEUED', 'RUNNING', 'PAUSED', 'COMPLETED', 'CANCELLED', name='broadcaststatus'),
+            nullable=False
+        ),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.Column('photo_id', sa.Text(), nullable=True),
+        sa.Column('buttons', sa.Text(), nullable=False),
+        sa.Column('last_user_id', sa.Integer(), nullable=False),
+        sa.Column('sent_count', sa.Integer(), nullable=False),
+        sa.Column('failed_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_broadcast_jobs_status'), 'broadcast_jobs', ['status'])
+
+
+def downgrade() -> None:
+    """Откат миграции - удаление таблицы рассылок."""
+    op.drop_index(op.f('ix_broadcast_jobs_status'), table_name='broadcast_jobs')
+    op.drop_table('broadcast_jobs')
@@ -0,0 +1,41 @@
+"""Track unreachable users
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Флаг доставляемости пользователя.
+
+    Заблокировавшие бота и удалённые аккаунты помечаются is_reachable = 0
+    и исключаются из рассылок по индексу (is_reachable, id).
+    """
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('is_reachable', sa.Boolean(), server_default=sa.true(), nullable=False))
+        batch_op.add_column(sa.Column('unreachable_since', sa.DateTime(), nullable=True))
+
+    op.create_index('idx_users_reachable_id', 'users', ['is_reachable', 'id'])
+
+
+def downgrade() -> None:
+    """Откат миграции - удаление флага доставляемости."""
+    op.drop_index('idx_users_reachable_id', table_name='users')
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('unreachable_since')
+        batch_op.drop_column('is_reachable')
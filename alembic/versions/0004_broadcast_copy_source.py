@@ -0,0 +1,32 @@
+"""Broadcast copy mode source message
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Исходное сообщение админа для рассылки через copy_message."""
+    with op.batch_alter_table('broadcast_jobs') as batch_op:
+        batch_op.add_column(sa.Column('source_chat_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('source_message_ids', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Откат миграции - удаление полей исходного сообщения."""
+    with op.batch_alter_table('broadcast_jobs') as batch_op:
+        batch_op.drop_column('source_message_ids')
+        batch_op.drop_column('source_chat_id')
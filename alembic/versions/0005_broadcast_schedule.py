@@ -0,0 +1,38 @@
+"""Scheduled broadcasts
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Время запуска отложенных рассылок и статус SCHEDULED."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("ALTER TYPE broadcaststatus ADD VALUE IF NOT EXISTS 'SCHEDULED'")
+
+    with op.batch_alter_table('broadcast_jobs') as batch_op:
+        batch_op.add_column(sa.Column('scheduled_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('idx_broadcast_jobs_schedule', ['status', 'scheduled_at'])
+
+
+def downgrade() -> None:
+    """Откат миграции - удаление времени запуска."""
+    # Незапущенные отложенные рассылки без времени запуска теряют смысл
+    op.execute("UPDATE broadcast_jobs SET status = 'CANCELLED' WHERE status = 'SCHEDULED'")
+
+    with op.batch_alter_table('broadcast_jobs') as batch_op:
+        batch_op.drop_index('idx_broadcast_jobs_schedule')
+        batch_op.drop_column('scheduled_at')
@@ -0,0 +1,40 @@
+"""Broadcast delivery log
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Журнал доставки рассылок (по строке на получателя)."""
+    op.create_table(
+        'broadcast_deliveries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('job_id', sa.Integer(), nullable=False),
+        sa.Column('chat_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.Enum('SENT', 'FAILED', name='deliverystatus'), nullable=False),
+        sa.Column('error_code', sa.Integer(), nullable=True),
+        sa.Column('latency_ms', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_deliveries_job_status', 'broadcast_deliveries', ['job_id', 'status'])
+
+
+def downgrade() -> None:
+    """Откат миграции - удаление журнала доставки."""
+    op.drop_index('idx_deliveries_job_status', table_name='broadcast_deliveries')
+    op.drop_table('broadcast_deliveries')
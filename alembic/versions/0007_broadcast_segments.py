@@ -0,0 +1,85 @@
+"""Broadcast audience segments
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_CHUNK = 1000
+
+
+def _backfill_registered_at() -> None:
+    """Заполнить registered_at из строки registration_date (DD.MM.YYYY)."""
+    bind = op.get_bind()
+    users = sa.table(
+        'users',
+        sa.column('id', sa.Integer),
+        sa.column('registration_date', sa.String),
+        sa.column('registered_at', sa.DateTime),
+    )
+
+    rows = bind.execute(sa.select(users.c.id, users.c.registration_date)).all()
+    updates = []
+    for user_id, raw in rows:
+        try:
+            updates.append({"user_id": user_id, "value": datetime.strptime(raw, "%d.%m.%Y")})
+        except (TypeError, ValueError):
+            continue
+
+    stmt = (
+        users.update()
+        .where(users.c.id == sa.bindparam("user_id"))
+        .values(registered_at=sa.bindparam("value"))
+    )
+    for start in range(0, len(updates), BACKFILL_CHUNK):
+        bind.execute(stmt, updates[start:start + BACKFILL_CHUNK])
+
+
+def upgrade() -> None:
+    """
+    Сегменты аудитории рассылок.
+
+    - users.registered_at: дата регистрации как DateTime для диапазонов по индексу
+    - broadcast_jobs.segment: JSON фильтра получателей
+    - индексы под EXISTS-подзапросы сегментов
+    """
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('registered_at', sa.DateTime(), nullable=True))
+
+    _backfill_registered_at()
+    op.create_index('idx_users_registered_at', 'users', ['registered_at'])
+
+    with op.batch_alter_table('broadcast_jobs') as batch_op:
+        batch_op.add_column(sa.Column('segment', sa.Text(), nullable=True))
+
+    op.create_index('idx_requests_user_status', 'pending_requests', ['user_id', 'status'])
+    op.create_index('idx_captcha_user_success', 'captcha_attempts', ['user_id', 'is_successful'])
+    op.create_index('idx_deliveries_chat_job', 'broadcast_deliveries', ['chat_id', 'job_id'])
+
+
+def downgrade() -> None:
+    """Откат миграции - удаление сегментов."""
+    op.drop_index('idx_deliveries_chat_job', table_name='broadcast_deliveries')
+    op.drop_index('idx_captcha_user_success', table_name='captcha_attempts')
+    op.drop_index('idx_requests_user_status', table_name='pending_requests')
+
+    with op.batch_alter_table('broadcast_jobs') as batch_op:
+        batch_op.drop_column('segment')
+
+    op.drop_index('idx_users_registered_at', table_name='users')
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('registered_at')
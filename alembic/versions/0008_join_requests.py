@@ -0,0 +1,41 @@
+"""Join requests awaiting captcha
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Заявки, ожидающие капчи (вместо словаря в памяти процесса)."""
+    op.create_table(
+        'join_requests',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('chat_id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(length=255), nullable=True),
+        sa.Column('first_name', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_join_requests_user_chat', 'join_requests', ['user_id', 'chat_id'], unique=True)
+    op.create_index('idx_join_requests_created', 'join_requests', ['created_at'])
+
+
+def downgrade() -> None:
+    """Откат миграции - удаление заявок, ожидающих капчи."""
+    op.drop_index('idx_join_requests_created', table_name='join_requests')
+    op.drop_index('idx_join_requests_user_chat', table_name='join_requests')
+    op.drop_table('join_requests')
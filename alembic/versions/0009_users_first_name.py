@@ -0,0 +1,44 @@
+"""Users first name
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Имя пользователя для {name}/{first_name} в рассылках."""
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('first_name', sa.String(length=255), nullable=True))
+
+    # Имена из уже принятых заявок — у старых пользователей они там есть
+    op.execute(
+        """
+        UPDATE users SET first_name = (
+            SELECT pending_requests.first_name FROM pending_requests
+            WHERE pending_requests.user_id = users.chat_id
+              AND pending_requests.first_name IS NOT NULL
+            ORDER BY pending_requests.request_time DESC
+            LIMIT 1
+        )
+        WHERE first_name IS NULL
+        """
+    )
+
+
+def downgrade() -> None:
+    """Откат миграции - удаление имени пользователя."""
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('first_name')
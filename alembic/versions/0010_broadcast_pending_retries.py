@@ -0,0 +1,30 @@
+"""Broadcast pending retries
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Отложенные повторы рассылки сохраняются с чекпоинтом (переживают паузу)."""
+    with op.batch_alter_table('broadcast_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('pending_retries', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Откат миграции - удаление отложенных повторов."""
+    with op.batch_alter_table('broadcast_jobs', schema=None) as batch_op:
+        batch_op.drop_column('pending_retries')
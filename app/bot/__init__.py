@@ -1,10 +1,14 @@
 """Инициализация бота и диспетчера."""
 
+from datetime import timedelta
+from functools import partial
+from typing import Optional
+
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 from aiogram.fsm.storage.redis import RedisStorage
-from redis.asyncio import Redis
+from redis.asyncio import BlockingConnectionPool, Redis
 
 from raito import Raito
 from raito.utils.configuration import RaitoConfiguration
@@ -13,9 +17,19 @@ from raito.plugins.roles.providers.sql.sqlite import SQLiteRoleProvider
 from raito.utils.storages.sql.sqlite import SQLiteStorage as RaitoSQLiteStorage
 
 from app.core import get_config, get_logger
-from app.bot.middlewares import LoggingMiddleware, ThrottlingMiddleware
+from app.bot.middlewares import LoggingMiddleware, ThrottlingMiddleware, AlbumMiddleware
 from app.bot.handlers import main_router
 from app.bot.handlers.admin.commands.welcome import router as welcome_router
+from app.bot.handlers.user.commands.join_requests import expire_captcha
+from app.services.broadcast_service import BroadcastManager
+from app.services.bulk_approve import BulkApprover
+from app.services.captcha_generator import CaptchaPool
+from app.services.captcha_images import CaptchaImageCache
+from app.services.captcha_signer import CaptchaSigner
+from app.services.captcha_store import CaptchaStore
+from app.services.captcha_timeouts import CaptchaTimeouts
+from app.services.join_registry import JoinRequestCleaner
+from app.services.scheduler import BroadcastScheduler
 
 logger = get_logger(__name__)
 
@@ -41,24 +55,68 @@ async def create_dispatcher() -> Dispatcher:
     """Создание диспетчера с Redis storage."""
     config = get_config()
 
-    # Redis для FSM storage
+    # Один клиент Redis на всё приложение: FSM storage, капча и сервисы.
+    # Пул ограничен — при нехватке соединений команда ждёт свободное, а не открывает новое
+    redis: Optional[Redis] = None
     try:
-        redis = Redis.from_url(config.redis_url, decode_responses=True)
+        pool = BlockingConnectionPool.from_url(
+            config.redis_url,
+            max_connections=config.redis_max_connections,
+            timeout=config.redis_socket_timeout,
+            socket_timeout=config.redis_socket_timeout,
+            socket_connect_timeout=config.redis_socket_timeout,
+            health_check_interval=30,
+            decode_responses=True
+        )
+        redis = Redis(connection_pool=pool)
         await redis.ping()
         storage = RedisStorage(redis)
-        logger.info("✅ Redis подключён для FSM storage")
+        logger.info(f"✅ Redis подключён (пул до {config.redis_max_connections} соединений)")
     except Exception as e:
         logger.warning(f"⚠️ Redis недоступен: {e}. Используется MemoryStorage")
+        if redis:
+            await redis.aclose(close_connection_pool=True)
+            redis = None
         from aiogram.fsm.storage.memory import MemoryStorage
         storage = MemoryStorage()
 
     dp = Dispatcher(storage=storage)
+    # Передаётся в хендлеры аргументом redis (None — Redis недоступен)
+    dp["redis"] = redis
+    # Состояние капчи: hash в общем Redis, при его недоступности — память
+    # Stateless-капча: ответ подписан в кнопках, Redis считает только попытки
+    signer = None
+    if config.captcha_stateless:
+        signer = CaptchaSigner(
+            config.captcha_secret or config.bot_token,
+            ttl=config.captcha_timeout_min * 60
+        )
+    captcha_store = CaptchaStore(
+        redis,
+        ttl=config.captcha_timeout_min * 60,
+        max_attempts=config.captcha_max_attempts,
+        memory_max_size=config.captcha_memory_max_size,
+        sweep_interval=config.captcha_memory_sweep_interval,
+        signer=signer
+    )
+    dp["captcha_store"] = captcha_store
+    # file_id загруженных картинок капчи (по хэшу содержимого)
+    dp["captcha_images"] = CaptchaImageCache(redis)
+    # Заранее нарисованные процедурные капчи (запускается в start_bot)
+    dp["captcha_pool"] = CaptchaPool(
+        size=config.captcha_pool_size,
+        low_water=config.captcha_pool_low_water,
+        workers=config.captcha_pool_workers,
+        reuse=config.captcha_image_reuse
+    )
 
     # Регистрируем middlewares
     dp.message.middleware(LoggingMiddleware())
     dp.callback_query.middleware(LoggingMiddleware())
     dp.chat_join_request.middleware(LoggingMiddleware())
 
+    # Альбом собирается до throttling, иначе его части отсекаются как спам
+    dp.message.middleware(AlbumMiddleware())
     dp.message.middleware(ThrottlingMiddleware(rate_limit=0.5))
 
     logger.info("✅ Middlewares зарегистрированы")
@@ -108,6 +166,7 @@ async def setup_raito(bot: Bot, dp: Dispatcher) -> Raito:
 async def start_bot() -> None:
     """Главная функция запуска бота."""
     logger.info("🚀 Запуск бота...")
+    config = get_config()
 
     # Создаём бота и диспетчер
     bot = await create_bot()
@@ -116,6 +175,49 @@ async def start_bot() -> None:
     # Настраиваем Raito
     raito = await setup_raito(bot, dp)
 
+    # Очередь рассылок: продолжает прерванные рестартом с чекпоинта
+    broadcasts = BroadcastManager(bot)
+    dp["broadcasts"] = broadcasts
+    broadcasts.start()
+
+    # Отложенные рассылки: спит до ближайшего времени запуска
+    scheduler = BroadcastScheduler(broadcasts)
+    dp["scheduler"] = scheduler
+    scheduler.start()
+
+    # Массовое одобрение очереди заявок
+    bulk_approver = BulkApprover(
+        bot,
+        concurrency=config.bulk_approve_concurrency,
+        batch_size=config.bulk_approve_batch_size
+    )
+    dp["bulk_approver"] = bulk_approver
+
+    # Очистка капч, выданных без Redis
+    captcha_store = dp["captcha_store"]
+    captcha_store.start()
+
+    # Сроки капч: неотвеченные заявки отклоняются
+    captcha_timeouts = CaptchaTimeouts(
+        config.captcha_timeout_min * 60,
+        on_expire=partial(expire_captcha, bot=bot, captcha_store=captcha_store)
+    )
+    dp["captcha_timeouts"] = captcha_timeouts
+    captcha_timeouts.start()
+
+    # Заявки, чей срок капчи потерялся (рестарт), отклоняются по TTL
+    join_cleaner = JoinRequestCleaner(
+        bot,
+        ttl=timedelta(minutes=config.join_request_ttl_min),
+        interval=config.join_request_cleanup_interval_min * 60
+    )
+    join_cleaner.start()
+
+    # Пул процедурных капч: рендер в отдельных процессах
+    captcha_pool = dp["captcha_pool"]
+    if config.captcha_generator_enabled:
+        captcha_pool.start()
+
     # Удаляем webhook и запускаем polling
     await bot.delete_webhook(drop_pending_updates=True)
 
@@ -124,6 +226,15 @@ async def start_bot() -> None:
     try:
         await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
     finally:
+        await scheduler.stop()
+        await broadcasts.stop()
+        await bulk_approver.stop()
+        await captcha_pool.stop()
+        await join_cleaner.stop()
+        await captcha_timeouts.stop()
+        await captcha_store.stop()
+        # RedisStorage закрывает и общий пул Redis
+        await dp.storage.close()
         await bot.session.close()
         logger.info("🛑 Бот остановлен")
 
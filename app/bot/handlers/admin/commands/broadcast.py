@@ -1,20 +1,36 @@
 """Обработчики рассылки сообщений."""
-import asyncio
 import json
 import re
+from typing import List, Optional
+
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.fsm.context import FSMContext
 from raito.plugins.roles import DEVELOPER, OWNER, ADMINISTRATOR
 
-from app.core import get_logger
+from app.core import get_logger, get_config
 from app.bot.states import BroadcastStates
-from app.bot.keyboards import get_back_to_menu, parse_buttons_from_text
-from app.services.broadcast_service import send_broadcast
+from app.bot.keyboards import (
+    get_back_to_menu,
+    get_broadcast_job_controls,
+    get_broadcast_history_pagination,
+    get_broadcast_confirm_keyboard,
+    get_broadcast_segment_keyboard,
+)
+from app.database import BroadcastStatus, RequestStatus, Segment, get_session, crud
+from app.services.broadcast_service import BroadcastManager, deliver_copy
+from app.services.broadcast_estimate import estimate_broadcast
+from app.services.rate_limiter import Priority
+from app.services.scheduler import BroadcastScheduler
+from app.utils.helpers import format_duration, format_local_time, parse_schedule_time, parse_date_range
+from app.utils.templates import TemplateError, compile_template
 
 logger = get_logger(__name__)
 router = Router()
 
+# Варианты «не получали последние N рассылок» по кругу
+SKIP_RECENT_STEPS = (0, 1, 3, 5, 10)
+
 
 @router.message(F.text == "📩 Рассылка", DEVELOPER | OWNER | ADMINISTRATOR)
 @router.callback_query(F.data == "admin:broadcast", DEVELOPER | OWNER | ADMINISTRATOR)
@@ -29,12 +45,14 @@ async def broadcast_menu(event: Message | CallbackQuery, state: FSMContext) -> N
         "Выберите действие:\n"
         "├ ✏️ <b>Создать рассылку</b> - отправить новое сообщение\n"
         "├ ⏸️ <b>Текущая рассылка</b> - управление активной рассылкой\n"
-        "└ 📊 <b>Статистика</b> - просмотр результатов\n\n"
+        "└ 📜 <b>История</b> - прошлые рассылки и их статистика\n\n"
     )
 
     from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="✏️ Создать рассылку", callback_data="broadcast:create")],
+        [InlineKeyboardButton(text="⏸️ Текущая рассылка", callback_data="broadcast:current")],
+        [InlineKeyboardButton(text="📜 История рассылок", callback_data="broadcast:history:1")],
         [InlineKeyboardButton(text="🔙 Главное меню", callback_data="admin:menu")]
     ])
 
@@ -51,10 +69,14 @@ async def start_broadcast(callback: CallbackQuery, state: FSMContext) -> None:
 
     instruction = (
         "✏️ <b>Создание рассылки</b>\n\n"
-        "Отправьте сообщение (текст + фото/видео), которое хотите разослать.\n\n"
+        "Отправьте сообщение, которое хотите разослать.\n"
+        "Без кнопок и персонализации оно уйдёт копией: с форматированием, "
+        "альбомом, документом, GIF или голосовым.\n\n"
         "<b>Персонализация:</b>\n"
         "├ <code>{name}</code> — имя пользователя\n"
-        "├ <code>{username}</code> — username (если есть)\n\n"
+        "├ <code>{first_name}</code> — имя пользователя\n"
+        "├ <code>{username}</code> — username (если есть)\n"
+        "└ <code>{id}</code> — Telegram ID\n\n"
         "<b>Добавление ссылок:</b>\n"
         "Чтобы добавить кнопки, в конце сообщения укажите их согласно формату.\n"
         "Чтобы отправить несколько кнопок за 1 раз, используйте разделитель «|».\n"
@@ -71,11 +93,21 @@ async def start_broadcast(callback: CallbackQuery, state: FSMContext) -> None:
     await callback.answer()
 
 
-@router.message(BroadcastStates.waiting_content, F.text | F.photo | F.video, DEVELOPER | OWNER | ADMINISTRATOR)
-async def process_broadcast_content(message: Message, state: FSMContext) -> None:
+@router.message(
+    BroadcastStates.waiting_content,
+    F.text | F.photo | F.video | F.document | F.animation | F.audio | F.voice | F.video_note,
+    DEVELOPER | OWNER | ADMINISTRATOR
+)
+async def process_broadcast_content(
+        message: Message,
+        state: FSMContext,
+        album: Optional[List[Message]] = None
+) -> None:
     """Обработка контента рассылки."""
-    # Получаем текст и медиа
-    text = message.text or message.caption
+    messages = album or [message]
+
+    # Получаем текст и медиа (у альбома подпись только у одной части)
+    text = next((m.text or m.caption for m in messages if m.text or m.caption), None)
     photo_id = None
 
     if message.photo:
@@ -83,19 +115,14 @@ async def process_broadcast_content(message: Message, state: FSMContext) -> None
     elif message.video:
         photo_id = message.video.file_id
 
-    if not text:
-        await message.answer("⚠️ Сообщение должно содержать текст!")
-        return
-
     # Парсим кнопки
     buttons_json = "[]"
-    clean_text = text
+    clean_text = text or ""
     buttons = []
-    markup = None
 
     pattern = re.compile(r'(.+?)\s*-\s*(https?://\S+|[a-zA-Z0-9.-]+\.[a-z]{2,})')
 
-    lines = text.split('\n')
+    lines = clean_text.split('\n')
     clean_lines = []
 
     for line in lines:
@@ -111,25 +138,53 @@ async def process_broadcast_content(message: Message, state: FSMContext) -> None
     if buttons:
         clean_text = '\n'.join(clean_lines).strip()
         buttons_json = json.dumps(buttons, ensure_ascii=False)
-        markup = parse_buttons_from_text(text)
 
-    # Сохраняем в состояние
+    try:
+        personalized = not compile_template(clean_text).is_static
+    except TemplateError as e:
+        await message.answer(f"⚠️ {e}\n\nЧтобы оставить фигурные скобки, удвойте их: <code>{{{{текст}}}}</code>")
+        return
+
+    renderable = album is None and bool(message.text or message.photo or message.video)
+
+    # Без кнопок и персонализации сообщение копируется как есть (copy_message):
+    # сохраняется форматирование и подходит любой тип медиа
+    copy_mode = not (buttons or personalized)
+
+    if not copy_mode and not renderable:
+        await message.answer(
+            "⚠️ Кнопки и персонализация доступны только для текста, фото или видео.\n"
+            "Альбомы, документы и другие медиа рассылаются без изменений."
+        )
+        return
+
+    if not copy_mode and not clean_text:
+        await message.answer("⚠️ Сообщение должно содержать текст!")
+        return
+
+    source_message_ids = [m.message_id for m in messages] if copy_mode else None
+
+    # Сохраняем в состояние (кнопки — JSON, клавиатура собирается при отправке)
     await state.update_data({
         'text': clean_text,
-        'photo_id': photo_id,
+        'photo_id': None if copy_mode else photo_id,
         'buttons': buttons_json,
-        'markup': markup
+        'source_chat_id': message.chat.id if copy_mode else None,
+        'source_message_ids': source_message_ids
     })
 
     # Показываем предпросмотр
-    preview_text = (
-        "👁 <b>Предпросмотр рассылки</b>\n\n"
-        "<b>Сообщение:</b>\n"
-        f"{clean_text}\n\n"
-    )
+    preview_text = "👁 <b>Предпросмотр рассылки</b>\n\n"
 
-    if photo_id:
-        preview_text += "📎 Медиа: прикреплено\n"
+    if copy_mode:
+        # Само сообщение показываем копией выше
+        preview_text += "📋 Режим: копия сообщения (форматирование сохранено)\n"
+        if album:
+            preview_text += f"🖼 Альбом: {len(album)} шт.\n"
+    else:
+        preview_text += f"<b>Сообщение:</b>\n{clean_text}\n\n"
+        if photo_id:
+            preview_text += "📎 Медиа: прикреплено\n"
 
     if buttons:
         preview_text += f"🔘 Кнопок: {sum(len(row) for row in buttons)}\n"
@@ -146,7 +201,13 @@ async def process_broadcast_content(message: Message, state: FSMContext) -> None
     ])
 
     # Отправляем предпросмотр
-    if photo_id:
+    if copy_mode:
+        # Получатели увидят ровно эту копию
+        await deliver_copy(
+            message.bot, message.chat.id, message.chat.id, source_message_ids, priority=Priority.NORMAL
+        )
+        await message.answer(preview_text, reply_markup=keyboard)
+    elif photo_id:
         if photo_id.startswith("AgAC"):
             await message.answer_photo(
                 photo_id,
@@ -175,98 +236,440 @@ async def confirm_broadcast(callback: CallbackQuery, state: FSMContext) -> None:
         return
 
     text = data.get('text', '')
-    photo_id = data.get('photo_id')
-    buttons = data.get('buttons', '[]')
-    markup = data.get('markup')
-
-    # Получаем количество пользователей
-    from app.database import get_session, crud
+    segment = Segment.from_dict(data.get('segment'))
 
     async for session in get_session():
-        total_users = await crud.get_users_count(session)
+        # Без пользователей, заблокировавших бота; сегмент считается тем же SQL, что и рассылка
+        total_users = await crud.count_broadcast_recipients(session, segment=segment)
+
+    # Грубая оценка по глобальному лимиту; точная — в пробном прогоне
+    rate = get_config().telegram_global_rate
+    duration = format_duration(total_users / rate) if rate > 0 else "—"
 
     # Показываем подтверждение
     confirm_text = (
         "🚀 <b>Запуск рассылки</b>\n\n"
         f"📊 <b>Количество получателей:</b> <code>{total_users}</code>\n"
-        f"📝 <b>Длина сообщения:</b> <code>{len(text)}</code> символов\n\n"
-        "⚠️ <i>Рассылка будет отправлена всем пользователям из базы данных.</i>\n"
-        "⏳ <i>Это может занять некоторое время...</i>\n\n"
+        f"📝 <b>Длина сообщения:</b> <code>{len(text)}</code> символов\n"
+        f"⏱ <b>Примерная длительность:</b> {duration}\n\n"
+        f"{_segment_summary(segment)}\n"
+        "🧪 <i>Пробный прогон покажет точную оценку без отправки.</i>\n\n"
         "<b>Запустить рассылку?</b>"
     )
 
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="✅ Запустить", callback_data="broadcast:confirm_send"),
-            InlineKeyboardButton(text="❌ Отменить", callback_data="broadcast:cancel")
+    await callback.message.edit_text(confirm_text, reply_markup=get_broadcast_confirm_keyboard())
+    await state.set_state(BroadcastStates.confirm)
+    await callback.answer()
+
+
+def _segment_summary(segment: Segment) -> str:
+    """Описание аудитории для экрана подтверждения."""
+    if segment.is_empty:
+        return "⚠️ <i>Рассылка будет отправлена всем пользователям из базы данных.</i>\n"
+
+    lines = "\n".join(f"├ {line}" for line in segment.describe())
+    return f"🎯 <b>Аудитория:</b>\n{lines}\n"
+
+
+async def _render_segment_screen(segment: Segment) -> str:
+    """Экран выбора аудитории: размер каждого условия и их пересечения (COUNT запросы)."""
+    async for session in get_session():
+        total = await crud.count_broadcast_recipients(session)
+        parts = [
+            (label, await crud.count_broadcast_recipients(session, segment=part))
+            for label, part in segment.split()
         ]
-    ])
+        selected = await crud.count_broadcast_recipients(session, segment=segment) if parts else total
 
-    await callback.message.edit_text(confirm_text, reply_markup=keyboard)
-    await state.set_state(BroadcastStates.confirm)
+    text = (
+        "🎯 <b>Аудитория рассылки</b>\n\n"
+        f"👥 Все доступные пользователи: <code>{total}</code>\n"
+    )
+    if parts:
+        text += "\n<b>Условия:</b>\n"
+        text += "".join(f"├ {label}: <code>{count}</code>\n" for label, count in parts)
+    text += f"\n📊 <b>Получат рассылку:</b> <code>{selected}</code>"
+
+    return text
+
+
+@router.callback_query(F.data == "broadcast:segment", DEVELOPER | OWNER | ADMINISTRATOR)
+async def broadcast_segment_menu(callback: CallbackQuery, state: FSMContext) -> None:
+    """Выбор аудитории рассылки."""
+    data = await state.get_data()
+
+    if not data:
+        await callback.answer("⚠️ Данные рассылки не найдены")
+        return
+
+    segment = Segment.from_dict(data.get('segment'))
+    await callback.message.edit_text(
+        await _render_segment_screen(segment),
+        reply_markup=get_broadcast_segment_keyboard(segment)
+    )
     await callback.answer()
 
 
+@router.callback_query(F.data.startswith("broadcast:segment:"), DEVELOPER | OWNER | ADMINISTRATOR)
+async def toggle_broadcast_segment(callback: CallbackQuery, state: FSMContext) -> None:
+    """Переключение условия сегмента."""
+    data = await state.get_data()
+
+    if not data:
+        await callback.answer("⚠️ Данные рассылки не найдены")
+        return
+
+    action = callback.data.split(":")[2]
+    segment = Segment.from_dict(data.get('segment'))
+
+    if action == "dates":
+        if segment.registered_from or segment.registered_to:
+            segment.registered_from = segment.registered_to = None
+        else:
+            await callback.message.edit_text(
+                "📅 <b>Период регистрации</b>\n\n"
+                "Отправьте период:\n"
+                "├ <code>30</code> — за последние 30 дней\n"
+                "├ <code>01.09.2026-30.09.2026</code> — диапазон дат\n"
+                "└ <code>01.09.2026-</code> или <code>-30.09.2026</code> — открытый диапазон",
+                reply_markup=InlineKeyboardMarkup(inline_keyboard=[
+                    [InlineKeyboardButton(text="🔙 Назад", callback_data="broadcast:segment")]
+                ])
+            )
+            await state.set_state(BroadcastStates.waiting_segment_dates)
+            await callback.answer()
+            return
+    elif action == "request":
+        order = [None, RequestStatus.PENDING, RequestStatus.APPROVED]
+        segment.request_status = order[(order.index(segment.request_status) + 1) % len(order)]
+    elif action == "captcha":
+        segment.passed_captcha = not segment.passed_captcha
+    elif action == "recent":
+        steps = list(SKIP_RECENT_STEPS)
+        current = steps.index(segment.skip_recent) if segment.skip_recent in steps else 0
+        segment.skip_recent = steps[(current + 1) % len(steps)]
+    elif action == "username":
+        segment.has_username = not segment.has_username
+    elif action == "reset":
+        segment = Segment()
+
+    await state.update_data(segment=segment.to_dict())
+    await callback.message.edit_text(
+        await _render_segment_screen(segment),
+        reply_markup=get_broadcast_segment_keyboard(segment)
+    )
+    await callback.answer()
+
+
+@router.message(BroadcastStates.waiting_segment_dates, F.text, DEVELOPER | OWNER | ADMINISTRATOR)
+async def process_segment_dates(message: Message, state: FSMContext) -> None:
+    """Сохранение периода регистрации."""
+    period = parse_date_range(message.text)
+    if period is None:
+        await message.answer("⚠️ Не удалось распознать период. Попробуйте ещё раз.")
+        return
+
+    data = await state.get_data()
+    segment = Segment.from_dict(data.get('segment'))
+    segment.registered_from, segment.registered_to = period
+
+    await state.update_data(segment=segment.to_dict())
+    await state.set_state(BroadcastStates.confirm)
+    await message.answer(
+        await _render_segment_screen(segment),
+        reply_markup=get_broadcast_segment_keyboard(segment)
+    )
+
+
+@router.callback_query(F.data == "broadcast:dry_run", DEVELOPER | OWNER | ADMINISTRATOR)
+async def dry_run_broadcast(callback: CallbackQuery, state: FSMContext) -> None:
+    """Пробный прогон: реальные получатели и рендер шаблона без отправки."""
+    data = await state.get_data()
+
+    if not data:
+        await callback.answer("⚠️ Данные рассылки не найдены")
+        return
+
+    await callback.answer("🧪 Считаем...")
+
+    estimate = await estimate_broadcast(
+        text=data.get('text', ''),
+        photo_id=data.get('photo_id'),
+        buttons=data.get('buttons', '[]'),
+        source_message_ids=data.get('source_message_ids'),
+        segment=Segment.from_dict(data.get('segment'))
+    )
+
+    logger.info(
+        f"[id{callback.from_user.id}] Пробный прогон: {estimate.recipients} получателей, "
+        f"~{estimate.duration:.0f} сек"
+    )
+
+    await callback.message.edit_text(
+        estimate.render() + "\n<b>Запустить рассылку?</b>",
+        reply_markup=get_broadcast_confirm_keyboard(dry_run=False)
+    )
+
+
 @router.callback_query(F.data == "broadcast:confirm_send", DEVELOPER | OWNER | ADMINISTRATOR)
-async def start_broadcast_send(callback: CallbackQuery, state: FSMContext) -> None:
-    """Запуск рассылки."""
+async def start_broadcast_send(callback: CallbackQuery, state: FSMContext, broadcasts: BroadcastManager) -> None:
+    """Постановка рассылки в очередь."""
     data = await state.get_data()
 
     if not data:
         await callback.answer("⚠️ Данные рассылки не найдены")
         return
 
-    text = data.get('text', '')
-    photo_id = data.get('photo_id')
-    buttons = data.get('buttons', '[]')
-    markup = data.get('markup')
-
-    # Сообщение о начале
-    start_text = (
-        "⏳ <b>Рассылка запущена</b>\n\n"
-        "Отправка сообщений началась...\n"
-        "Это может занять некоторое время.\n\n"
-        "<i>Вы будете уведомлены по завершении.</i>"
+    # Рассылка сохраняется в БД и переживает рестарт бота
+    job, ahead = await broadcasts.submit(
+        admin_id=callback.from_user.id,
+        text=data.get('text', ''),
+        photo_id=data.get('photo_id'),
+        buttons=data.get('buttons', '[]'),
+        progress_message=(callback.message.chat.id, callback.message.message_id),
+        source_chat_id=data.get('source_chat_id'),
+        source_message_ids=data.get('source_message_ids'),
+        segment=Segment.from_dict(data.get('segment'))
+    )
+
+    if ahead:
+        start_text = (
+            f"🕒 <b>Рассылка #{job.id} поставлена в очередь</b>\n\n"
+            f"Перед ней рассылок: <code>{ahead}</code>\n"
+            "Она начнётся автоматически, когда завершатся предыдущие.\n\n"
+            "<i>Вы будете уведомлены по завершении.</i>"
+        )
+    else:
+        start_text = (
+            f"⏳ <b>Рассылка #{job.id} запущена</b>\n\n"
+            "Отправка сообщений началась...\n"
+            "Это может занять некоторое время.\n\n"
+            "<i>Вы будете уведомлены по завершении.</i>"
+        )
+
+    await callback.message.edit_text(start_text, reply_markup=get_broadcast_job_controls(job.id, paused=False))
+
+    await state.clear()
+    await callback.answer()
+
+
+@router.callback_query(F.data == "broadcast:schedule", DEVELOPER | OWNER | ADMINISTRATOR)
+async def schedule_broadcast(callback: CallbackQuery, state: FSMContext) -> None:
+    """Запрос времени отложенного запуска."""
+    if not await state.get_data():
+        await callback.answer("⚠️ Данные рассылки не найдены")
+        return
+
+    config = get_config()
+    text = (
+        "🕒 <b>Отложенная рассылка</b>\n\n"
+        f"Отправьте время запуска (часовой пояс: <code>{config.timezone}</code>):\n"
+        "├ <code>30м</code>, <code>2ч</code>, <code>1д</code> — через указанное время\n"
+        "├ <code>03:30</code> — сегодня или завтра\n"
+        "└ <code>25.12 10:00</code> или <code>25.12.2026 10:00</code> — точная дата"
     )
 
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="⛔ Остановить", callback_data="broadcast:stop")]
+        [InlineKeyboardButton(text="🔙 Назад", callback_data="broadcast:send")]
     ])
 
-    await callback.message.edit_text(start_text, reply_markup=keyboard)
-
-    # Запускаем рассылку в фоне
-    asyncio.create_task(
-        send_broadcast(
-            bot=callback.bot,
-            user_id=callback.from_user.id,
-            text=text,
-            photo_id=photo_id,
-            markup=markup,
-            state=state
-        )
+    await callback.message.edit_text(text, reply_markup=keyboard)
+    await state.set_state(BroadcastStates.waiting_schedule)
+    await callback.answer()
+
+
+@router.message(BroadcastStates.waiting_schedule, F.text, DEVELOPER | OWNER | ADMINISTRATOR)
+async def process_broadcast_schedule(message: Message, state: FSMContext, scheduler: BroadcastScheduler) -> None:
+    """Сохранение отложенной рассылки."""
+    data = await state.get_data()
+    config = get_config()
+
+    run_at = parse_schedule_time(message.text, config.timezone)
+    if run_at is None:
+        await message.answer("⚠️ Не удалось распознать время или оно уже прошло. Попробуйте ещё раз.")
+        return
+
+    # Рассылка хранится в БД и запустится даже после рестарта бота
+    job = await scheduler.schedule(
+        admin_id=message.from_user.id,
+        run_at=run_at,
+        text=data.get('text', ''),
+        photo_id=data.get('photo_id'),
+        buttons=data.get('buttons', '[]'),
+        source_chat_id=data.get('source_chat_id'),
+        source_message_ids=data.get('source_message_ids'),
+        segment=Segment.from_dict(data.get('segment'))
     )
 
-    await state.set_state(BroadcastStates.running)
+    await message.answer(
+        f"🕒 <b>Рассылка #{job.id} запланирована</b>\n\n"
+        f"Запуск: <code>{format_local_time(run_at, config.timezone)}</code> ({config.timezone})\n\n"
+        "<i>Вы будете уведомлены о запуске и завершении.</i>",
+        reply_markup=get_broadcast_job_controls(job.id, scheduled=True)
+    )
+    await state.clear()
+
+
+@router.callback_query(F.data == "broadcast:current", DEVELOPER | OWNER | ADMINISTRATOR)
+async def current_broadcasts(callback: CallbackQuery) -> None:
+    """Незавершённые рассылки: идущая, на паузе и в очереди."""
+    from app.database import get_session, crud
+
+    async for session in get_session():
+        jobs = await crud.get_active_broadcast_jobs(session)
+
+    if not jobs:
+        await callback.message.edit_text(
+            "📭 <b>Активных рассылок нет</b>",
+            reply_markup=get_back_to_menu()
+        )
+        await callback.answer()
+        return
+
+    config = get_config()
+    status_names = {
+        BroadcastStatus.RUNNING: "▶️ идёт",
+        BroadcastStatus.PAUSED: "⏸️ на паузе",
+        BroadcastStatus.QUEUED: "🕒 в очереди",
+        BroadcastStatus.SCHEDULED: "📅 запланирована",
+    }
+
+    text = "⏸️ <b>Текущие рассылки</b>\n\n"
+    rows = []
+    for job in jobs:
+        preview = job.text[:30].replace("<", "&lt;")
+        scheduled = job.status == BroadcastStatus.SCHEDULED
+        text += (
+            f"<b>#{job.id}</b> — {status_names[job.status]}\n"
+            f"├ {preview}{'...' if len(job.text) > 30 else ''}\n"
+        )
+        if scheduled:
+            text += f"└ 📅 <code>{format_local_time(job.scheduled_at, config.timezone)}</code>\n\n"
+        else:
+            text += f"└ ✅ <code>{job.sent_count}</code> / ❌ <code>{job.failed_count}</code>\n\n"
+        rows.extend(get_broadcast_job_controls(
+            job.id, paused=job.status == BroadcastStatus.PAUSED, scheduled=scheduled
+        ).inline_keyboard)
+
+    rows.append([InlineKeyboardButton(text="🔙 Назад", callback_data="admin:broadcast")])
+
+    await callback.message.edit_text(text, reply_markup=InlineKeyboardMarkup(inline_keyboard=rows))
     await callback.answer()
 
 
-@router.callback_query(F.data == "broadcast:stop", DEVELOPER | OWNER | ADMINISTRATOR)
-async def stop_broadcast(callback: CallbackQuery, state: FSMContext) -> None:
+@router.callback_query(F.data.startswith("broadcast:history:"), DEVELOPER | OWNER | ADMINISTRATOR)
+async def broadcast_history(callback: CallbackQuery) -> None:
+    """История завершённых рассылок со статистикой доставки."""
+    per_page = 5
+    page = max(1, int(callback.data.split(":")[2]))
+
+    async for session in get_session():
+        total = await crud.count_finished_broadcast_jobs(session)
+        total_pages = max(1, (total + per_page - 1) // per_page)
+        page = min(page, total_pages)
+
+        jobs = await crud.get_finished_broadcast_jobs(session, offset=(page - 1) * per_page, limit=per_page)
+        # Агрегаты журнала доставки для всей страницы одним запросом
+        stats = await crud.get_delivery_stats(session, [job.id for job in jobs])
+
+    if not jobs:
+        await callback.message.edit_text(
+            "📭 <b>История рассылок пуста</b>",
+            reply_markup=get_back_to_menu()
+        )
+        await callback.answer()
+        return
+
+    config = get_config()
+    status_names = {
+        BroadcastStatus.COMPLETED: "✅ завершена",
+        BroadcastStatus.CANCELLED: "🛑 остановлена",
+    }
+
+    text = f"📜 <b>История рассылок</b> (всего: {total})\n\n"
+    for job in jobs:
+        preview = job.text[:30].replace("<", "&lt;")
+        started_at = job.started_at or job.created_at
+        duration = format_duration((job.finished_at - started_at).total_seconds()) if job.finished_at else "—"
+
+        text += (
+            f"<b>#{job.id}</b> — {status_names[job.status]}\n"
+            f"├ {preview}{'...' if len(job.text) > 30 else ''}\n"
+            f"├ 📅 {format_local_time(started_at, config.timezone)} ({duration})\n"
+            f"├ ✅ <code>{job.sent_count}</code> / ❌ <code>{job.failed_count}</code>\n"
+        )
+        if job.segment:
+            text += f"├ 🎯 {', '.join(Segment.from_json(job.segment).describe())}\n"
+
+        job_stats = stats.get(job.id)
+        if job_stats:
+            errors = job_stats["errors"]
+            blocked = errors.get(403, 0)
+            other = job_stats["failed"] - blocked
+            text += (
+                f"├ 🚫 Заблокировали: <code>{blocked}</code>, ⚠️ другие ошибки: <code>{other}</code>\n"
+                f"└ ⚡ Средняя доставка: <code>{job_stats['avg_latency_ms']:.0f}</code> мс\n\n"
+            )
+        else:
+            # Рассылки до появления журнала доставки
+            text += "└ <i>Журнал доставки недоступен</i>\n\n"
+
+    await callback.message.edit_text(text, reply_markup=get_broadcast_history_pagination(page, total_pages))
+    await callback.answer()
+
+
+@router.callback_query(F.data.startswith("broadcast:pause:"), DEVELOPER | OWNER | ADMINISTRATOR)
+async def pause_broadcast(callback: CallbackQuery, broadcasts: BroadcastManager) -> None:
+    """Пауза рассылки (прогресс сохраняется)."""
+    job_id = int(callback.data.split(":")[2])
+
+    job = await broadcasts.pause(job_id)
+    if not job:
+        await callback.answer("⚠️ Рассылку нельзя поставить на паузу")
+        return
+
+    logger.info(f"[id{callback.from_user.id}] Поставил рассылку #{job_id} на паузу")
+    await callback.message.edit_reply_markup(reply_markup=get_broadcast_job_controls(job_id, paused=True))
+    await callback.answer("⏸️ Рассылка на паузе")
+
+
+@router.callback_query(F.data.startswith("broadcast:resume:"), DEVELOPER | OWNER | ADMINISTRATOR)
+async def resume_broadcast(callback: CallbackQuery, broadcasts: BroadcastManager) -> None:
+    """Продолжить рассылку с места остановки."""
+    job_id = int(callback.data.split(":")[2])
+
+    job = await broadcasts.resume(job_id, progress_message=(callback.message.chat.id, callback.message.message_id))
+    if not job:
+        await callback.answer("⚠️ Рассылка не на паузе")
+        return
+
+    logger.info(f"[id{callback.from_user.id}] Возобновил рассылку #{job_id}")
+    await callback.message.edit_reply_markup(reply_markup=get_broadcast_job_controls(job_id, paused=False))
+    await callback.answer("▶️ Рассылка возобновлена")
+
+
+@router.callback_query(F.data.startswith("broadcast:stop:"), DEVELOPER | OWNER | ADMINISTRATOR)
+async def stop_broadcast(callback: CallbackQuery, broadcasts: BroadcastManager) -> None:
     """Остановка рассылки."""
-    # Помечаем рассылку как отменённую
-    await state.update_data({'broadcast_cancelled': True})
+    job_id = int(callback.data.split(":")[2])
+
+    job = await broadcasts.cancel(job_id)
+    if not job:
+        await callback.answer("⚠️ Рассылка уже завершена")
+        return
+
+    logger.info(f"[id{callback.from_user.id}] Остановил рассылку #{job_id}")
+
+    if job.started_at is None:
+        # Отложенная или ожидавшая в очереди — ничего не отправлено
+        details = "Рассылка отменена до запуска."
+    else:
+        details = "Рассылка была прервана.\nЧасть сообщений могла быть отправлена."
 
     await callback.message.edit_text(
-        "🛑 <b>Рассылка остановлена</b>\n\n"
-        "Рассылка была прервана.\n"
-        "Часть сообщений могла быть отправлена.",
+        f"🛑 <b>Рассылка #{job_id} остановлена</b>\n\n{details}",
         reply_markup=get_back_to_menu()
     )
-
-    await state.clear()
     await callback.answer()
 
 
@@ -46,6 +46,12 @@ async def cmd_start_admin(message: Message, state: FSMContext) -> None:
 @router.message(Command("start"))
 async def cmd_start_user(message: Message) -> None:
     """Команда /start для обычных пользователей."""
+    from app.database import get_session, crud
+
+    # Написал боту — значит снова может получать рассылки
+    async for session in get_session():
+        await crud.mark_user_reachable(session, message.from_user.id)
+
     await message.answer(
         "👋 Привет!\n\n"
         "Чтобы вступить в группу, отправьте заявку через кнопку вступления."
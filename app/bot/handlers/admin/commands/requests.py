@@ -1,14 +1,17 @@
 """Управление заявками."""
 
+from typing import Optional
+
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
-from aiogram.exceptions import TelegramBadRequest
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
 from raito import Raito
 from raito.plugins.roles import DEVELOPER, OWNER, ADMINISTRATOR
 
 from app.core import get_logger
 from app.database import get_session, crud
-from app.database.models import RequestStatus
+from app.database.models import PendingRequest, RequestStatus
+from app.services.bulk_approve import BulkApprover, approve_join_request, decline_join_request
 
 logger = get_logger(__name__)
 router = Router()
@@ -51,10 +54,21 @@ async def requests_menu(event: Message | CallbackQuery) -> None:
         )
 
         from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="❌ Выключить автоприём", callback_data="requests:toggle_auto")],
-            [InlineKeyboardButton(text="🔙 Главное меню", callback_data="admin:menu")]
-        ])
+        buttons = [
+            [InlineKeyboardButton(text="❌ Выключить автоприём", callback_data="requests:toggle_auto")]
+        ]
+
+        # Очередь, накопленная до включения автоприёма, — предлагаем принять её
+        if pending_count > 0:
+            text += f"\n\n📊 В очереди осталось: <code>{pending_count}</code>"
+            buttons.append([InlineKeyboardButton(
+                text=f"✅ Принять очередь ({pending_count})",
+                callback_data="requests:bulk:all"
+            )])
+
+        buttons.append([InlineKeyboardButton(text="🔙 Главное меню", callback_data="admin:menu")])
+
+        keyboard = InlineKeyboardMarkup(inline_keyboard=buttons)
 
     else:
         # Автоприём ВЫКЛ
@@ -70,9 +84,13 @@ async def requests_menu(event: Message | CallbackQuery) -> None:
             [InlineKeyboardButton(text="✅ Включить автоприём", callback_data="requests:toggle_auto")]
         ]
 
-        # Кнопка "Посмотреть заявки" только если есть заявки
+        # Кнопки просмотра и массового приёма только если есть заявки
         if pending_count > 0:
             buttons.append([InlineKeyboardButton(text="👁 Посмотреть заявки", callback_data="requests:view:0")])
+            buttons.append([
+                InlineKeyboardButton(text="✅ Принять всех", callback_data="requests:bulk:all"),
+                InlineKeyboardButton(text="👤 Только с username", callback_data="requests:bulk:username")
+            ])
 
         buttons.append([InlineKeyboardButton(text="🔙 Главное меню", callback_data="admin:menu")])
 
@@ -190,77 +208,158 @@ async def view_requests(callback: CallbackQuery) -> None:
     await callback.answer()
 
 
+async def _get_pending_request(callback: CallbackQuery, request_id: int) -> Optional[PendingRequest]:
+    """
+    Заявка для кнопки принять/отклонить/забанить.
+
+    Returns:
+        None, если заявки нет или она уже обработана (админу уже ответили)
+    """
+    async for session in get_session():
+        request = await session.get(PendingRequest, request_id)
+
+    if not request:
+        await callback.answer("⚠️ Заявка не найдена")
+        return None
+
+    # Устаревшая кнопка: заявку уже обработали (другой админ, массовое одобрение)
+    if request.status != RequestStatus.PENDING:
+        await callback.answer("⚠️ Заявка уже обработана")
+        await view_requests(callback)
+        return None
+
+    return request
+
+
+async def _set_request_status(request_id: int, status: RequestStatus, admin_id: int) -> bool:
+    """
+    Записать итог заявки, если она всё ещё PENDING.
+
+    Returns:
+        False, если пока шёл вызов API заявку обработали — чужой статус не перезаписывается
+    """
+    async for session in get_session():
+        current = await session.get(PendingRequest, request_id)
+        if not current or current.status != RequestStatus.PENDING:
+            return False
+        await crud.update_request_status(session, request_id, status, processed_by=admin_id)
+    return True
+
+
 @router.callback_query(F.data.startswith("requests:approve:"), DEVELOPER | OWNER | ADMINISTRATOR)
 async def approve_request(callback: CallbackQuery) -> None:
     """Принять заявку."""
     request_id = int(callback.data.split(":")[2])
 
-    async for session in get_session():
-        request = await session.get(crud.PendingRequest, request_id)
+    request = await _get_pending_request(callback, request_id)
+    if not request:
+        return
 
-        if not request:
-            await callback.answer("⚠️ Заявка не найдена")
-            return
+    # Вызов API — вне сессии: ограничитель может ждать RetryAfter
+    try:
+        await approve_join_request(callback.bot, request.chat_id, request.user_id)
+    except TelegramBadRequest as e:
+        # Заявки уже нет: пользователь отозвал её или её обработали в самом чате
+        logger.warning(f"Заявка {request_id} не одобрена в Telegram: {e}")
+        status = RequestStatus.DECLINED
+    except Exception as e:
+        # RetryAfter сверх повторов ограничителя, сеть — заявка остаётся в очереди
+        logger.error(f"Ошибка одобрения заявки {request_id}: {e}")
+        await callback.answer("❌ Не удалось одобрить заявку, попробуйте позже", show_alert=True)
+        return
+    else:
+        status = RequestStatus.APPROVED
 
-        # Обновляем статус
-        await crud.update_request_status(
-            session,
-            request_id,
-            RequestStatus.APPROVED,
-            processed_by=callback.from_user.id
-        )
+    await _set_request_status(request_id, status, callback.from_user.id)
 
-        # Одобряем заявку в Telegram
+    if status == RequestStatus.APPROVED:
+        logger.info(f"[id{callback.from_user.id}] Одобрил заявку от {request.user_id}")
+
+        # Уведомляем пользователя
         try:
-            # TODO: Нужен chat_join_request object для approve()
-            # Пока просто уведомляем пользователя
             await callback.bot.send_message(
                 request.user_id,
                 "✅ <b>Ваша заявка одобрена!</b>\n\nДобро пожаловать в группу!"
             )
+        except (TelegramBadRequest, TelegramForbiddenError):
+            pass
 
-            logger.info(f"[id{callback.from_user.id}] Одобрил заявку от {request.user_id}")
-
-        except TelegramBadRequest as e:
-            logger.error(f"Ошибка одобрения заявки: {e}")
-
-    await callback.answer("✅ Заявка одобрена")
+    await callback.answer(
+        "✅ Заявка одобрена" if status == RequestStatus.APPROVED else "⚠️ Заявка уже неактуальна"
+    )
 
     # Показываем следующую заявку
     await view_requests(callback)
 
 
+@router.callback_query(F.data.startswith("requests:bulk:"), DEVELOPER | OWNER | ADMINISTRATOR)
+async def bulk_approve_requests(callback: CallbackQuery, bulk_approver: BulkApprover) -> None:
+    """
+    Массовое одобрение очереди.
+
+    Формат: requests:bulk:<all|username>
+    """
+    has_username = True if callback.data.split(":")[2] == "username" else None
+
+    if bulk_approver.running:
+        await callback.answer("⏳ Одобрение уже идёт", show_alert=True)
+        return
+
+    async for session in get_session():
+        total = await crud.get_pending_count(session, RequestStatus.PENDING, has_username)
+
+    if not total:
+        await callback.answer("⚠️ Заявок не найдено")
+        return
+
+    # Прогресс — отдельным сообщением, меню заявок остаётся
+    progress_message = await callback.message.answer(f"⏳ <b>Одобрение заявок</b>: {total}...")
+    bulk_approver.start(
+        callback.from_user.id,
+        has_username=has_username,
+        progress_chat_id=progress_message.chat.id,
+        progress_message_id=progress_message.message_id
+    )
+
+    logger.info(f"[id{callback.from_user.id}] Запустил массовое одобрение ({total} заявок)")
+    await callback.answer("✅ Одобрение запущено")
+
+
 @router.callback_query(F.data.startswith("requests:decline:"), DEVELOPER | OWNER | ADMINISTRATOR)
 async def decline_request(callback: CallbackQuery) -> None:
     """Отклонить заявку."""
     request_id = int(callback.data.split(":")[2])
 
-    async for session in get_session():
-        request = await session.get(crud.PendingRequest, request_id)
-
-        if not request:
-            await callback.answer("⚠️ Заявка не найдена")
-            return
+    request = await _get_pending_request(callback, request_id)
+    if not request:
+        return
 
-        # Обновляем статус
-        await crud.update_request_status(
-            session,
-            request_id,
-            RequestStatus.DECLINED,
-            processed_by=callback.from_user.id
-        )
+    # Отклоняем в Telegram вне сессии (заявка могла быть уже обработана там)
+    try:
+        await decline_join_request(callback.bot, request.chat_id, request.user_id)
+    except TelegramBadRequest as e:
+        logger.warning(f"Заявка {request_id} не отклонена в Telegram: {e}")
+    except Exception as e:
+        # RetryAfter сверх повторов ограничителя, сеть — заявка остаётся в очереди
+        logger.error(f"Ошибка отклонения заявки {request_id}: {e}")
+        await callback.answer("❌ Не удалось отклонить заявку, попробуйте позже", show_alert=True)
+        return
 
-        # Уведомляем пользователя
-        try:
-            await callback.bot.send_message(
-                request.user_id,
-                "❌ Ваша заявка отклонена."
-            )
+    if not await _set_request_status(request_id, RequestStatus.DECLINED, callback.from_user.id):
+        await callback.answer("⚠️ Заявка уже обработана")
+        await view_requests(callback)
+        return
 
-            logger.info(f"[id{callback.from_user.id}] Отклонил заявку от {request.user_id}")
+    logger.info(f"[id{callback.from_user.id}] Отклонил заявку от {request.user_id}")
 
-        except TelegramBadRequest:
-            pass
+    # Уведомляем пользователя
+    try:
+        await callback.bot.send_message(
+            request.user_id,
+            "❌ Ваша заявка отклонена."
+        )
+    except (TelegramBadRequest, TelegramForbiddenError):
+        pass
 
     await callback.answer("❌ Заявка отклонена")
 
@@ -273,40 +372,44 @@ async def ban_request(callback: CallbackQuery, raito: Raito) -> None:
     """Отклонить заявку + бан."""
     request_id = int(callback.data.split(":")[2])
 
-    async for session in get_session():
-        request = await session.get(crud.PendingRequest, request_id)
-
-        if not request:
-            await callback.answer("⚠️ Заявка не найдена")
-            return
+    request = await _get_pending_request(callback, request_id)
+    if not request:
+        return
 
-        # Обновляем статус
-        await crud.update_request_status(
-            session,
-            request_id,
-            RequestStatus.BANNED,
-            processed_by=callback.from_user.id
-        )
+    # Отклоняем в Telegram вне сессии (заявка могла быть уже обработана там)
+    try:
+        await decline_join_request(callback.bot, request.chat_id, request.user_id)
+    except TelegramBadRequest as e:
+        logger.warning(f"Заявка {request_id} не отклонена в Telegram: {e}")
+    except Exception as e:
+        # RetryAfter сверх повторов ограничителя, сеть — заявка остаётся в очереди
+        logger.error(f"Ошибка отклонения заявки {request_id}: {e}")
+        await callback.answer("❌ Не удалось отклонить заявку, попробуйте позже", show_alert=True)
+        return
 
-        # Баним через Raito
-        await raito.role_manager.assign_role(
-            callback.bot.id,
-            callback.from_user.id,
-            request.user_id,
-            "tester"
-        )
+    if not await _set_request_status(request_id, RequestStatus.BANNED, callback.from_user.id):
+        await callback.answer("⚠️ Заявка уже обработана")
+        await view_requests(callback)
+        return
 
-        # Уведомляем пользователя
-        try:
-            await callback.bot.send_message(
-                request.user_id,
-                "🚫 Ваша заявка отклонена. Вы заблокированы."
-            )
+    # Баним через Raito
+    await raito.role_manager.assign_role(
+        callback.bot.id,
+        callback.from_user.id,
+        request.user_id,
+        "tester"
+    )
 
-            logger.info(f"[id{callback.from_user.id}] Забанил пользователя {request.user_id}")
+    logger.info(f"[id{callback.from_user.id}] Забанил пользователя {request.user_id}")
 
-        except TelegramBadRequest:
-            pass
+    # Уведомляем пользователя
+    try:
+        await callback.bot.send_message(
+            request.user_id,
+            "🚫 Ваша заявка отклонена. Вы заблокированы."
+        )
+    except (TelegramBadRequest, TelegramForbiddenError):
+        pass
 
     await callback.answer("🚫 Пользователь забанен")
 
@@ -10,6 +10,7 @@ from app.core import get_logger
 from app.database import get_session, crud
 from app.bot.states import WelcomeStates
 from app.bot.keyboards import get_back_to_menu
+from app.utils.templates import TemplateError, compile_template
 
 logger = get_logger(__name__)
 router = Router()
@@ -67,7 +68,9 @@ async def start_edit_welcome(callback: CallbackQuery, state: FSMContext) -> None
         "✏️ <b>Редактирование приветствия</b>\n\n"
         "Отправьте новый текст (HTML формат) с фото/видео или просто текст.\n\n"
         "<b>Персонализация:</b>\n"
-        "├ <code>{name}</code> — имя пользователя\n\n"
+        "├ <code>{name}</code> — имя пользователя\n"
+        "├ <code>{username}</code> — username (если есть)\n"
+        "└ <code>{id}</code> — Telegram ID\n\n"
         "<b>Добавление ссылок:</b>\n"
         "Чтобы добавить кнопки, в конце сообщения укажите их согласно формату.\n"
         "Чтобы отправить несколько кнопок за 1 раз, используйте разделитель «|».\n"
@@ -146,6 +149,12 @@ async def process_welcome_content(message: Message, state: FSMContext) -> None:
         buttons_json = json.dumps(buttons, ensure_ascii=False)
         markup = parse_buttons_from_text(text)
 
+    # Проверяем переменные до сохранения, чтобы не сломать приветствие
+    try:
+        compile_template(clean_text)
+    except TemplateError as e:
+        await message.answer(f"⚠️ {e}")
+        return
 
     # async for session in get_session():
     #     await crud.update_admin_settings(
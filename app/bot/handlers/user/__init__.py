@@ -2,6 +2,7 @@ from aiogram import Router
 
 from app.bot.handlers.user.commands.join_requests import router as join_router
 from app.bot.handlers.user.commands.captcha import router as captcha_router
+from app.bot.handlers.user.commands.reachability import router as reachability_router
 
 # Главный роутер для пользователей
 user_router = Router()
@@ -9,6 +10,7 @@ user_router = Router()
 # Подключаем все user роутеры
 user_router.include_router(join_router)
 user_router.include_router(captcha_router)
+user_router.include_router(reachability_router)
 
 
 __all__ = ["user_router"]
\ No newline at end of file
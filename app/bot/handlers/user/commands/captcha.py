@@ -5,23 +5,34 @@ from datetime import datetime, timedelta
 from aiogram import Router, F
 from aiogram.types import CallbackQuery
 from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
-from redis.asyncio import Redis
 
-from app.core import get_logger, get_config
+from app.core import get_logger
 from app.database import get_session, crud
 from app.database.models import CaptchaType
 from app.services.captcha_service import send_captcha_to_user
+from app.services.captcha_generator import CaptchaPool
+from app.services.captcha_images import CaptchaImageCache
+from app.services.captcha_store import CaptchaStore, CaptchaVerdict
+from app.services.captcha_timeouts import CaptchaTimeouts
 
 logger = get_logger(__name__)
 router = Router()
 
 
 @router.callback_query(F.data.startswith("captcha:"))
-async def handle_captcha_answer(callback: CallbackQuery) -> None:
+async def handle_captcha_answer(
+        callback: CallbackQuery,
+        captcha_store: CaptchaStore,
+        captcha_timeouts: CaptchaTimeouts
+) -> None:
     """
     Обработка ответа на капчу.
 
-    Формат callback_data: captcha:user_id:selected_emoji
+    Формат callback_data: captcha:user_id:selected_emoji[:token]
+    Проверка, счётчик попыток и удаление решённой капчи — одна атомарная
+    операция хранилища, поэтому повторные нажатия не считаются дважды.
+    С token (stateless-режим) ответ проверяется по подписи, а хранилище
+    только считает попытки.
     """
     try:
         # Парсим callback_data
@@ -38,88 +49,51 @@ async def handle_captcha_answer(callback: CallbackQuery) -> None:
             await callback.answer("⚠️ Это не ваша капча!")
             return
 
-        config = get_config()
-
-        # Пытаемся получить правильный ответ из Redis
-        correct_answer = None
-        attempts_count = 0
-
-        # Сначала пытаемся Redis
-        redis = None
-        try:
-            redis = Redis.from_url(config.redis_url, decode_responses=True)
-            correct_answer = await redis.get(f"captcha:{user_id}")
-            attempts_str = await redis.get(f"captcha_attempts:{user_id}")
-            attempts_count = int(attempts_str or "0")
-        except Exception:
-            # Redis недоступен - используем in-memory store
-            if 'in_memory_captcha_store' in globals():
-                store = globals()['in_memory_captcha_store']
-                if user_id in store:
-                    correct_answer = store[user_id]['answer']
-                    attempts_count = store[user_id]['attempts']
-        finally:
-            if redis:
-                await redis.close()
+        if len(parts) > 3:
+            result = await captcha_store.check_signed(user_id, parts[3], selected_emoji)
+        else:
+            result = await captcha_store.check(user_id, selected_emoji)
 
         # Если не нашли ответ
-        if not correct_answer:
+        if result.verdict == CaptchaVerdict.EXPIRED:
             await callback.answer("⏳ Время капчи истекло!")
             return
 
-        # Проверяем ответ
-        is_correct = selected_emoji == correct_answer
+        is_correct = result.verdict == CaptchaVerdict.CORRECT
+        if is_correct or result.verdict == CaptchaVerdict.EXHAUSTED:
+            # Капча решена — срок больше не нужен
+            captcha_timeouts.cancel(user_id)
 
         # Записываем попытку в БД
-        from app.database.models import CaptchaType
         async for session in get_session():
-            from app.database import crud
             await crud.create_captcha_attempt(
                 session,
                 user_id=user_id,
                 chat_id=callback.message.chat.id,
                 captcha_type=CaptchaType.EMOJI,
                 is_successful=is_correct,
-                attempts_count=attempts_count + 1
+                attempts_count=result.attempts
             )
 
+        # Обработка после капчи вызывается лениво (циклический импорт)
+        from app.bot.handlers.user.commands.join_requests import process_after_captcha
+
         if is_correct:
-            # Правильный ответ
+            # Правильный ответ (капча уже удалена из хранилища)
             await callback.answer("✅ Верно! Ожидайте добавления в группу.")
-
-            # Очищаем хранилище
-            await clear_captcha_storage(user_id)
-
             logger.info(f"[id{user_id}] Капча пройдена успешно")
+            asyncio.create_task(process_after_captcha(callback.bot, user_id, True))
 
-            # Вызываем обработку после капчи
-            from app.bot.handlers.user.commands.join_requests import process_after_captcha
-            asyncio.create_task(process_after_captcha(user_id, True))
+        elif result.verdict == CaptchaVerdict.EXHAUSTED:
+            # Превышено количество попыток (капча уже удалена из хранилища)
+            await callback.answer("🚫 Превышено количество попыток!")
+            asyncio.create_task(process_after_captcha(callback.bot, user_id, False))
+            logger.info(f"[id{user_id}] Превышено количество попыток капчи: {result.attempts}")
 
         else:
-            # Неправильный ответ
-            attempts_count += 1
-
-            # Обновляем счётчик попыток
-            await update_captcha_attempts(user_id, attempts_count)
-
-            if attempts_count >= config.captcha_max_attempts:
-                # Превышено количество попыток
-                await callback.answer("🚫 Превышено количество попыток!")
-
-                # Очищаем хранилище
-                await clear_captcha_storage(user_id)
-
-                # Вызываем обработку после капчи (неудача)
-                from app.bot.handlers.user.commands.join_requests import process_after_captcha
-                asyncio.create_task(process_after_captcha(user_id, False))
-
-                logger.info(f"[id{user_id}] Превышено количество попыток капчи: {attempts_count}")
-
-            else:
-                # Ещё есть попытки
-                remaining = config.captcha_max_attempts - attempts_count
-                await callback.answer(f"❌ Неверно! Осталось попыток: {remaining}")
+            # Ещё есть попытки
+            remaining = captcha_store.max_attempts - result.attempts
+            await callback.answer(f"❌ Неверно! Осталось попыток: {remaining}")
 
     except Exception as e:
         logger.error(f"Ошибка в обработчике капчи: {e}", exc_info=True)
@@ -129,53 +103,14 @@ async def handle_captcha_answer(callback: CallbackQuery) -> None:
             pass
 
 
-async def update_captcha_attempts(user_id: int, attempts: int) -> None:
-    """Обновить счётчик попыток в Redis или памяти."""
-    config = get_config()
-
-    # Пытаемся Redis
-    redis = None
-    try:
-        redis = Redis.from_url(config.redis_url, decode_responses=True)
-        await redis.setex(f"captcha_attempts:{user_id}", 300, str(attempts))
-        return
-    except Exception:
-        pass
-    finally:
-        if redis:
-            await redis.close()
-
-    # Fallback в памяти
-    if 'in_memory_captcha_store' in globals():
-        store = globals()['in_memory_captcha_store']
-        if user_id in store:
-            store[user_id]['attempts'] = attempts
-
-
-async def clear_captcha_storage(user_id: int) -> None:
-    """Очистить хранилище капчи для пользователя."""
-    config = get_config()
-
-    # Пытаемся Redis
-    redis = None
-    try:
-        redis = Redis.from_url(config.redis_url, decode_responses=True)
-        await redis.delete(f"captcha:{user_id}")
-        await redis.delete(f"captcha_attempts:{user_id}")
-    except Exception:
-        pass
-    finally:
-        if redis:
-            await redis.close()
-
-    # Fallback в памяти
-    if 'in_memory_captcha_store' in globals():
-        store = globals()['in_memory_captcha_store']
-        if user_id in store:
-            del store[user_id]
-
 @router.callback_query(F.data.startswith("captcha_resend:"))
-async def resend_captcha(callback: CallbackQuery) -> None:
+async def resend_captcha(
+        callback: CallbackQuery,
+        captcha_store: CaptchaStore,
+        captcha_images: CaptchaImageCache,
+        captcha_pool: CaptchaPool,
+        captcha_timeouts: CaptchaTimeouts
+) -> None:
     """Переотправка капчи."""
     try:
         user_id = int(callback.data.split(":")[1])
@@ -185,7 +120,9 @@ async def resend_captcha(callback: CallbackQuery) -> None:
             return
 
         await callback.answer("🔄 Отправляем новую капчу...")
-        await send_captcha_to_user(callback.bot, user_id)
+        if await send_captcha_to_user(callback.bot, user_id, captcha_store, captcha_images, captcha_pool):
+            # Новая капча — новый срок
+            captcha_timeouts.schedule(user_id)
 
     except Exception as e:
         logger.error(f"Ошибка переотправки капчи: {e}")
@@ -1,27 +1,37 @@
 """Обработка заявок на вступление в группу."""
 
 import asyncio
-from datetime import datetime
+from functools import partial
 
-from aiogram import Router
+from aiogram import Bot, Router
 from aiogram.types import ChatJoinRequest
-from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
 from raito import Raito
-from collections import defaultdict
 
 from app.core import get_logger, get_config
 from app.database import get_session, crud
+from app.services.bulk_approve import approve_join_request, decline_join_request
 from app.services.captcha_service import send_captcha_to_user
+from app.services.captcha_generator import CaptchaPool
+from app.services.captcha_images import CaptchaImageCache
+from app.services.captcha_store import CaptchaStore
+from app.services.captcha_timeouts import CaptchaTimeouts
+from app.services.rate_limiter import Priority, get_rate_limiter
+from app.utils.templates import TemplateError, compile_template, user_template_values
 
 logger = get_logger(__name__)
 router = Router(name="join_requests_router")
 
 
-pending_join_requests = defaultdict(dict)
-
-
 @router.chat_join_request()
-async def handle_join_request(update: ChatJoinRequest, raito: Raito) -> None:
+async def handle_join_request(
+        update: ChatJoinRequest,
+        raito: Raito,
+        captcha_store: CaptchaStore,
+        captcha_images: CaptchaImageCache,
+        captcha_pool: CaptchaPool,
+        captcha_timeouts: CaptchaTimeouts
+) -> None:
     """
     Обработка новой заявки на вступление.
 
@@ -53,14 +63,23 @@ async def handle_join_request(update: ChatJoinRequest, raito: Raito) -> None:
     async for session in get_session():
         existing_user = await crud.get_user_by_chat_id(session, user.id)
         if not existing_user:
-            await crud.create_user(session, user.id, user.username)
+            await crud.create_user(session, user.id, user.username, user.first_name)
             logger.info(f"[id{user.id}] Пользователь зарегистрирован")
-
-    # Сохраняем ChatJoinRequest для возможного одобрения позже
-    pending_join_requests[user.id] = {
-        'request': update,
-        'timestamp': datetime.utcnow()
-    }
+        else:
+            # Имя и username могли смениться с прошлой заявки
+            existing_user.username = user.username
+            existing_user.first_name = user.first_name
+            if await crud.mark_user_reachable(session, user.id):
+                logger.info(f"[id{user.id}] Пользователь снова доступен для рассылок")
+
+        # Заявка ждёт капчи в БД: переживает рестарт, видна всем процессам бота
+        await crud.save_join_request(
+            session,
+            user_id=user.id,
+            chat_id=update.chat.id,
+            username=user.username,
+            first_name=user.first_name
+        )
 
     # ШАГ 1: Отправляем приветственное сообщение
     welcome_sent = await send_welcome(update)
@@ -74,7 +93,7 @@ async def handle_join_request(update: ChatJoinRequest, raito: Raito) -> None:
     await asyncio.sleep(3)
 
     # ШАГ 3: Отправляем капчу (ВСЕГДА)
-    captcha_sent = await send_captcha_to_user(update.bot, user.id)
+    captcha_sent = await send_captcha_to_user(update.bot, user.id, captcha_store, captcha_images, captcha_pool)
 
     if not captcha_sent:
         logger.error(f"[id{user.id}] Не удалось отправить капчу, отклоняем заявку")
@@ -82,102 +101,144 @@ async def handle_join_request(update: ChatJoinRequest, raito: Raito) -> None:
             await update.decline()
         except TelegramBadRequest:
             pass
-        # Удаляем из хранилища
-        if user.id in pending_join_requests:
-            del pending_join_requests[user.id]
+        # Удаляем из реестра
+        async for session in get_session():
+            await crud.pop_join_requests(session, user.id, chat_id=update.chat.id)
         return
 
+    # Без ответа за captcha_timeout_min заявка будет отклонена
+    captcha_timeouts.schedule(user.id)
     logger.info(f"[id{user.id}] Ожидаем прохождения капчи...")
 
 
-async def process_after_captcha(user_id: int, passed_successfully: bool) -> None:
+async def expire_captcha(user_id: int, bot: Bot, captcha_store: CaptchaStore) -> None:
+    """
+    Капча не решена за отведённое время: отклонить заявку.
+
+    Вызывается CaptchaTimeouts по истечении срока.
+    """
+    from app.database.models import CaptchaType
+
+    # Поздний ответ после этого получит «время истекло»
+    await captcha_store.clear(user_id)
+
+    async for session in get_session():
+        if not await crud.has_join_request(session, user_id):
+            return
+
+        logger.info(f"[id{user_id}] Капча не решена вовремя")
+        await crud.create_captcha_attempt(
+            session,
+            user_id=user_id,
+            chat_id=user_id,
+            captcha_type=CaptchaType.EMOJI,
+            is_successful=False,
+            attempts_count=0
+        )
+
+    await process_after_captcha(bot, user_id, False)
+
+
+async def process_after_captcha(bot: Bot, user_id: int, passed_successfully: bool) -> None:
     """
     Обработка после прохождения/непрохождения капчи.
 
+    Заявки пользователя (во все чаты) забираются из реестра — повторное
+    завершение капчи их уже не найдёт — и одобряются/отклоняются через
+    общий ограничитель по (chat_id, user_id). Если вызов упал не из-за
+    исчезнувшей заявки (сеть, RetryAfter сверх повторов), заявка не
+    теряется: отклонение возвращается в реестр (его повторит очистка),
+    одобрение — в очередь администратору.
+
     Args:
+        bot: Экземпляр бота
         user_id: ID пользователя
         passed_successfully: True если капча пройдена
     """
-    from app.database import get_session, crud
     from app.database.models import RequestStatus
 
-    if user_id not in pending_join_requests:
-        logger.warning(f"[id{user_id}] Нет сохранённого ChatJoinRequest")
-        return
+    async for session in get_session():
+        join_requests = await crud.pop_join_requests(session, user_id)
 
-    chat_join_request = pending_join_requests[user_id]['request']
+    if not join_requests:
+        logger.warning(f"[id{user_id}] Нет заявки, ожидающей капчи")
+        return
 
     if not passed_successfully:
-        # Капча не пройдена - отклоняем заявку
-        try:
-            await chat_join_request.decline()
-            logger.info(f"[id{user_id}] Заявка отклонена (капча не пройдена)")
-        except TelegramBadRequest as e:
-            logger.error(f"[id{user_id}] Ошибка отклонения заявки: {e}")
-
-        # Удаляем из хранилища
-        del pending_join_requests[user_id]
+        # Капча не пройдена - отклоняем заявки
+        for join_request in join_requests:
+            try:
+                await decline_join_request(bot, join_request.chat_id, user_id)
+                logger.info(f"[id{user_id}] Заявка отклонена (капча не пройдена)")
+            except TelegramBadRequest as e:
+                logger.warning(f"[id{user_id}] Заявка уже неактуальна: {e}")
+            except Exception as e:
+                logger.error(f"[id{user_id}] Ошибка отклонения заявки, вернём в реестр: {e}")
+                async for session in get_session():
+                    await crud.save_join_request(
+                        session,
+                        user_id=user_id,
+                        chat_id=join_request.chat_id,
+                        username=join_request.username,
+                        first_name=join_request.first_name
+                    )
         return
 
-    # Капча пройдена успешно
+    # Капча пройдена успешно: проверяем настройки автоприёма
     async for session in get_session():
-        # Проверяем настройки автоприёма
         settings = await crud.get_admin_settings(session, settings_id=1)
-        auto_accept = False
 
-        if settings and settings.applications is not None:
-            auto_accept = bool(settings.applications)
-        else:
-            auto_accept = get_config().auto_accept_default
+    if settings and settings.applications is not None:
+        auto_accept = bool(settings.applications)
+    else:
+        auto_accept = get_config().auto_accept_default
 
+    queued = False
+    for join_request in join_requests:
+        status = None
         if auto_accept:
-            # Автоприём ВКЛ - одобряем заявку
+            # Автоприём ВКЛ - одобряем заявку (вызов API — вне сессии)
             try:
-                await chat_join_request.approve()
+                await approve_join_request(bot, join_request.chat_id, user_id)
                 logger.info(f"[id{user_id}] Заявка автоматически одобрена (автоприём ВКЛ)")
-
-                # Записываем в БД как одобренную
-                await crud.create_pending_request(
-                    session,
-                    user_id=user_id,
-                    chat_id=chat_join_request.chat.id,
-                    username=chat_join_request.from_user.username,
-                    first_name=chat_join_request.from_user.first_name
-                )
-                # Обновляем статус на APPROVED
-                # Нужно получить ID созданной заявки
-
+                status = RequestStatus.APPROVED
             except TelegramBadRequest as e:
                 logger.error(f"[id{user_id}] Ошибка одобрения заявки: {e}")
+                continue
+            except Exception as e:
+                # Капча пройдена — не отклоняем, а оставляем администратору
+                logger.error(f"[id{user_id}] Заявка не одобрена, добавлена в очередь: {e}")
 
-        else:
-            # Автоприём ВЫКЛ - добавляем в очередь
-            try:
-                await crud.create_pending_request(
+        try:
+            async for session in get_session():
+                request = await crud.create_pending_request(
                     session,
                     user_id=user_id,
-                    chat_id=chat_join_request.chat.id,
-                    username=chat_join_request.from_user.username,
-                    first_name=chat_join_request.from_user.first_name
+                    chat_id=join_request.chat_id,
+                    username=join_request.username,
+                    first_name=join_request.first_name
                 )
-                logger.info(f"[id{user_id}] Заявка добавлена в очередь (автоприём ВЫКЛ)")
-
-                # Уведомляем пользователя
-                try:
-                    await chat_join_request.bot.send_message(
-                        user_id,
-                        "⏳ <b>Ваша заявка принята в обработку</b>\n\n"
-                        "Администратор рассмотрит её в ближайшее время."
-                    )
-                except TelegramForbiddenError:
-                    pass
-
-            except Exception as e:
-                logger.error(f"[id{user_id}] Ошибка сохранения заявки: {e}")
-
-    # Удаляем из хранилища независимо от результата
-    if user_id in pending_join_requests:
-        del pending_join_requests[user_id]
+                if status is not None:
+                    # Записываем в БД как одобренную
+                    await crud.update_request_status(session, request.id, status)
+        except Exception as e:
+            logger.error(f"[id{user_id}] Ошибка сохранения заявки: {e}")
+            continue
+
+        if status is None:
+            queued = True
+            logger.info(f"[id{user_id}] Заявка добавлена в очередь")
+
+    if queued:
+        # Уведомляем пользователя
+        try:
+            await bot.send_message(
+                user_id,
+                "⏳ <b>Ваша заявка принята в обработку</b>\n\n"
+                "Администратор рассмотрит её в ближайшее время."
+            )
+        except TelegramForbiddenError:
+            pass
 
 
 async def send_welcome(update: ChatJoinRequest) -> bool:
@@ -209,8 +270,16 @@ async def send_welcome(update: ChatJoinRequest) -> bool:
                 "Для доступа к группе пройдите простую проверку."
             )
         else:
-            # Персонализация {name}
-            text = text.replace("{name}", update.from_user.first_name or "друг")
+            # Персонализация: шаблон кэшируется по тексту и не разбирается заново
+            try:
+                text = compile_template(text).render(user_template_values(
+                    update.from_user.id,
+                    update.from_user.username,
+                    update.from_user.first_name,
+                    default_name="друг"
+                ))
+            except TemplateError as e:
+                logger.warning(f"Ошибка шаблона приветствия: {e}")
 
         # Парсим кнопки если есть
         markup = None
@@ -230,34 +299,24 @@ async def send_welcome(update: ChatJoinRequest) -> bool:
             except Exception as e:
                 logger.warning(f"Ошибка парсинга кнопок: {e}")
 
-        # Отправляем сообщение
+        # Отправляем сообщение через общий ограничитель
+        chat_id = update.from_user.id
         if photo:
             # С медиа
             if photo.startswith("AgAC"):
-                await update.bot.send_photo(
-                    update.from_user.id,
-                    photo=photo,
-                    caption=text,
-                    reply_markup=markup
-                )
+                call = partial(update.bot.send_photo, chat_id, photo=photo, caption=text, reply_markup=markup)
             else:
-                await update.bot.send_video(
-                    update.from_user.id,
-                    video=photo,
-                    caption=text,
-                    reply_markup=markup
-                )
+                call = partial(update.bot.send_video, chat_id, video=photo, caption=text, reply_markup=markup)
         else:
             # Только текст
-            await update.bot.send_message(
-                update.from_user.id,
-                text,
-                reply_markup=markup
-            )
+            call = partial(update.bot.send_message, chat_id, text, reply_markup=markup)
+
+        # Приветствие обгоняет рассылку, но уступает капче
+        await get_rate_limiter().send(chat_id, call, priority=Priority.NORMAL)
 
         logger.info(f"[id{update.from_user.id}] Приветствие отправлено")
         return True
 
-    except (TelegramBadRequest, TelegramForbiddenError) as e:
+    except (TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter) as e:
         logger.error(f"[id{update.from_user.id}] Не удалось отправить приветствие: {e}")
         return False
\ No newline at end of file
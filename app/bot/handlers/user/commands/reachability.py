@@ -0,0 +1,30 @@
+"""Отслеживание доступности пользователей для рассылок."""
+
+from aiogram import F, Router
+from aiogram.filters import KICKED, MEMBER, ChatMemberUpdatedFilter
+from aiogram.types import ChatMemberUpdated
+
+from app.core import get_logger
+from app.database import crud, get_session
+
+logger = get_logger(__name__)
+router = Router(name="reachability_router")
+
+
+@router.my_chat_member(F.chat.type == "private", ChatMemberUpdatedFilter(member_status_changed=KICKED))
+async def bot_blocked(event: ChatMemberUpdated) -> None:
+    """Пользователь заблокировал бота — исключаем его из рассылок."""
+    async for session in get_session():
+        await crud.mark_users_unreachable(session, [event.chat.id])
+
+    logger.info(f"[id{event.chat.id}] Пользователь заблокировал бота")
+
+
+@router.my_chat_member(F.chat.type == "private", ChatMemberUpdatedFilter(member_status_changed=MEMBER))
+async def bot_unblocked(event: ChatMemberUpdated) -> None:
+    """Пользователь разблокировал бота — снова получает рассылки."""
+    async for session in get_session():
+        restored = await crud.mark_user_reachable(session, event.chat.id)
+
+    if restored:
+        logger.info(f"[id{event.chat.id}] Пользователь разблокировал бота")
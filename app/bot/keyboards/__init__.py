@@ -4,10 +4,15 @@ from .inline import (
     get_settings_menu,
     get_broadcast_controls,
     get_broadcast_cancel,
+    get_broadcast_job_controls,
+    get_broadcast_confirm_keyboard,
+    get_broadcast_history_pagination,
+    get_broadcast_segment_keyboard,
     get_confirm_buttons,
     get_request_controls,
     get_requests_pagination,
     parse_buttons_from_text,
+    build_buttons_markup,
 )
 
 from .reply import (
@@ -23,10 +28,15 @@ __all__ = [
     "get_settings_menu",
     "get_broadcast_controls",
     "get_broadcast_cancel",
+    "get_broadcast_job_controls",
+    "get_broadcast_confirm_keyboard",
+    "get_broadcast_history_pagination",
+    "get_broadcast_segment_keyboard",
     "get_confirm_buttons",
     "get_request_controls",
     "get_requests_pagination",
     "parse_buttons_from_text",
+    "build_buttons_markup",
     # Reply
     "get_admin_reply_menu",
     "get_captcha_keyboard",
@@ -1,6 +1,8 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
+from app.database import RequestStatus, Segment
+
 
 
 
@@ -72,6 +74,82 @@ def get_broadcast_cancel() -> InlineKeyboardMarkup:
     ])
 
 
+def get_broadcast_confirm_keyboard(dry_run: bool = True) -> InlineKeyboardMarkup:
+    """Подтверждение рассылки: запуск, отмена, отложенный запуск и пробный прогон."""
+    rows = [
+        [
+            InlineKeyboardButton(text="✅ Запустить", callback_data="broadcast:confirm_send"),
+            InlineKeyboardButton(text="❌ Отменить", callback_data="broadcast:cancel")
+        ],
+        [
+            InlineKeyboardButton(text="🎯 Аудитория", callback_data="broadcast:segment"),
+            InlineKeyboardButton(text="🕒 Запланировать", callback_data="broadcast:schedule")
+        ]
+    ]
+    if dry_run:
+        rows.append([InlineKeyboardButton(text="🧪 Пробный прогон", callback_data="broadcast:dry_run")])
+
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+def get_broadcast_segment_keyboard(segment: Segment) -> InlineKeyboardMarkup:
+    """Выбор аудитории рассылки (переключатели условий сегмента)."""
+    def mark(enabled: bool) -> str:
+        return "✅" if enabled else "▫️"
+
+    request_labels = {
+        None: "любая",
+        RequestStatus.PENDING: "на рассмотрении",
+        RequestStatus.APPROVED: "одобрена",
+    }
+    dates_active = bool(segment.registered_from or segment.registered_to)
+
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(
+            text=f"{mark(dates_active)} 📅 Период регистрации",
+            callback_data="broadcast:segment:dates"
+        )],
+        [InlineKeyboardButton(
+            text=f"📨 Заявка: {request_labels.get(segment.request_status, 'любая')}",
+            callback_data="broadcast:segment:request"
+        )],
+        [InlineKeyboardButton(
+            text=f"{mark(segment.passed_captcha)} 🧩 Прошли капчу",
+            callback_data="broadcast:segment:captcha"
+        )],
+        [InlineKeyboardButton(
+            text=f"🔕 Не получали последние: {segment.skip_recent or 'выкл'}",
+            callback_data="broadcast:segment:recent"
+        )],
+        [InlineKeyboardButton(
+            text=f"{mark(segment.has_username)} 👤 Есть username",
+            callback_data="broadcast:segment:username"
+        )],
+        [
+            InlineKeyboardButton(text="♻️ Сбросить", callback_data="broadcast:segment:reset"),
+            InlineKeyboardButton(text="✅ Готово", callback_data="broadcast:send")
+        ]
+    ])
+
+
+def get_broadcast_job_controls(job_id: int, paused: bool = False, scheduled: bool = False) -> InlineKeyboardMarkup:
+    """Управление запущенной рассылкой (пауза/продолжить + остановка)."""
+    if scheduled:
+        # Отложенную рассылку можно только отменить
+        return InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(text=f"⛔ Отменить #{job_id}", callback_data=f"broadcast:stop:{job_id}")]
+        ])
+
+    if paused:
+        toggle = InlineKeyboardButton(text=f"▶️ Продолжить #{job_id}", callback_data=f"broadcast:resume:{job_id}")
+    else:
+        toggle = InlineKeyboardButton(text=f"⏸️ Пауза #{job_id}", callback_data=f"broadcast:pause:{job_id}")
+
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [toggle, InlineKeyboardButton(text="⛔ Остановить", callback_data=f"broadcast:stop:{job_id}")]
+    ])
+
+
 def get_confirm_buttons(action: str, data: str = "") -> InlineKeyboardMarkup:
     """Кнопки подтверждения действия."""
     builder = InlineKeyboardBuilder()
@@ -129,6 +207,28 @@ def get_requests_pagination(current_page: int, total_pages: int) -> InlineKeyboa
     return builder.as_markup()
 
 
+def get_broadcast_history_pagination(current_page: int, total_pages: int) -> InlineKeyboardMarkup:
+    """Пагинация истории рассылок."""
+    builder = InlineKeyboardBuilder()
+
+    buttons = []
+
+    if current_page > 1:
+        buttons.append(InlineKeyboardButton(text="⬅️", callback_data=f"broadcast:history:{current_page - 1}"))
+
+    buttons.append(InlineKeyboardButton(text=f"{current_page}/{total_pages}", callback_data=f"broadcast:history:{current_page}"))
+
+    if current_page < total_pages:
+        buttons.append(InlineKeyboardButton(text="➡️", callback_data=f"broadcast:history:{current_page + 1}"))
+
+    builder.row(*buttons)
+    builder.row(
+        InlineKeyboardButton(text="🔙 Назад", callback_data="admin:broadcast")
+    )
+
+    return builder.as_markup()
+
+
 def parse_buttons_from_text(text: str) -> InlineKeyboardMarkup | None:
     """
     Парсинг кнопок из текста.
@@ -157,4 +257,36 @@ def parse_buttons_from_text(text: str) -> InlineKeyboardMarkup | None:
     if not buttons:
         return None
 
-    return InlineKeyboardMarkup(inline_keyboard=buttons)
\ No newline at end of file
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+def build_buttons_markup(buttons_json: str | None) -> InlineKeyboardMarkup | None:
+    """
+    Собрать клавиатуру из JSON-строки кнопок (формат поля buttons в БД).
+
+    Формат: [[{"text": "...", "url": "..."}, ...], ...]
+
+    Returns:
+        InlineKeyboardMarkup или None если кнопок нет
+    """
+    import json
+
+    if not buttons_json or buttons_json == '[]':
+        return None
+
+    rows = []
+    for row in json.loads(buttons_json):
+        buttons = []
+        for button in row:
+            url = button['url']
+            if not url.startswith(("http://", "https://")):
+                url = f"https://{url}"
+            buttons.append(InlineKeyboardButton(text=button['text'], url=url))
+
+        if buttons:
+            rows.append(buttons)
+
+    if not rows:
+        return None
+
+    return InlineKeyboardMarkup(inline_keyboard=rows)
@@ -1,6 +1,8 @@
+from .album import AlbumMiddleware
 from .logging import LoggingMiddleware, ThrottlingMiddleware
 
 __all__ = [
+    "AlbumMiddleware",
     "LoggingMiddleware",
     "ThrottlingMiddleware",
 ]
\ No newline at end of file
@@ -0,0 +1,50 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List
+
+from aiogram import BaseMiddleware
+from aiogram.types import Message, TelegramObject
+
+from app.core import get_logger
+
+logger = get_logger(__name__)
+
+
+class AlbumMiddleware(BaseMiddleware):
+    """
+    Middleware для сборки альбомов (media group).
+
+    Telegram присылает альбом отдельными сообщениями с общим media_group_id.
+    Первое сообщение ждёт остальные latency секунд и передаётся в handler
+    со всем альбомом в data["album"], остальные поглощаются.
+    """
+
+    def __init__(self, latency: float = 0.6):
+        """
+        Args:
+            latency: Сколько ждать остальные части альбома (секунды)
+        """
+        self.latency = latency
+        self.albums: Dict[str, List[Message]] = {}
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any],
+    ) -> Any:
+        """Собираем части альбома в одно событие."""
+        if not isinstance(event, Message) or not event.media_group_id:
+            return await handler(event, data)
+
+        album = self.albums.get(event.media_group_id)
+        if album is not None:
+            # Часть уже собираемого альбома
+            album.append(event)
+            return None
+
+        self.albums[event.media_group_id] = [event]
+        await asyncio.sleep(self.latency)
+        album = self.albums.pop(event.media_group_id)
+
+        data["album"] = sorted(album, key=lambda m: m.message_id)
+        return await handler(event, data)
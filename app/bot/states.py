@@ -5,6 +5,8 @@ class BroadcastStates(StatesGroup):
     waiting_content = State()
     preview = State()
     confirm = State()
+    waiting_schedule = State()  # Ожидание времени отложенного запуска
+    waiting_segment_dates = State()  # Ожидание периода регистрации для сегмента
     running = State()
 
 
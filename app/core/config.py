@@ -32,6 +32,8 @@ class Config(BaseSettings):
         default="redis://localhost:6379/0",
         description="Redis URL for FSM and cache"
     )
+    redis_max_connections: int = Field(default=20, description="Shared Redis connection pool size")
+    redis_socket_timeout: float = Field(default=2.0, description="Redis command and pool wait timeout (seconds)")
 
     # === Features Toggles ===
     auto_accept_default: bool = Field(default=False, description="Auto-accept join requests by default")
@@ -40,11 +42,36 @@ class Config(BaseSettings):
     # === Captcha Settings ===
     captcha_timeout_min: int = Field(default=5, description="Captcha timeout in minutes")
     captcha_max_attempts: int = Field(default=3, description="Max captcha attempts before ban")
+    captcha_stateless: bool = Field(default=False, description="Sign captcha answers into callback_data instead of storing them")
+    captcha_secret: str = Field(default="", description="HMAC key for stateless captcha (defaults to bot token)")
+    captcha_memory_max_size: int = Field(default=10000, description="Max captchas kept in memory while Redis is down")
+    captcha_memory_sweep_interval: float = Field(default=30.0, description="Expired in-memory captcha cleanup period (seconds)")
+    join_request_ttl_min: int = Field(default=60, description="Join requests still waiting for captcha are declined after this")
+    join_request_cleanup_interval_min: int = Field(default=5, description="Stale join request cleanup period in minutes")
+    captcha_generator_enabled: bool = Field(default=True, description="Procedural captcha images (needs Pillow)")
+    captcha_pool_size: int = Field(default=50, description="Pre-rendered captchas kept ready")
+    captcha_pool_low_water: int = Field(default=20, description="Refill the captcha pool below this size")
+    captcha_pool_workers: int = Field(default=2, description="Captcha render processes")
+    captcha_image_reuse: int = Field(default=1, description="Users shown one generated captcha image")
 
     # === Broadcast Settings ===
-    broadcast_semaphore_limit: int = Field(default=5, description="Concurrent broadcast tasks")
-    broadcast_delay: float = Field(default=0.036, description="Delay between messages (seconds)")
-    broadcast_retry_attempts: int = Field(default=2, description="Retry attempts for failed sends")
+    broadcast_semaphore_limit: int = Field(default=5, description="Concurrent broadcast sender workers")
+    broadcast_batch_size: int = Field(default=500, description="Recipients fetched from DB per chunk")
+    broadcast_retry_attempts: int = Field(default=2, description="Retries per recipient for transient send errors")
+    broadcast_retry_base_delay: float = Field(default=1.0, description="First retry delay for transient send errors (seconds)")
+    broadcast_retry_max_delay: float = Field(default=30.0, description="Max retry backoff delay (seconds)")
+    broadcast_progress_interval: float = Field(default=5.0, description="Min seconds between progress edits")
+    broadcast_log_batch_size: int = Field(default=200, description="Delivery log rows per INSERT")
+    broadcast_log_flush_interval: float = Field(default=0.5, description="Max seconds before delivery log flush")
+
+    # === Join Requests ===
+    bulk_approve_concurrency: int = Field(default=5, description="Concurrent approve_chat_join_request calls in bulk approve")
+    bulk_approve_batch_size: int = Field(default=500, description="Queued requests fetched from DB per bulk approve chunk")
+
+    # === Rate Limits ===
+    telegram_global_rate: float = Field(default=30.0, description="Global outbound messages per second")
+    telegram_per_chat_rate: float = Field(default=1.0, description="Outbound messages per second to one chat")
+    telegram_bulk_reserve: float = Field(default=3.0, description="Tokens broadcasts leave for captcha/welcome")
 
     # === Notifications ===
     notify_interval_min: int = Field(default=10, description="Notification interval in minutes")
@@ -56,6 +83,7 @@ class Config(BaseSettings):
     # === Options ===
     debug: bool = Field(default=False, description="Debug mode")
     log_level: str = Field(default="INFO", description="Logging level")
+    timezone: str = Field(default="UTC", description="Timezone for admin-facing times (scheduling)")
 
     @field_validator("developers", "admin_ids", mode="before")
     @classmethod
@@ -8,7 +8,13 @@ from .models import (
     RequestStatus,
     CaptchaType,
     CaptchaAttempt,
+    JoinRequest,
+    BroadcastStatus,
+    BroadcastJob,
+    DeliveryStatus,
+    BroadcastDelivery,
 )
+from .segments import Segment
 from .session import init_db, get_session, close_db
 from . import crud
 
@@ -21,6 +27,12 @@ __all__ = [
     "RequestStatus",
     "CaptchaType",
     "CaptchaAttempt",
+    "JoinRequest",
+    "BroadcastStatus",
+    "BroadcastJob",
+    "DeliveryStatus",
+    "BroadcastDelivery",
+    "Segment",
     # Session
     "init_db",
     "get_session",
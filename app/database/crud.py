@@ -1,9 +1,10 @@
 """CRUD операции для всех моделей."""
 
+import json
 from datetime import datetime, timedelta
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Union
 
-from sqlalchemy import select, update, func
+from sqlalchemy import Row, select, update, delete, func, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .models import (
@@ -12,8 +13,14 @@ from .models import (
     PendingRequest,
     RequestStatus,
     CaptchaType,
-    CaptchaAttempt
+    CaptchaAttempt,
+    JoinRequest,
+    BroadcastStatus,
+    BroadcastJob,
+    DeliveryStatus,
+    BroadcastDelivery
 )
+from .segments import Segment
 from ..core import get_logger
 
 
@@ -25,12 +32,18 @@ async def get_user_by_chat_id(session: AsyncSession, chat_id: int) -> Optional[U
     return result.scalar_one_or_none()
 
 
-async def create_user(session: AsyncSession, chat_id: int, username: Optional[str] = None) -> User:
+async def create_user(
+        session: AsyncSession,
+        chat_id: int,
+        username: Optional[str] = None,
+        first_name: Optional[str] = None
+) -> User:
     """Создать нового пользователя."""
     registration_date = datetime.now().strftime("%d.%m.%Y")
     user = User(
         chat_id=chat_id,
         username=username,
+        first_name=first_name,
         registration_date=registration_date
     )
     session.add(user)
@@ -44,6 +57,98 @@ async def get_all_chat_ids(session: AsyncSession) -> List[int]:
     return [row[0] for row in result.all()]
 
 
+async def get_broadcast_recipients(
+        session: AsyncSession,
+        after_id: int = 0,
+        limit: int = 500,
+        segment: Optional[Segment] = None
+) -> List[Row]:
+    """
+    Порция получателей рассылки (keyset-пагинация по users.id).
+
+    Args:
+        after_id: id последнего обработанного пользователя
+        limit: Размер порции
+        segment: Фильтр аудитории (None — все доступные пользователи)
+
+    Returns:
+        Строки (id, chat_id, username, first_name), отсортированные по id —
+        всё, что нужно для персонализации, без дополнительных запросов
+    """
+    result = await session.execute(
+        select(User.id, User.chat_id, User.username, User.first_name)
+        .where(User.is_reachable.is_(True), User.id > after_id, *_segment_conditions(segment))
+        .order_by(User.id)
+        .limit(limit)
+    )
+    return list(result.all())
+
+
+async def count_broadcast_recipients(
+        session: AsyncSession,
+        after_id: int = 0,
+        segment: Optional[Segment] = None
+) -> int:
+    """Количество получателей рассылки (сегмента) после курсора after_id."""
+    result = await session.execute(
+        select(func.count(User.id))
+        .where(User.is_reachable.is_(True), User.id > after_id, *_segment_conditions(segment))
+    )
+    return result.scalar() or 0
+
+
+async def get_recipients_by_ids(session: AsyncSession, user_ids: List[int]) -> List[Row]:
+    """
+    Получатели по users.id (отложенные повторы прерванной рассылки).
+
+    Returns:
+        Строки как у get_broadcast_recipients, только доступные пользователи
+    """
+    if not user_ids:
+        return []
+
+    result = await session.execute(
+        select(User.id, User.chat_id, User.username, User.first_name)
+        .where(User.id.in_(user_ids), User.is_reachable.is_(True))
+        .order_by(User.id)
+    )
+    return list(result.all())
+
+
+def _segment_conditions(segment: Optional[Segment]) -> List:
+    return segment.conditions() if segment else []
+
+
+async def mark_users_unreachable(session: AsyncSession, chat_ids: List[int]) -> int:
+    """Пометить пользователей недоступными (одним UPDATE на пачку)."""
+    if not chat_ids:
+        return 0
+
+    stmt = (
+        update(User)
+        .where(User.chat_id.in_(chat_ids), User.is_reachable.is_(True))
+        .values(is_reachable=False, unreachable_since=datetime.utcnow())
+    )
+    result = await session.execute(stmt)
+    return result.rowcount
+
+
+async def mark_user_reachable(session: AsyncSession, chat_id: int) -> bool:
+    """
+    Вернуть пользователя в рассылки (он снова взаимодействует с ботом).
+
+    Returns:
+        True если пользователь был помечен недоступным
+    """
+    stmt = (
+        update(User)
+        .where(User.chat_id == chat_id, User.is_reachable.is_(False))
+        .values(is_reachable=True, unreachable_since=None)
+    )
+    result = await session.execute(stmt)
+    return result.rowcount > 0
+
+
 async def get_users_count(session: AsyncSession) -> int:
     """Общее количество пользователей."""
     result = await session.execute(select(func.count(User.id)))
@@ -225,16 +330,53 @@ async def get_pending_requests(
     return list(result.scalars().all())
 
 
-async def get_pending_count(session: AsyncSession, status: Optional[RequestStatus] = None) -> int:
-    """Количество заявок по статусу."""
+async def get_pending_count(
+        session: AsyncSession,
+        status: Optional[RequestStatus] = None,
+        has_username: Optional[bool] = None
+) -> int:
+    """Количество заявок по статусу (и наличию username)."""
     query = select(func.count(PendingRequest.id))
     if status:
         query = query.where(PendingRequest.status == status)
+    if has_username is not None:
+        query = query.where(_has_username_condition(has_username))
 
     result = await session.execute(query)
     return result.scalar() or 0
 
 
+def _has_username_condition(has_username: bool):
+    if has_username:
+        return PendingRequest.username.is_not(None) & (PendingRequest.username != "")
+    return PendingRequest.username.is_(None) | (PendingRequest.username == "")
+
+
+async def get_pending_request_chunk(
+        session: AsyncSession,
+        after_id: int = 0,
+        limit: int = 500,
+        has_username: Optional[bool] = None
+) -> List[Row]:
+    """
+    Очередные PENDING заявки по возрастанию id (keyset-пагинация).
+
+    Returns:
+        Строки (id, user_id, chat_id)
+    """
+    query = (
+        select(PendingRequest.id, PendingRequest.user_id, PendingRequest.chat_id)
+        .where(PendingRequest.status == RequestStatus.PENDING, PendingRequest.id > after_id)
+        .order_by(PendingRequest.id)
+        .limit(limit)
+    )
+    if has_username is not None:
+        query = query.where(_has_username_condition(has_username))
+
+    result = await session.execute(query)
+    return list(result.all())
+
+
 async def update_request_status(
         session: AsyncSession,
         request_id: int,
@@ -295,3 +437,304 @@ async def create_captcha_attempt(
     return attempt
 
 
+# ==================== JOIN REQUESTS ====================
+
+async def save_join_request(
+        session: AsyncSession,
+        user_id: int,
+        chat_id: int,
+        username: Optional[str] = None,
+        first_name: Optional[str] = None
+) -> JoinRequest:
+    """Запомнить заявку до прохождения капчи (повторная — обновляет время)."""
+    result = await session.execute(
+        select(JoinRequest).where(JoinRequest.user_id == user_id, JoinRequest.chat_id == chat_id)
+    )
+    request = result.scalar_one_or_none()
+    if request is None:
+        request = JoinRequest(user_id=user_id, chat_id=chat_id)
+        session.add(request)
+
+    request.username = username
+    request.first_name = first_name
+    request.created_at = datetime.utcnow()
+    await session.flush()
+    return request
+
+
+async def has_join_request(session: AsyncSession, user_id: int) -> bool:
+    """Есть ли у пользователя заявки, ожидающие капчи."""
+    result = await session.execute(
+        select(JoinRequest.id).where(JoinRequest.user_id == user_id).limit(1)
+    )
+    return result.scalar() is not None
+
+
+async def pop_join_requests(
+        session: AsyncSession,
+        user_id: int,
+        chat_id: Optional[int] = None
+) -> List[Row]:
+    """
+    Забрать заявки пользователя (все или в один чат).
+
+    DELETE ... RETURNING — одна атомарная операция: заявку обработает
+    только тот, кто её забрал, даже если капчу завершили дважды.
+
+    Returns:
+        Строки (user_id, chat_id, username, first_name)
+    """
+    stmt = delete(JoinRequest).where(JoinRequest.user_id == user_id)
+    if chat_id is not None:
+        stmt = stmt.where(JoinRequest.chat_id == chat_id)
+
+    result = await session.execute(stmt.returning(
+        JoinRequest.user_id,
+        JoinRequest.chat_id,
+        JoinRequest.username,
+        JoinRequest.first_name
+    ))
+    return list(result.all())
+
+
+async def pop_expired_join_requests(session: AsyncSession, before: datetime, limit: int = 500) -> List[Row]:
+    """
+    Забрать заявки, созданные раньше before (не больше limit).
+
+    Returns:
+        Строки (user_id, chat_id, username, first_name)
+    """
+    expired_ids = (
+        select(JoinRequest.id)
+        .where(JoinRequest.created_at < before)
+        .order_by(JoinRequest.created_at)
+        .limit(limit)
+    )
+    result = await session.execute(
+        delete(JoinRequest)
+        .where(JoinRequest.id.in_(expired_ids))
+        .returning(JoinRequest.user_id, JoinRequest.chat_id, JoinRequest.username, JoinRequest.first_name)
+    )
+    return list(result.all())
+
+
+# ==================== BROADCAST JOBS ====================
+
+async def create_broadcast_job(
+        session: AsyncSession,
+        admin_id: int,
+        text: str,
+        photo_id: Optional[str] = None,
+        buttons: str = "[]",
+        source_chat_id: Optional[int] = None,
+        source_message_ids: Optional[List[int]] = None,
+        scheduled_at: Optional[datetime] = None,
+        segment: Optional[Segment] = None
+) -> BroadcastJob:
+    """
+    Создать рассылку (в статусе QUEUED или SCHEDULED, если указан scheduled_at).
+
+    Если переданы source_chat_id и source_message_ids, рассылка копирует
+    исходное сообщение (copy_message), а text служит только для превью.
+    segment ограничивает получателей (None — все пользователи).
+    """
+    job = BroadcastJob(
+        admin_id=admin_id,
+        text=text,
+        photo_id=photo_id,
+        buttons=buttons,
+        source_chat_id=source_chat_id,
+        source_message_ids=json.dumps(source_message_ids) if source_message_ids else None,
+        scheduled_at=scheduled_at,
+        segment=segment.to_json() if segment else None,
+        status=BroadcastStatus.SCHEDULED if scheduled_at else BroadcastStatus.QUEUED
+    )
+    session.add(job)
+    await session.flush()
+    return job
+
+
+async def get_broadcast_job(session: AsyncSession, job_id: int) -> Optional[BroadcastJob]:
+    """Получить рассылку по id."""
+    return await session.get(BroadcastJob, job_id)
+
+
+async def get_next_broadcast_job(session: AsyncSession) -> Optional[BroadcastJob]:
+    """
+    Следующая рассылка для запуска.
+
+    Сначала прерванные (RUNNING — бот упал или перезапустился), затем
+    очередь QUEUED в порядке создания. PAUSED пропускаются.
+    """
+    query = (
+        select(BroadcastJob)
+        .where(BroadcastJob.status.in_([BroadcastStatus.RUNNING, BroadcastStatus.QUEUED]))
+        .order_by((BroadcastJob.status == BroadcastStatus.RUNNING).desc(), BroadcastJob.id)
+        .limit(1)
+    )
+    result = await session.execute(query)
+    return result.scalar_one_or_none()
+
+
+async def get_active_broadcast_jobs(session: AsyncSession) -> List[BroadcastJob]:
+    """Незавершённые рассылки (идущие, на паузе, в очереди и запланированные)."""
+    query = (
+        select(BroadcastJob)
+        .where(BroadcastJob.status.in_([
+            BroadcastStatus.RUNNING,
+            BroadcastStatus.PAUSED,
+            BroadcastStatus.QUEUED,
+            BroadcastStatus.SCHEDULED
+        ]))
+        .order_by(BroadcastJob.id)
+    )
+    result = await session.execute(query)
+    return list(result.scalars().all())
+
+
+async def get_next_scheduled_time(session: AsyncSession) -> Optional[datetime]:
+    """Время ближайшей запланированной рассылки (по индексу status, scheduled_at)."""
+    query = select(func.min(BroadcastJob.scheduled_at)).where(
+        BroadcastJob.status == BroadcastStatus.SCHEDULED
+    )
+    result = await session.execute(query)
+    return result.scalar()
+
+
+async def release_due_broadcast_jobs(session: AsyncSession, now: datetime) -> int:
+    """
+    Перевести наступившие запланированные рассылки в очередь.
+
+    Returns:
+        Количество рассылок, переведённых в QUEUED
+    """
+    stmt = (
+        update(BroadcastJob)
+        .where(
+            BroadcastJob.status == BroadcastStatus.SCHEDULED,
+            BroadcastJob.scheduled_at <= now
+        )
+        .values(status=BroadcastStatus.QUEUED)
+    )
+    result = await session.execute(stmt)
+    return result.rowcount
+
+
+async def update_broadcast_status(
+        session: AsyncSession,
+        job_id: int,
+        status: BroadcastStatus
+) -> Optional[BroadcastJob]:
+    """Обновить статус рассылки (с отметками времени старта/завершения)."""
+    job = await session.get(BroadcastJob, job_id)
+    if job:
+        job.status = status
+        if status == BroadcastStatus.RUNNING and job.started_at is None:
+            job.started_at = datetime.utcnow()
+        elif status in (BroadcastStatus.COMPLETED, BroadcastStatus.CANCELLED):
+            job.finished_at = datetime.utcnow()
+        await session.flush()
+    return job
+
+
+async def checkpoint_broadcast_job(
+        session: AsyncSession,
+        job_id: int,
+        last_user_id: int,
+        sent_count: int,
+        failed_count: int,
+        pending_retries: Optional[List[List[int]]] = None
+) -> None:
+    """
+    Сохранить курсор, счётчики и отложенные повторы рассылки одним UPDATE.
+
+    Args:
+        pending_retries: [[users.id, попытка], ...] получателей до курсора,
+            ещё ждущих повтора (None или пусто — повторов нет)
+    """
+    stmt = (
+        update(BroadcastJob)
+        .where(BroadcastJob.id == job_id)
+        .values(
+            last_user_id=last_user_id,
+            sent_count=sent_count,
+            failed_count=failed_count,
+            pending_retries=json.dumps(pending_retries) if pending_retries else None
+        )
+    )
+    await session.execute(stmt)
+
+
+async def get_finished_broadcast_jobs(
+        session: AsyncSession,
+        offset: int = 0,
+        limit: int = 5
+) -> List[BroadcastJob]:
+    """Завершённые рассылки для истории (новые сверху)."""
+    query = (
+        select(BroadcastJob)
+        .where(BroadcastJob.status.in_([BroadcastStatus.COMPLETED, BroadcastStatus.CANCELLED]))
+        .order_by(BroadcastJob.id.desc())
+        .offset(offset)
+        .limit(limit)
+    )
+    result = await session.execute(query)
+    return list(result.scalars().all())
+
+
+async def count_finished_broadcast_jobs(session: AsyncSession) -> int:
+    """Количество завершённых рассылок."""
+    query = select(func.count(BroadcastJob.id)).where(
+        BroadcastJob.status.in_([BroadcastStatus.COMPLETED, BroadcastStatus.CANCELLED])
+    )
+    result = await session.execute(query)
+    return result.scalar() or 0
+
+
+# ==================== BROADCAST DELIVERIES ====================
+
+async def add_broadcast_deliveries(session: AsyncSession, rows: List[Dict]) -> None:
+    """Записать пачку доставок одним многострочным INSERT."""
+    if rows:
+        await session.execute(insert(BroadcastDelivery).values(rows))
+
+
+async def get_delivery_stats(session: AsyncSession, job_ids: List[int]) -> Dict[int, Dict]:
+    """
+    Агрегированная статистика доставки по рассылкам (один GROUP BY).
+
+    Returns:
+        {job_id: {"sent": int, "failed": int, "errors": {error_code: count}, "avg_latency_ms": float}}
+    """
+    if not job_ids:
+        return {}
+
+    query = (
+        select(
+            BroadcastDelivery.job_id,
+            BroadcastDelivery.status,
+            BroadcastDelivery.error_code,
+            func.count(BroadcastDelivery.id),
+            func.avg(BroadcastDelivery.latency_ms)
+        )
+        .where(BroadcastDelivery.job_id.in_(job_ids))
+        .group_by(BroadcastDelivery.job_id, BroadcastDelivery.status, BroadcastDelivery.error_code)
+    )
+    result = await session.execute(query)
+
+    stats: Dict[int, Dict] = {}
+    latency_totals: Dict[int, float] = {}
+    for job_id, status, error_code, count, avg_latency in result.all():
+        job_stats = stats.setdefault(job_id, {"sent": 0, "failed": 0, "errors": {}, "avg_latency_ms": 0.0})
+        if status == DeliveryStatus.SENT:
+            job_stats["sent"] += count
+        else:
+            job_stats["failed"] += count
+            job_stats["errors"][error_code] = job_stats["errors"].get(error_code, 0) + count
+        latency_totals[job_id] = latency_totals.get(job_id, 0.0) + (avg_latency or 0) * count
+
+    for job_id, job_stats in stats.items():
+        delivered = job_stats["sent"] + job_stats["failed"]
+        job_stats["avg_latency_ms"] = latency_totals[job_id] / delivered if delivered else 0.0
+
+    return stats
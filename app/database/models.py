@@ -4,7 +4,7 @@ from datetime import datetime
 from enum import Enum as PyEnum
 from typing import Optional
 
-from sqlalchemy import String, Integer, Boolean, Text, DateTime, Enum, Index
+from sqlalchemy import String, Integer, Boolean, Text, DateTime, Enum, Index, true
 from sqlalchemy.orm import Mapped, mapped_column
 
 from .base import Base
@@ -18,8 +18,20 @@ class User(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     username: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    # Имя из Telegram — для {name}/{first_name} в рассылках
+    first_name: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
     chat_id: Mapped[int] = mapped_column(Integer, unique=True, nullable=False, index=True)
     registration_date: Mapped[str] = mapped_column(String(50), nullable=False)  # Формат: DD.MM.YYYY
+    # False — бот заблокирован / аккаунт удалён, в рассылки не попадает
+    is_reachable: Mapped[bool] = mapped_column(Boolean, default=True, server_default=true(), nullable=False)
+    unreachable_since: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    # registration_date как DateTime — для индексируемых диапазонов в сегментах рассылки
+    registered_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=datetime.utcnow, nullable=True)
+
+    __table_args__ = (
+        Index('idx_users_reachable_id', 'is_reachable', 'id'),
+        Index('idx_users_registered_at', 'registered_at'),
+    )
 
     def __repr__(self) -> str:
         return f"<User(id={self.id}, chat_id={self.chat_id}, username={self.username})>"
@@ -71,6 +83,7 @@ class PendingRequest(Base):
 
     __table_args__ = (
         Index('idx_status_time', 'status', 'request_time'),
+        Index('idx_requests_user_status', 'user_id', 'status'),
     )
 
     def __repr__(self) -> str:
@@ -98,7 +111,112 @@ class CaptchaAttempt(Base):
 
     __table_args__ = (
         Index('idx_user_time', 'user_id', 'attempt_time'),
+        Index('idx_captcha_user_success', 'user_id', 'is_successful'),
+    )
+
+    def __repr__(self) -> str:
+        return f"<CaptchaAttempt(user_id={self.user_id}, successful={self.is_successful})>"
+
+
+# ==================== ЗАЯВКИ В ОЖИДАНИИ КАПЧИ ====================
+class JoinRequest(Base):
+    """
+    Заявка на вступление, ожидающая капчи.
+
+    Хранит только то, что нужно для approve/decline_chat_join_request
+    и записи в очередь заявок. Одна строка на (пользователь, чат).
+    """
+
+    __tablename__ = "join_requests"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    chat_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    username: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    first_name: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index('idx_join_requests_user_chat', 'user_id', 'chat_id', unique=True),
+        Index('idx_join_requests_created', 'created_at'),
+    )
+
+    def __repr__(self) -> str:
+        return f"<JoinRequest(user_id={self.user_id}, chat_id={self.chat_id})>"
+
+
+# ==================== РАССЫЛКИ ====================
+class BroadcastStatus(PyEnum):
+    """Статусы рассылок."""
+    SCHEDULED = "scheduled"
+    QUEUED = "queued"
+    RUNNING = "running"
+    PAUSED = "paused"
+    COMPLETED = "completed"
+    CANCELLED = "cancelled"
+
+
+class BroadcastJob(Base):
+    """Рассылка с курсором прогресса (для возобновления после рестарта)."""
+
+    __tablename__ = "broadcast_jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    admin_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    status: Mapped[BroadcastStatus] = mapped_column(
+        Enum(BroadcastStatus),
+        default=BroadcastStatus.QUEUED,
+        nullable=False,
+        index=True
+    )
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+    photo_id: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # file_id фото/видео
+    buttons: Mapped[str] = mapped_column(Text, default='[]', nullable=False)  # JSON строка с кнопками
+    # Режим копирования: исходное сообщение админа пересылается через copy_message
+    source_chat_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    source_message_ids: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # JSON список (альбом)
+    segment: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # JSON Segment, None — все пользователи
+    last_user_id: Mapped[int] = mapped_column(Integer, default=0, nullable=False)  # Курсор: последний users.id
+    # Отложенные повторы до курсора: JSON [[users.id, попытка], ...] — продолжаются после паузы
+    pending_retries: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    sent_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    failed_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    scheduled_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)  # UTC, для SCHEDULED
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index('idx_broadcast_jobs_schedule', 'status', 'scheduled_at'),
+    )
+
+    def __repr__(self) -> str:
+        return f"<BroadcastJob(id={self.id}, status={self.status.value}, last_user_id={self.last_user_id})>"
+
+
+class DeliveryStatus(PyEnum):
+    """Результат доставки сообщения рассылки."""
+    SENT = "sent"
+    FAILED = "failed"
+
+
+class BroadcastDelivery(Base):
+    """Журнал доставки рассылки (по строке на получателя)."""
+
+    __tablename__ = "broadcast_deliveries"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    job_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    chat_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    status: Mapped[DeliveryStatus] = mapped_column(Enum(DeliveryStatus), nullable=False)
+    error_code: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # 403, 400, 429 или None
+    latency_ms: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index('idx_deliveries_job_status', 'job_id', 'status'),
+        Index('idx_deliveries_chat_job', 'chat_id', 'job_id'),
     )
 
     def __repr__(self) -> str:
-        return f"<CaptchaAttempt(user_id={self.user_id}, successful={self.is_successful})>"
\ No newline at end of file
+        return f"<BroadcastDelivery(job_id={self.job_id}, chat_id={self.chat_id}, status={self.status.value})>"
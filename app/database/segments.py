@@ -0,0 +1,146 @@
+"""Сегменты аудитории рассылки, компилируемые в SQL."""
+
+import json
+from dataclasses import asdict, dataclass, fields
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, exists, select
+from sqlalchemy.sql.elements import ColumnElement
+
+from .models import (
+    BroadcastDelivery,
+    BroadcastJob,
+    BroadcastStatus,
+    CaptchaAttempt,
+    DeliveryStatus,
+    PendingRequest,
+    RequestStatus,
+    User,
+)
+
+
+@dataclass
+class Segment:
+    """
+    Фильтр получателей рассылки.
+
+    Каждое условие превращается в предикат над users (EXISTS/NOT EXISTS
+    по pending_requests, captcha_attempts и broadcast_deliveries),
+    поэтому получатели и размер сегмента выбираются одним запросом по
+    индексам — без выгрузки пользователей в Python.
+    Пустой сегмент — все доступные пользователи.
+    """
+
+    registered_from: Optional[date] = None  # Дата регистрации с (включительно)
+    registered_to: Optional[date] = None  # Дата регистрации по (включительно)
+    request_status: Optional[RequestStatus] = None  # Есть заявка в статусе
+    passed_captcha: bool = False  # Хотя бы раз прошёл капчу
+    skip_recent: int = 0  # Не получал ни одну из N последних рассылок
+    has_username: bool = False
+
+    @property
+    def is_empty(self) -> bool:
+        return self == Segment()
+
+    def conditions(self) -> List[ColumnElement]:
+        """Предикаты WHERE для выборки из users."""
+        conditions: List[ColumnElement] = []
+
+        if self.registered_from:
+            conditions.append(User.registered_at >= datetime.combine(self.registered_from, datetime.min.time()))
+        if self.registered_to:
+            conditions.append(
+                User.registered_at < datetime.combine(self.registered_to + timedelta(days=1), datetime.min.time())
+            )
+
+        if self.request_status:
+            # idx_requests_user_status
+            conditions.append(exists().where(
+                PendingRequest.user_id == User.chat_id,
+                PendingRequest.status == self.request_status
+            ))
+
+        if self.passed_captcha:
+            # idx_captcha_user_success
+            conditions.append(exists().where(
+                CaptchaAttempt.user_id == User.chat_id,
+                CaptchaAttempt.is_successful.is_(True)
+            ))
+
+        if self.skip_recent > 0:
+            recent_jobs = (
+                select(BroadcastJob.id)
+                .where(BroadcastJob.status == BroadcastStatus.COMPLETED)
+                .order_by(BroadcastJob.id.desc())
+                .limit(self.skip_recent)
+                .scalar_subquery()
+            )
+            # idx_deliveries_chat_job
+            conditions.append(~exists().where(
+                BroadcastDelivery.chat_id == User.chat_id,
+                BroadcastDelivery.job_id.in_(recent_jobs),
+                BroadcastDelivery.status == DeliveryStatus.SENT
+            ))
+
+        if self.has_username:
+            conditions.append(and_(User.username.is_not(None), User.username != ""))
+
+        return conditions
+
+    def split(self) -> List[Tuple[str, "Segment"]]:
+        """Условия по отдельности: (описание, сегмент из одного условия)."""
+        parts = []
+        if self.registered_from or self.registered_to:
+            start = self.registered_from.strftime("%d.%m.%Y") if self.registered_from else "…"
+            end = self.registered_to.strftime("%d.%m.%Y") if self.registered_to else "…"
+            parts.append((
+                f"📅 Регистрация: {start} — {end}",
+                Segment(registered_from=self.registered_from, registered_to=self.registered_to)
+            ))
+        if self.request_status == RequestStatus.PENDING:
+            parts.append(("⏳ Есть заявка на рассмотрении", Segment(request_status=self.request_status)))
+        elif self.request_status == RequestStatus.APPROVED:
+            parts.append(("✅ Есть одобренная заявка", Segment(request_status=self.request_status)))
+        if self.passed_captcha:
+            parts.append(("🧩 Прошли капчу", Segment(passed_captcha=True)))
+        if self.skip_recent:
+            parts.append((f"🔕 Не получали последние рассылки ({self.skip_recent})", Segment(skip_recent=self.skip_recent)))
+        if self.has_username:
+            parts.append(("👤 Есть username", Segment(has_username=True)))
+        return parts
+
+    def describe(self) -> List[str]:
+        """Человекочитаемые условия (для превью и истории)."""
+        return [label for label, _ in self.split()]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Сериализация для FSM и broadcast_jobs.segment."""
+        data = asdict(self)
+        for key in ("registered_from", "registered_to"):
+            if data[key]:
+                data[key] = data[key].isoformat()
+        if self.request_status:
+            data["request_status"] = self.request_status.value
+        return data
+
+    def to_json(self) -> Optional[str]:
+        return None if self.is_empty else json.dumps(self.to_dict())
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "Segment":
+        if not data:
+            return cls()
+
+        known = {f.name for f in fields(cls)}
+        values = {key: value for key, value in data.items() if key in known}
+        for key in ("registered_from", "registered_to"):
+            if values.get(key):
+                values[key] = date.fromisoformat(values[key])
+        if values.get("request_status"):
+            values["request_status"] = RequestStatus(values["request_status"])
+        return cls(**values)
+
+    @classmethod
+    def from_json(cls, raw: Optional[str]) -> "Segment":
+        return cls.from_dict(json.loads(raw) if raw else None)
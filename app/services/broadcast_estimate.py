@@ -0,0 +1,124 @@
+"""Пробный прогон рассылки: получатели, длительность и объём запросов без отправки."""
+
+import json
+import re
+from collections import Counter
+from typing import List, Optional
+
+from app.core import get_config
+from app.database import Segment
+from app.services.broadcast_service import iter_recipient_chunks
+from app.utils.helpers import format_duration
+from app.utils.templates import compile_template, user_template_values
+
+# Лимиты Telegram на длину текста (символы после разбора разметки)
+TEXT_LIMIT = 4096
+CAPTION_LIMIT = 1024
+
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+class BroadcastEstimate:
+    """Результат пробного прогона."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.recipients = 0
+        self.api_calls = 0
+        self.over_limit = 0
+        # Размер полезной нагрузки запроса (байты) -> количество получателей
+        self.sizes: Counter = Counter()
+
+    @property
+    def duration(self) -> float:
+        """Ожидаемая длительность (секунды) при глобальном лимите отправок."""
+        return self.api_calls / self.rate if self.rate > 0 else 0.0
+
+    def percentile(self, q: float) -> int:
+        """Размер запроса, не превышаемый долей q получателей."""
+        if not self.sizes:
+            return 0
+
+        threshold = q * self.recipients
+        seen = 0
+        for size in sorted(self.sizes):
+            seen += self.sizes[size]
+            if seen >= threshold:
+                return size
+        return max(self.sizes)
+
+    def render(self) -> str:
+        """Текст отчёта для админа."""
+        text = (
+            "🧪 <b>Пробный прогон рассылки</b>\n\n"
+            f"👥 <b>Получателей:</b> <code>{self.recipients}</code>\n"
+            f"📨 <b>Запросов к API:</b> <code>{self.api_calls}</code>\n"
+            f"⏱ <b>Ожидаемая длительность:</b> {format_duration(self.duration)} "
+            f"(лимит {self.rate:g} сообщ/сек)\n\n"
+            "<b>Размер содержимого запроса:</b>\n"
+            f"├ медиана: <code>{self.percentile(0.5)}</code> байт\n"
+            f"├ 95%: <code>{self.percentile(0.95)}</code> байт\n"
+            f"└ максимум: <code>{max(self.sizes, default=0)}</code> байт\n"
+        )
+
+        if self.over_limit:
+            text += (
+                f"\n⚠️ <b>Слишком длинный текст у {self.over_limit} получателей</b> — "
+                "Telegram отклонит эти сообщения\n"
+            )
+
+        return text
+
+
+async def estimate_broadcast(
+        text: str,
+        photo_id: Optional[str] = None,
+        buttons: str = "[]",
+        source_message_ids: Optional[List[int]] = None,
+        segment: Optional[Segment] = None
+) -> BroadcastEstimate:
+    """
+    Пробный прогон: тот же набор получателей и тот же рендер, что у
+    send_broadcast, но без отправки.
+
+    Получатели читаются порциями (keyset), заблокировавшие бота исключаются
+    запросом, как и при настоящей рассылке.
+
+    Args:
+        text: Текст (шаблон) рассылки
+        photo_id: file_id фото/видео
+        buttons: JSON кнопок
+        source_message_ids: id исходного сообщения (режим копирования)
+        segment: Фильтр аудитории
+
+    Returns:
+        Оценка рассылки
+    """
+    config = get_config()
+    estimate = BroadcastEstimate(config.telegram_global_rate)
+
+    markup_size = len(buttons.encode()) if buttons and buttons != "[]" else 0
+    template = compile_template(text) if source_message_ids is None else None
+    text_limit = CAPTION_LIMIT if photo_id else TEXT_LIMIT
+
+    async for chunk in iter_recipient_chunks(config.broadcast_batch_size, segment=segment):
+        for row in chunk:
+            estimate.recipients += 1
+
+            if template is None:
+                # copy_message: только ссылка на исходное сообщение
+                size = len(json.dumps(source_message_ids)) + markup_size
+            else:
+                rendered = template.render(user_template_values(row.chat_id, row.username, row.first_name))
+                size = len(rendered.encode()) + len(photo_id or "") + markup_size
+                if len(_TAG_RE.sub("", rendered)) > text_limit:
+                    estimate.over_limit += 1
+
+            estimate.sizes[size] += 1
+
+    # Сообщения получателям + правки прогресса + итог админу
+    sends = estimate.recipients
+    progress_edits = int(sends / estimate.rate / max(1.0, config.broadcast_progress_interval)) if estimate.rate else 0
+    estimate.api_calls = sends + progress_edits + 1
+
+    return estimate
@@ -2,209 +2,761 @@
 
 import asyncio
 import json
-from typing import Optional, Dict, Any
+import time
+from contextlib import suppress
+from functools import partial
+from typing import Optional, Dict, Any, AsyncIterator, List, Tuple
 from datetime import datetime
 
 from aiogram import Bot
 from aiogram.exceptions import TelegramForbiddenError, TelegramBadRequest, TelegramRetryAfter
 from aiogram.types import InlineKeyboardMarkup
 
-from app.bot.keyboards import get_back_to_menu
+from app.bot.keyboards import get_back_to_menu, build_buttons_markup, get_broadcast_job_controls
 from app.core import get_logger, get_config
-from app.database import get_session, crud
+from app.database import get_session, crud, BroadcastJob, BroadcastStatus, DeliveryStatus, Segment
+from app.services.delivery_log import DeliveryLog
+from app.services.rate_limiter import Priority, get_rate_limiter
+from app.services.retry_queue import RetryQueue
+from app.utils.helpers import format_duration
+from app.utils.templates import compile_template, user_template_values
 
 logger = get_logger(__name__)
 
 
-async def send_broadcast(
+async def deliver_message(
         bot: Bot,
-        user_id: int,
+        chat_id: int,
         text: str,
         photo_id: Optional[str] = None,
-        markup: Optional[InlineKeyboardMarkup] = None,
-        state: Optional[Any] = None
+        markup: Optional[InlineKeyboardMarkup] = None
 ) -> None:
     """
-    Отправка рассылки всем пользователям.
+    Отправить одно сообщение рассылки через общий ограничитель.
 
     Args:
         bot: Экземпляр бота
-        user_id: ID админа для уведомлений
-        text: Текст сообщения
+        chat_id: Получатель
+        text: Готовый (персонализированный) текст
         photo_id: file_id фото/видео (опционально)
         markup: Клавиатура с кнопками (опционально)
-        state: Состояние FSM для отслеживания отмены
     """
-    config = get_config()
+    if photo_id:
+        if photo_id.startswith("AgAC"):  # Это фото
+            call = partial(bot.send_photo, chat_id=chat_id, photo=photo_id, caption=text, reply_markup=markup)
+        else:  # Это видео
+            call = partial(bot.send_video, chat_id=chat_id, video=photo_id, caption=text, reply_markup=markup)
+    else:
+        call = partial(bot.send_message, chat_id=chat_id, text=text, reply_markup=markup)
 
-    # Получаем всех пользователей
-    async for session in get_session():
-        user_ids = await crud.get_all_chat_ids(session)
+    await get_rate_limiter().send(chat_id, call, priority=Priority.BULK)
+
+
+async def deliver_copy(
+        bot: Bot,
+        chat_id: int,
+        from_chat_id: int,
+        message_ids: List[int],
+        markup: Optional[InlineKeyboardMarkup] = None,
+        priority: Priority = Priority.BULK
+) -> None:
+    """
+    Скопировать исходное сообщение админа получателю.
+
+    copy_message сохраняет форматирование и любой тип медиа, а запрос
+    содержит только ссылку на сообщение вместо текста и file_id.
+    Альбом уходит одним вызовом copy_messages (кнопки альбому не прикрепить).
+
+    Args:
+        bot: Экземпляр бота
+        chat_id: Получатель
+        from_chat_id: Чат с исходным сообщением
+        message_ids: id исходного сообщения (или всех частей альбома)
+        markup: Клавиатура с кнопками (только для одиночного сообщения)
+        priority: Класс отправки (NORMAL — предпросмотр админу)
+    """
+    if len(message_ids) > 1:
+        call = partial(bot.copy_messages, chat_id=chat_id, from_chat_id=from_chat_id, message_ids=message_ids)
+    else:
+        call = partial(
+            bot.copy_message,
+            chat_id=chat_id,
+            from_chat_id=from_chat_id,
+            message_id=message_ids[0],
+            reply_markup=markup
+        )
+
+    await get_rate_limiter().send(chat_id, call, priority=priority)
+
+
+async def iter_recipient_chunks(
+        batch_size: int,
+        after_id: int = 0,
+        segment: Optional[Segment] = None
+) -> AsyncIterator[List[Any]]:
+    """
+    Потоковое чтение получателей порциями.
+
+    Каждая порция читается в отдельной короткой сессии, поэтому
+    транзакция не держится открытой на время отправки.
+
+    Args:
+        batch_size: Размер порции
+        after_id: id пользователя, после которого начинать
+        segment: Фильтр аудитории (применяется в SQL)
+
+    Yields:
+        Списки строк (id, chat_id, username)
+    """
+    while True:
+        async for session in get_session():
+            rows = await crud.get_broadcast_recipients(
+                session, after_id=after_id, limit=batch_size, segment=segment
+            )
+
+        if not rows:
+            return
+
+        yield rows
+        after_id = rows[-1].id
 
-    total_users = len(user_ids)
-    successful = 0
-    failed = 0
-    cancelled = False
 
-    logger.info(f"[id{user_id}] Запуск рассылки на {total_users} пользователей")
+class BroadcastHandle:
+    """
+    Токен управления идущей рассылкой.
+
+    Пауза/остановка из админки только взводят asyncio.Event — воркеры
+    проверяют его перед каждой отправкой без обращения к БД или Redis.
+    """
+
+    def __init__(
+            self,
+            job_id: int,
+            progress_chat_id: Optional[int] = None,
+            progress_message_id: Optional[int] = None
+    ):
+        self.job_id = job_id
+        # Сообщение админу, которое редактируется с прогрессом
+        self.progress_chat_id = progress_chat_id
+        self.progress_message_id = progress_message_id
+        self.stop_status: Optional[BroadcastStatus] = None
+        self._stop = asyncio.Event()
+
+    @property
+    def stopped(self) -> bool:
+        """Запрошена ли остановка."""
+        return self._stop.is_set()
+
+    def request_stop(self, status: BroadcastStatus) -> None:
+        """Остановить рассылку с итоговым статусом PAUSED или CANCELLED."""
+        self.stop_status = status
+        self._stop.set()
+
+    async def wait(self, timeout: float) -> None:
+        """Подождать timeout секунд (раньше — если запрошена остановка)."""
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._stop.wait(), timeout)
+
+
+class BroadcastProgress:
+    """
+    Счётчики идущей рассылки.
 
-    # Создаём семафор для ограничения одновременных отправок
-    semaphore = asyncio.Semaphore(config.broadcast_semaphore_limit)
+    Воркеры инкрементируют поля напрямую: все они работают в одном
+    event loop, поэтому блокировки не нужны, а БД не перечитывается.
+    """
 
-    async def send_to_user(chat_id: int, username: Optional[str] = None) -> bool:
-        """Отправить сообщение одному пользователю."""
-        nonlocal successful, failed, cancelled
+    def __init__(self, job_id: int, sent: int, failed: int, remaining: int):
+        self.job_id = job_id
+        self.sent = sent
+        self.failed = failed
+        self.total = sent + failed + remaining
+        # Разбивка итогов текущего запуска для отчёта админу
+        self.retried = 0  # Доставлено после повтора
+        self.gave_up = 0  # Временные ошибки, попытки исчерпаны
+        self.unreachable = 0  # Заблокировали бота или удалены
+        # Скорость считаем только по текущему запуску (после рестарта — заново)
+        self._processed_at_start = sent + failed
+        self._started = time.monotonic()
+
+    @property
+    def processed(self) -> int:
+        """Обработано получателей (всего, включая прошлые запуски)."""
+        return self.sent + self.failed
+
+    @property
+    def remaining(self) -> int:
+        """Осталось получателей."""
+        return max(0, self.total - self.processed)
+
+    @property
+    def rate(self) -> float:
+        """Текущая скорость (сообщений в секунду)."""
+        elapsed = time.monotonic() - self._started
+        if elapsed <= 0:
+            return 0.0
+        return (self.processed - self._processed_at_start) / elapsed
+
+    def render(self, title: str = "📤 Рассылка #{job_id} идёт") -> str:
+        """Текст сообщения с прогрессом."""
+        rate = self.rate
+        eta = format_duration(self.remaining / rate) if rate > 0 else "—"
+        percent = self.processed * 100 // self.total if self.total else 100
+
+        return (
+            f"<b>{title.format(job_id=self.job_id)}</b> — {percent}%\n\n"
+            f"✅ <b>Отправлено:</b> <code>{self.sent}</code>\n"
+            f"❌ <b>Ошибок:</b> <code>{self.failed}</code>\n"
+            f"📬 <b>Осталось:</b> <code>{self.remaining}</code>\n"
+            f"⚡ <b>Скорость:</b> <code>{rate:.1f}</code> сообщ/сек\n"
+            f"⏳ <b>Примерно до конца:</b> {eta}"
+        )
+
+
+async def report_progress(bot: Bot, progress: BroadcastProgress, handle: BroadcastHandle) -> None:
+    """
+    Редактировать сообщение админа с прогрессом.
 
-        # Проверяем отмену
-        if state:
-            data = await state.get_data()
-            if data.get('broadcast_cancelled'):
-                cancelled = True
-                return False
+    Правки объединяются: не чаще раза в broadcast_progress_interval секунд
+    и только если текст изменился, чтобы не тратить лимит отправок рассылки.
+    """
+    if handle.progress_chat_id is None or handle.progress_message_id is None:
+        return
 
-        if cancelled:
-            return False
+    interval = max(1.0, get_config().broadcast_progress_interval)
+    markup = get_broadcast_job_controls(handle.job_id, paused=False)
+    last_text = None
 
-        async with semaphore:
+    while True:
+        text = progress.render()
+        if text != last_text:
             try:
-                # Персонализируем текст
-                personalized_text = text
-                if username:
-                    personalized_text = personalized_text.replace("{username}", f"@{username}")
-
-                # {name} заменяем на "Пользователь", т.к. имени нет в БД
-                personalized_text = personalized_text.replace("{name}", "Пользователь")
-
-                # Отправляем сообщение
-                if photo_id:
-                    if photo_id.startswith("AgAC"):  # Это фото
-                        await bot.send_photo(
-                            chat_id=chat_id,
-                            photo=photo_id,
-                            caption=personalized_text,
-                            reply_markup=markup
-                        )
-                    else:  # Это видео
-                        await bot.send_video(
-                            chat_id=chat_id,
-                            video=photo_id,
-                            caption=personalized_text,
-                            reply_markup=markup
-                        )
-                else:
-                    await bot.send_message(
-                        chat_id=chat_id,
-                        text=personalized_text,
+                await get_rate_limiter().send(
+                    handle.progress_chat_id,
+                    partial(
+                        bot.edit_message_text,
+                        text=text,
+                        chat_id=handle.progress_chat_id,
+                        message_id=handle.progress_message_id,
                         reply_markup=markup
                     )
+                )
+                last_text = text
+            except TelegramBadRequest as e:
+                # "message is not modified" и удалённое сообщение не критичны
+                logger.debug(f"[broadcast #{handle.job_id}] Прогресс не обновлён: {e}")
+            except Exception as e:
+                logger.warning(f"[broadcast #{handle.job_id}] Ошибка обновления прогресса: {e}")
 
-                successful += 1
+        await asyncio.sleep(interval)
 
-                # Задержка между сообщениями
-                await asyncio.sleep(config.broadcast_delay)
-                return True
 
-            except TelegramForbiddenError:
-                # Пользователь заблокировал бота
-                logger.info(f"[broadcast] Пользователь {chat_id} заблокировал бота")
-                failed += 1
-                return False
+async def send_broadcast(
+        bot: Bot,
+        job: BroadcastJob,
+        handle: Optional[BroadcastHandle] = None
+) -> BroadcastStatus:
+    """
+    Выполнить рассылку с места последнего чекпоинта.
 
-            except TelegramBadRequest as e:
-                # Некорректный chat_id или другие ошибки
-                if "chat not found" in str(e).lower() or "user not found" in str(e).lower():
-                    logger.info(f"[broadcast] Пользователь {chat_id} не найден")
-                else:
-                    logger.warning(f"[broadcast] Ошибка для {chat_id}: {e}")
-                failed += 1
-                return False
+    Получатели читаются порциями после job.last_user_id. Когда порция
+    разослана, курсор и счётчики сохраняются в БД — рестарт бота не
+    приводит к повторной отправке. Остановка через handle срабатывает
+    сразу: недоставленные получатели порции пропускаются, а курсор
+    сохраняется перед первым из них.
 
-            except TelegramRetryAfter as e:
-                # Флуд-контроль
-                logger.warning(f"[broadcast] Флуд-контроль для {chat_id}: ждём {e.retry_after} сек")
-                await asyncio.sleep(e.retry_after)
-                # Пробуем ещё раз
-                return await send_to_user(chat_id, username)
+    Временные ошибки (сеть, 5xx, неснятый флуд-контроль) не повторяются
+    на месте: получатель попадает в RetryQueue и повторяется после
+    основного прохода с экспоненциальной задержкой. Ждущие повторы
+    сохраняются с каждым чекпоинтом: после паузы или рестарта они
+    продолжаются, и только остановка считает их неудачными.
 
-            except Exception as e:
-                # Любая другая ошибка
-                logger.error(f"[broadcast] Неизвестная ошибка для {chat_id}: {e}")
-                failed += 1
-
-                # Повторная попытка
-                for attempt in range(config.broadcast_retry_attempts):
-                    try:
-                        await asyncio.sleep(1)  # Ждём перед повторной попыткой
-                        if photo_id:
-                            if photo_id.startswith("AgAC"):
-                                await bot.send_photo(
-                                    chat_id=chat_id,
-                                    photo=photo_id,
-                                    caption=personalized_text,
-                                    reply_markup=markup
-                                )
-                            else:
-                                await bot.send_video(
-                                    chat_id=chat_id,
-                                    video=photo_id,
-                                    caption=personalized_text,
-                                    reply_markup=markup
-                                )
-                        else:
-                            await bot.send_message(
-                                chat_id=chat_id,
-                                text=personalized_text,
-                                reply_markup=markup
-                            )
-
-                        successful += 1
-                        failed -= 1
-                        return True
-
-                    except Exception:
-                        if attempt == config.broadcast_retry_attempts - 1:
-                            return False
-
-                return False
-
-    # Отправляем всем пользователям
-    tasks = []
-    for chat_id in user_ids:
-        # Получаем username из БД если нужно
-        username = None
-        if "{username}" in text:
-            async for session in get_session():
-                user = await crud.get_user_by_chat_id(session, chat_id)
-                if user and user.username:
-                    username = user.username
-
-        task = asyncio.create_task(send_to_user(chat_id, username))
-        tasks.append(task)
-
-    # Ждём завершения всех задач
-    await asyncio.gather(*tasks, return_exceptions=True)
+    Args:
+        bot: Экземпляр бота
+        job: Рассылка (статус RUNNING)
+        handle: Токен паузы/остановки
 
-    # Отправляем итоговую статистику админу
-    result_text = (
-        "📊 <b>Рассылка завершена</b>\n\n"
-        f"✅ <b>Успешно отправлено:</b> <code>{successful}</code>\n"
-        f"❌ <b>Не удалось отправить:</b> <code>{failed}</code>\n"
-        f"📈 <b>Всего получателей:</b> <code>{total_users}</code>\n\n"
+    Returns:
+        Итоговый статус: COMPLETED, PAUSED или CANCELLED
+    """
+    config = get_config()
+
+    photo_id = job.photo_id
+    markup = build_buttons_markup(job.buttons)
+    # Режим копирования: без персонализации, сообщение админа как есть
+    source_message_ids = json.loads(job.source_message_ids) if job.source_message_ids else None
+    # Шаблон разбирается один раз на всю рассылку
+    template = compile_template(job.text) if source_message_ids is None else None
+    # Аудитория фильтруется запросом получателей, а не в Python
+    segment = Segment.from_json(job.segment)
+
+    workers_count = max(1, config.broadcast_semaphore_limit)
+    handle = handle or BroadcastHandle(job.id)
+    # Наименьший users.id, пропущенный из-за остановки (для точного курсора)
+    skipped_from: Optional[int] = None
+    # Постоянно недоступные получатели — сохраняются пачкой вместе с чекпоинтом
+    unreachable: List[int] = []
+    # Временные ошибки повторяются после основного прохода, не занимая воркеры
+    retries = RetryQueue(
+        config.broadcast_retry_attempts, config.broadcast_retry_base_delay, config.broadcast_retry_max_delay
+    )
+
+    logger.info(
+        f"[broadcast #{job.id}] Запуск рассылки с users.id > {job.last_user_id} ({workers_count} воркеров)"
     )
 
-    if cancelled:
-        result_text += "⚠️ <i>Рассылка была прервана</i>\n"
+    # Повторы, отложенные до паузы: курсор уже за ними, поэтому они сохранены с рассылкой
+    resumed_attempts = dict(json.loads(job.pending_retries)) if job.pending_retries else {}
+
+    async for session in get_session():
+        remaining = await crud.count_broadcast_recipients(session, after_id=job.last_user_id, segment=segment)
+        resumed_rows = await crud.get_recipients_by_ids(session, list(resumed_attempts))
+    progress = BroadcastProgress(job.id, job.sent_count, job.failed_count, remaining + len(resumed_rows))
+
+    for row in resumed_rows:
+        if not retries.push(row, resumed_attempts[row.id]):
+            # Лимит повторов уменьшили, пока рассылка стояла на паузе
+            progress.gave_up += 1
+            progress.failed += 1
+
+    # Ограниченная очередь: продюсер читает БД не быстрее, чем воркеры отправляют
+    queue: asyncio.Queue = asyncio.Queue(maxsize=workers_count * 2)
+
+    # Журнал доставки пишется фоном пачками
+    deliveries = DeliveryLog(job.id, config.broadcast_log_batch_size, config.broadcast_log_flush_interval)
+
+    async def send_to_user(row: Any, attempt: int = 0) -> None:
+        """
+        Одна попытка отправки получателю.
+
+        Временные ошибки не повторяются на месте: получатель уходит
+        в очередь повторов, а воркер сразу берёт следующего.
+        """
+        chat_id = row.chat_id
+        started = time.perf_counter()
+
+        def record_failure(error_code: Optional[int]) -> None:
+            progress.failed += 1
+            deliveries.add(chat_id, DeliveryStatus.FAILED, error_code, int((time.perf_counter() - started) * 1000))
+
+        def retry_later(error_code: Optional[int], min_delay: float = 0.0) -> None:
+            if not retries.push(row, attempt + 1, error_code, min_delay):
+                logger.warning(f"[broadcast] Попытки для {chat_id} исчерпаны")
+                progress.gave_up += 1
+                record_failure(error_code)
+
+        try:
+            # Лимиты и флуд-контроль соблюдает общий ограничитель
+            if source_message_ids is not None:
+                await deliver_copy(bot, chat_id, job.source_chat_id, source_message_ids, markup)
+            else:
+                # Имени нет в БД — {name} подставляется как "Пользователь"
+                personalized_text = template.render(user_template_values(chat_id, row.username, row.first_name))
+                await deliver_message(bot, chat_id, personalized_text, photo_id, markup)
+
+        except TelegramForbiddenError:
+            # Пользователь заблокировал бота или удалил аккаунт
+            logger.info(f"[broadcast] Пользователь {chat_id} заблокировал бота")
+            unreachable.append(chat_id)
+            progress.unreachable += 1
+            record_failure(403)
+
+        except TelegramBadRequest as e:
+            # Некорректный chat_id или другие ошибки — повтор не поможет
+            if "chat not found" in str(e).lower() or "user not found" in str(e).lower():
+                logger.info(f"[broadcast] Пользователь {chat_id} не найден")
+                unreachable.append(chat_id)
+                progress.unreachable += 1
+            else:
+                logger.warning(f"[broadcast] Ошибка для {chat_id}: {e}")
+            record_failure(400)
+
+        except TelegramRetryAfter as e:
+            # Ограничитель уже исчерпал свои повторы после флуд-контроля
+            logger.warning(f"[broadcast] Флуд-контроль для {chat_id} не снят: {e.retry_after} сек")
+            retry_later(429, min_delay=e.retry_after)
+
+        except Exception as e:
+            # Сеть, 5xx и прочие временные ошибки
+            logger.error(f"[broadcast] Ошибка отправки для {chat_id} (попытка {attempt + 1}): {e}")
+            retry_later(None)
+
+        else:
+            progress.sent += 1
+            if attempt:
+                progress.retried += 1
+            deliveries.add(chat_id, DeliveryStatus.SENT, latency_ms=int((time.perf_counter() - started) * 1000))
+
+    async def checkpoint(cursor: int) -> None:
+        """Сохранить курсор, счётчики, отложенные повторы, журнал доставки и недоступных получателей."""
+        dead_chat_ids = unreachable.copy()
+        unreachable.clear()
+
+        # Журнал — до чекпоинта, чтобы после рестарта он совпадал со счётчиками
+        await deliveries.flush()
+
+        async for session in get_session():
+            await crud.checkpoint_broadcast_job(
+                session, job.id, cursor, progress.sent, progress.failed,
+                pending_retries=[[row.id, attempt] for row, attempt in retries.pending()]
+            )
+            # Следующие рассылки их уже не выберут
+            await crud.mark_users_unreachable(session, dead_chat_ids)
+        job.last_user_id = cursor
+
+    async def retry_pass() -> None:
+        """Повторы после основного прохода: по времени из очереди, теми же воркерами."""
+        while retries and not handle.stopped:
+            delay = retries.delay()
+            if delay > 0:
+                await handle.wait(delay)
+                continue
+
+            await queue.put(retries.pop())
+            if not retries:
+                # Отправки в полёте могут вернуть получателей в очередь повторов
+                await queue.join()
+
+        await queue.join()
+
+    async def produce() -> None:
+        """Читать получателей порциями, дожидаться отправки и сохранять чекпоинт."""
+        try:
+            async for chunk in iter_recipient_chunks(
+                    config.broadcast_batch_size, after_id=job.last_user_id, segment=segment
+            ):
+                last_queued = job.last_user_id
+                for row in chunk:
+                    if handle.stopped:
+                        break
+                    await queue.put((row, 0))
+                    last_queued = row.id
+
+                # Порция обработана — курсор можно сдвигать
+                await queue.join()
+
+                if skipped_from is not None:
+                    # Воркеры пропустили получателей после остановки
+                    cursor = skipped_from - 1
+                else:
+                    cursor = last_queued
+
+                await checkpoint(cursor)
+
+                if handle.stopped:
+                    break
+
+            await retry_pass()
+
+            # Пауза: повторы сохраняются с чекпоинтом и продолжатся при возобновлении.
+            # Остановка: не дождавшиеся повтора считаются неудачными
+            if handle.stop_status != BroadcastStatus.PAUSED:
+                for row, error_code in retries.drain():
+                    progress.gave_up += 1
+                    progress.failed += 1
+                    deliveries.add(row.chat_id, DeliveryStatus.FAILED, error_code)
+
+            await checkpoint(job.last_user_id)
+        finally:
+            # По одному стоп-сигналу на каждого воркера
+            for _ in range(workers_count):
+                await queue.put(None)
+
+    async def worker() -> None:
+        """Забирать получателей из очереди и отправлять."""
+        nonlocal skipped_from
+        while True:
+            item = await queue.get()
+            try:
+                if item is None:
+                    return
+
+                row, attempt = item
+                if handle.stopped:
+                    if attempt:
+                        # Повтор после остановки — курсор уже за получателем
+                        retries.push(row, attempt)
+                    elif skipped_from is None or row.id < skipped_from:
+                        # Очередь FIFO: всё, что взято после остановки, идёт после курсора
+                        skipped_from = row.id
+                    continue
+
+                # username уже пришёл вместе с получателем — без запроса в БД
+                await send_to_user(row, attempt)
+            except Exception as e:
+                logger.error(f"[broadcast] Ошибка воркера для {item[0].chat_id}: {e}")
+            finally:
+                queue.task_done()
+
+    reporter = asyncio.create_task(report_progress(bot, progress, handle))
+    deliveries.start()
 
-    if failed > 0:
-        result_text += "🔍 <i>Не отправлено: заблокировавшие бота или неверные ID</i>\n"
+    # Фиксированный пул воркеров вместо задачи на каждого пользователя
+    try:
+        producer_result, *_ = await asyncio.gather(
+            produce(),
+            *(worker() for _ in range(workers_count)),
+            return_exceptions=True
+        )
+    finally:
+        reporter.cancel()
+        with suppress(asyncio.CancelledError):
+            await reporter
+        await deliveries.close()
+
+    if isinstance(producer_result, Exception):
+        raise producer_result
+
+    final_status = handle.stop_status if handle.stopped else BroadcastStatus.COMPLETED
+    final_titles = {
+        BroadcastStatus.COMPLETED: "📊 Рассылка #{job_id} завершена",
+        BroadcastStatus.PAUSED: "⏸️ Рассылка #{job_id} приостановлена",
+        BroadcastStatus.CANCELLED: "🛑 Рассылка #{job_id} остановлена",
+    }
+
+    # Последний снимок прогресса — без кнопок управления
+    if handle.progress_chat_id is not None and handle.progress_message_id is not None:
+        with suppress(Exception):
+            await get_rate_limiter().send(
+                handle.progress_chat_id,
+                partial(
+                    bot.edit_message_text,
+                    text=progress.render(final_titles[final_status]),
+                    chat_id=handle.progress_chat_id,
+                    message_id=handle.progress_message_id
+                )
+            )
+
+    if final_status == BroadcastStatus.COMPLETED:
+        async for session in get_session():
+            await crud.update_broadcast_status(session, job.id, BroadcastStatus.COMPLETED)
+
+    successful = progress.sent
+    failed = progress.failed
+    total_users = progress.processed
+    other_errors = max(0, failed - progress.unreachable - progress.gave_up)
+
+    # Отправляем итоговую статистику админу
+    if final_status == BroadcastStatus.PAUSED:
+        result_text = (
+            f"⏸️ <b>Рассылка #{job.id} приостановлена</b>\n\n"
+            f"✅ <b>Отправлено:</b> <code>{successful}</code>\n"
+            f"❌ <b>Не удалось отправить:</b> <code>{failed}</code>\n"
+        )
+    else:
+        result_text = (
+            f"📊 <b>Рассылка #{job.id} завершена</b>\n\n"
+            f"✅ <b>Успешно отправлено:</b> <code>{successful}</code>\n"
+            f"❌ <b>Не удалось отправить:</b> <code>{failed}</code>\n"
+            f"📈 <b>Всего получателей:</b> <code>{total_users}</code>\n\n"
+        )
+
+        if final_status == BroadcastStatus.CANCELLED:
+            result_text += "⚠️ <i>Рассылка была прервана</i>\n"
+
+        if progress.retried:
+            result_text += f"🔁 <b>Доставлено после повтора:</b> <code>{progress.retried}</code>\n"
+        if progress.unreachable:
+            result_text += f"🚫 <b>Недоступны (блок/удалены):</b> <code>{progress.unreachable}</code>\n"
+        if progress.gave_up:
+            result_text += f"⏳ <b>Не доставлено после повторов:</b> <code>{progress.gave_up}</code>\n"
+        if other_errors:
+            result_text += f"⚠️ <b>Другие ошибки:</b> <code>{other_errors}</code>\n"
 
     try:
-        await bot.send_message(user_id, result_text, reply_markup=get_back_to_menu())
+        await get_rate_limiter().send(
+            job.admin_id,
+            partial(bot.send_message, job.admin_id, result_text, reply_markup=get_back_to_menu())
+        )
     except Exception as e:
-        logger.error(f"Не удалось отправить статистику админу {user_id}: {e}")
+        logger.error(f"Не удалось отправить статистику админу {job.admin_id}: {e}")
+
+    logger.info(f"[broadcast #{job.id}] {final_status.value}: {successful}/{total_users} успешно")
+
+    return final_status
+
+
+class BroadcastManager:
+    """
+    Очередь рассылок.
 
-    logger.info(f"[id{user_id}] Рассылка завершена: {successful}/{total_users} успешно")
+    Одновременно выполняется одна рассылка, остальные ждут в статусе QUEUED.
+    Прерванные рестартом (RUNNING) продолжаются с чекпоинта при старте.
+    """
 
-    # Очищаем состояние
-    if state:
-        await state.clear()
\ No newline at end of file
+    def __init__(self, bot: Bot):
+        self.bot = bot
+        self.current_job_id: Optional[int] = None
+        self._handles: Dict[int, BroadcastHandle] = {}
+        # job_id -> (chat_id, message_id) сообщения для прогресса
+        self._progress_targets: Dict[int, Tuple[int, int]] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Запустить фоновый обработчик очереди."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info("✅ Очередь рассылок запущена")
+
+    async def stop(self) -> None:
+        """Остановить обработчик (прогресс уже сохранён в чекпоинтах)."""
+        if self._task:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def notify(self) -> None:
+        """Разбудить обработчик очереди."""
+        self._wakeup.set()
+
+    async def submit(
+            self,
+            admin_id: int,
+            text: str,
+            photo_id: Optional[str] = None,
+            buttons: str = "[]",
+            progress_message: Optional[Tuple[int, int]] = None,
+            source_chat_id: Optional[int] = None,
+            source_message_ids: Optional[List[int]] = None,
+            segment: Optional[Segment] = None
+    ) -> Tuple[BroadcastJob, int]:
+        """
+        Поставить рассылку в очередь.
+
+        Args:
+            progress_message: (chat_id, message_id) сообщения, в котором показывать прогресс
+            source_chat_id: Чат исходного сообщения (режим копирования)
+            source_message_ids: id исходного сообщения или частей альбома (режим копирования)
+            segment: Фильтр аудитории (None — все пользователи)
+
+        Returns:
+            Tuple[рассылка, количество рассылок перед ней]
+        """
+        async for session in get_session():
+            job = await crud.create_broadcast_job(
+                session, admin_id, text, photo_id, buttons, source_chat_id, source_message_ids,
+                segment=segment
+            )
+            active = await crud.get_active_broadcast_jobs(session)
+
+        ahead = sum(
+            1 for other in active
+            if other.id < job.id and other.status != BroadcastStatus.PAUSED
+        )
+
+        if progress_message:
+            self._progress_targets[job.id] = progress_message
+
+        logger.info(f"[id{admin_id}] Рассылка #{job.id} поставлена в очередь (перед ней: {ahead})")
+        self.notify()
+        return job, ahead
+
+    async def _set_status(
+            self,
+            job_id: int,
+            status: BroadcastStatus,
+            allowed_from: Tuple[BroadcastStatus, ...]
+    ) -> Optional[BroadcastJob]:
+        """Сменить статус, если текущий входит в allowed_from."""
+        async for session in get_session():
+            job = await crud.get_broadcast_job(session, job_id)
+            if job is None or job.status not in allowed_from:
+                return None
+            job = await crud.update_broadcast_status(session, job_id, status)
+        return job
+
+    def _signal(self, job_id: int, status: BroadcastStatus) -> None:
+        """Взвести токен остановки, если рассылка идёт в этом процессе."""
+        handle = self._handles.get(job_id)
+        if handle:
+            handle.request_stop(status)
+
+    async def pause(self, job_id: int) -> Optional[BroadcastJob]:
+        """Поставить рассылку на паузу (идущая останавливается сразу, курсор сохраняется)."""
+        job = await self._set_status(
+            job_id, BroadcastStatus.PAUSED, (BroadcastStatus.RUNNING, BroadcastStatus.QUEUED)
+        )
+        if job:
+            self._signal(job_id, BroadcastStatus.PAUSED)
+        return job
+
+    async def resume(
+            self,
+            job_id: int,
+            progress_message: Optional[Tuple[int, int]] = None
+    ) -> Optional[BroadcastJob]:
+        """Вернуть рассылку с паузы в очередь — она продолжится с чекпоинта."""
+        job = await self._set_status(job_id, BroadcastStatus.QUEUED, (BroadcastStatus.PAUSED,))
+        if job:
+            if progress_message:
+                self._progress_targets[job_id] = progress_message
+            self.notify()
+        return job
+
+    async def cancel(self, job_id: int) -> Optional[BroadcastJob]:
+        """Отменить рассылку."""
+        job = await self._set_status(
+            job_id,
+            BroadcastStatus.CANCELLED,
+            (BroadcastStatus.RUNNING, BroadcastStatus.QUEUED, BroadcastStatus.PAUSED, BroadcastStatus.SCHEDULED)
+        )
+        if job:
+            self._signal(job_id, BroadcastStatus.CANCELLED)
+        return job
+
+    async def _run(self) -> None:
+        """Выполнять рассылки из очереди по одной."""
+        while True:
+            self._wakeup.clear()
+
+            job = None
+            resumed = False
+            try:
+                async for session in get_session():
+                    job = await crud.get_next_broadcast_job(session)
+                    if job:
+                        resumed = job.status == BroadcastStatus.RUNNING
+                        job = await crud.update_broadcast_status(session, job.id, BroadcastStatus.RUNNING)
+            except Exception as e:
+                logger.error(f"Ошибка чтения очереди рассылок: {e}")
+                await asyncio.sleep(5)
+                continue
+
+            if job is None:
+                await self._wakeup.wait()
+                continue
+
+            target = self._progress_targets.pop(job.id, None)
+            if resumed:
+                logger.info(f"[broadcast #{job.id}] Возобновление с чекпоинта users.id={job.last_user_id}")
+
+            if target is None:
+                # Нет сообщения для прогресса (рестарт) — создаём новое
+                with suppress(Exception):
+                    message = await get_rate_limiter().send(
+                        job.admin_id,
+                        partial(
+                            self.bot.send_message,
+                            job.admin_id,
+                            (
+                                f"▶️ <b>Рассылка #{job.id} возобновлена</b>\n"
+                                f"Уже отправлено: <code>{job.sent_count}</code>"
+                            ) if resumed else f"⏳ <b>Рассылка #{job.id} запущена</b>",
+                            reply_markup=get_broadcast_job_controls(job.id, paused=False)
+                        )
+                    )
+                    target = (message.chat.id, message.message_id)
+
+            self.current_job_id = job.id
+            self._handles[job.id] = BroadcastHandle(job.id, *(target or (None, None)))
+            try:
+                await send_broadcast(self.bot, job, self._handles[job.id])
+            except Exception as e:
+                # Не даём упавшей рассылке зациклить очередь — ставим на паузу
+                logger.error(f"[broadcast #{job.id}] Ошибка рассылки: {e}", exc_info=True)
+                await self._set_status(job.id, BroadcastStatus.PAUSED, (BroadcastStatus.RUNNING,))
+            finally:
+                self._handles.pop(job.id, None)
+                self.current_job_id = None
@@ -0,0 +1,281 @@
+"""Одобрение и отклонение заявок на вступление: по одной и массово."""
+
+import asyncio
+import time
+from contextlib import suppress
+from functools import partial
+from typing import List, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+
+from app.core import get_config, get_logger
+from app.database import RequestStatus, crud, get_session
+from app.services.rate_limiter import Priority, get_rate_limiter
+from app.utils.helpers import format_duration
+
+logger = get_logger(__name__)
+
+
+async def approve_join_request(
+        bot: Bot,
+        chat_id: int,
+        user_id: int,
+        priority: Priority = Priority.NORMAL
+) -> None:
+    """
+    Одобрить заявку через общий ограничитель.
+
+    RetryAfter замораживает все исходящие вызовы бота, а не одну
+    корутину, и вызов повторяется после паузы.
+
+    Raises:
+        TelegramBadRequest: заявки больше нет (отозвана, уже обработана)
+    """
+    await get_rate_limiter().send(
+        None,
+        partial(bot.approve_chat_join_request, chat_id=chat_id, user_id=user_id),
+        priority=priority
+    )
+
+
+async def decline_join_request(
+        bot: Bot,
+        chat_id: int,
+        user_id: int,
+        priority: Priority = Priority.NORMAL
+) -> None:
+    """
+    Отклонить заявку через общий ограничитель.
+
+    Raises:
+        TelegramBadRequest: заявки больше нет (отозвана, уже обработана)
+    """
+    await get_rate_limiter().send(
+        None,
+        partial(bot.decline_chat_join_request, chat_id=chat_id, user_id=user_id),
+        priority=priority
+    )
+
+
+class ApproveProgress:
+    """Счётчики массового одобрения."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.approved = 0
+        self.missing = 0  # Заявки уже нет в Telegram — помечается отклонённой
+        self.failed = 0  # Временная ошибка — заявка остаётся в очереди
+        self._started = time.monotonic()
+
+    @property
+    def processed(self) -> int:
+        return self.approved + self.missing + self.failed
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.total - self.processed)
+
+    @property
+    def rate(self) -> float:
+        """Заявок в секунду."""
+        elapsed = time.monotonic() - self._started
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+    def render(self, title: str = "⏳ Одобрение заявок") -> str:
+        """Текст сообщения с прогрессом."""
+        rate = self.rate
+        eta = format_duration(self.remaining / rate) if rate > 0 else "—"
+        percent = self.processed * 100 // self.total if self.total else 100
+
+        return (
+            f"<b>{title}</b> — {percent}%\n\n"
+            f"✅ <b>Одобрено:</b> <code>{self.approved}</code>\n"
+            f"🗑 <b>Уже неактуальны:</b> <code>{self.missing}</code>\n"
+            f"❌ <b>Ошибок (остались в очереди):</b> <code>{self.failed}</code>\n"
+            f"📬 <b>Осталось:</b> <code>{self.remaining}</code>\n"
+            f"⚡ <b>Скорость:</b> <code>{rate:.1f}</code> заявок/сек\n"
+            f"⏳ <b>Примерно до конца:</b> {eta}"
+        )
+
+
+class BulkApprover:
+    """
+    Массовое одобрение очереди заявок (pending_requests).
+
+    Заявки читаются пачками по batch_size (keyset по id), одобряются
+    не более concurrency вызовов одновременно через общий ограничитель
+    с приоритетом BULK — капча и ответы пользователям идут вперёд.
+    Статусы пачки записываются двумя UPDATE (bulk_update_requests),
+    а не построчно. Одновременно идёт одно массовое одобрение.
+    """
+
+    def __init__(self, bot: Bot, concurrency: int = 5, batch_size: int = 500):
+        """
+        Args:
+            bot: Экземпляр бота
+            concurrency: Одновременных вызовов approve_chat_join_request
+            batch_size: Заявок за один запрос к БД
+        """
+        self.bot = bot
+        self.concurrency = max(1, concurrency)
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(
+            self,
+            admin_id: int,
+            has_username: Optional[bool] = None,
+            progress_chat_id: Optional[int] = None,
+            progress_message_id: Optional[int] = None
+    ) -> bool:
+        """
+        Запустить одобрение в фоне.
+
+        Returns:
+            False если массовое одобрение уже идёт
+        """
+        if self.running:
+            return False
+
+        self._task = asyncio.create_task(
+            self._run_with_report(admin_id, has_username, progress_chat_id, progress_message_id)
+        )
+        return True
+
+    async def stop(self) -> None:
+        """Прервать одобрение (необработанные заявки остаются в очереди)."""
+        if self._task:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def run(
+            self,
+            admin_id: int,
+            has_username: Optional[bool] = None,
+            progress: Optional[ApproveProgress] = None
+    ) -> ApproveProgress:
+        """
+        Одобрить все PENDING заявки (с фильтром по username).
+
+        Args:
+            admin_id: Кто одобряет (processed_by)
+            has_username: True/False — только с username / без, None — все
+            progress: Счётчики для отчёта (создаются, если не переданы)
+        """
+        if progress is None:
+            async for session in get_session():
+                progress = ApproveProgress(
+                    await crud.get_pending_count(session, RequestStatus.PENDING, has_username)
+                )
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def approve(request) -> Optional[RequestStatus]:
+            async with semaphore:
+                try:
+                    await approve_join_request(self.bot, request.chat_id, request.user_id, Priority.BULK)
+                    progress.approved += 1
+                    return RequestStatus.APPROVED
+                except TelegramBadRequest as e:
+                    logger.debug(f"[id{request.user_id}] Заявка уже неактуальна: {e}")
+                    progress.missing += 1
+                    return RequestStatus.DECLINED
+                except Exception as e:
+                    # RetryAfter сверх повторов ограничителя, сеть — попробуем в следующий раз
+                    logger.warning(f"[id{request.user_id}] Заявка не одобрена: {e}")
+                    progress.failed += 1
+                    return None
+
+        after_id = 0
+        while True:
+            async for session in get_session():
+                chunk = await crud.get_pending_request_chunk(session, after_id, self.batch_size, has_username)
+            if not chunk:
+                break
+            after_id = chunk[-1].id
+
+            statuses = await asyncio.gather(*(approve(request) for request in chunk))
+
+            approved: List[int] = []
+            missing: List[int] = []
+            for request, status in zip(chunk, statuses):
+                if status == RequestStatus.APPROVED:
+                    approved.append(request.id)
+                elif status == RequestStatus.DECLINED:
+                    missing.append(request.id)
+
+            async for session in get_session():
+                if approved:
+                    await crud.bulk_update_requests(session, approved, RequestStatus.APPROVED, processed_by=admin_id)
+                if missing:
+                    await crud.bulk_update_requests(session, missing, RequestStatus.DECLINED, processed_by=admin_id)
+
+        # Заявки, пришедшие во время одобрения, тоже попадают в отчёт
+        progress.total = max(progress.total, progress.processed)
+        logger.info(
+            f"[id{admin_id}] Массовое одобрение завершено: {progress.approved} одобрено, "
+            f"{progress.missing} неактуальны, {progress.failed} ошибок"
+        )
+        return progress
+
+    async def _run_with_report(
+            self,
+            admin_id: int,
+            has_username: Optional[bool],
+            chat_id: Optional[int],
+            message_id: Optional[int]
+    ) -> None:
+        async for session in get_session():
+            progress = ApproveProgress(
+                await crud.get_pending_count(session, RequestStatus.PENDING, has_username)
+            )
+
+        reporter = None
+        if chat_id is not None and message_id is not None:
+            reporter = asyncio.create_task(self._report(progress, chat_id, message_id))
+
+        try:
+            await self.run(admin_id, has_username, progress)
+            title = "✅ Одобрение заявок завершено"
+        except Exception as e:
+            logger.error(f"[id{admin_id}] Ошибка массового одобрения: {e}", exc_info=True)
+            title = "⚠️ Одобрение заявок прервано"
+        finally:
+            if reporter:
+                reporter.cancel()
+                with suppress(asyncio.CancelledError):
+                    await reporter
+
+        if reporter:
+            await self._edit(progress.render(title), chat_id, message_id)
+
+    async def _report(self, progress: ApproveProgress, chat_id: int, message_id: int) -> None:
+        """Редактировать сообщение с прогрессом не чаще broadcast_progress_interval."""
+        interval = max(1.0, get_config().broadcast_progress_interval)
+        last_text = None
+
+        while True:
+            text = progress.render()
+            if text != last_text:
+                await self._edit(text, chat_id, message_id)
+                last_text = text
+            await asyncio.sleep(interval)
+
+    async def _edit(self, text: str, chat_id: int, message_id: int) -> None:
+        try:
+            await get_rate_limiter().send(
+                chat_id,
+                partial(self.bot.edit_message_text, text=text, chat_id=chat_id, message_id=message_id)
+            )
+        except TelegramBadRequest as e:
+            # "message is not modified" и удалённое сообщение не критичны
+            logger.debug(f"[bulk approve] Прогресс не обновлён: {e}")
+        except Exception as e:
+            logger.warning(f"[bulk approve] Ошибка обновления прогресса: {e}")
@@ -0,0 +1,149 @@
+"""Пул заранее нарисованных процедурных капч."""
+
+import asyncio
+import multiprocessing
+import secrets
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import suppress
+from dataclasses import dataclass
+from typing import Deque, List, Optional
+
+from app.core import get_logger
+from app.utils import captcha_render
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class GeneratedCaptcha:
+    """Готовая к отправке капча."""
+    image: bytes  # PNG
+    answer: str
+    variants: List[str]
+    uses_left: int  # Сколько ещё пользователей увидят эту картинку
+
+
+class CaptchaPool:
+    """
+    Ограниченный пул готовых капч.
+
+    Рендер (десятки миллисекунд CPU на картинку) идёт в пуле процессов и
+    не блокирует event loop. Выдача — popleft из deque за O(1); когда
+    в пуле остаётся меньше low_water капч, фоновая задача дорисовывает
+    его до size. Одна картинка показывается не более чем reuse
+    пользователям: в Telegram она загружается один раз (CaptchaImageCache),
+    остальные показы идут по file_id.
+
+    Без Pillow пул не запускается, а pop() возвращает None — капча
+    берётся из фиксированных картинок.
+    """
+
+    def __init__(self, size: int = 50, low_water: int = 20, workers: int = 2, reuse: int = 1):
+        """
+        Args:
+            size: Ёмкость пула
+            low_water: Порог, ниже которого пул дорисовывается
+            workers: Процессов рендера
+            reuse: Показов одной картинки
+        """
+        self.size = max(1, size)
+        self.low_water = min(max(0, low_water), self.size)
+        self.workers = max(1, workers)
+        self.reuse = max(1, reuse)
+
+        self._ready: Deque[GeneratedCaptcha] = deque()
+        self._refill = asyncio.Event()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._task is not None
+
+    def __len__(self) -> int:
+        return len(self._ready)
+
+    def start(self) -> None:
+        """Запустить процессы рендера и первичное заполнение пула."""
+        if self._task is not None:
+            return
+
+        if not captcha_render.is_available():
+            logger.warning("⚠️ Pillow не установлен — процедурная капча отключена, используются картинки из assets/")
+            return
+
+        # spawn: дочерние процессы не наследуют event loop и соединения бота
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        self._task = asyncio.create_task(self._run())
+        self._refill.set()
+        logger.info(f"✅ Пул капч запущен (до {self.size} картинок, {self.workers} процессов)")
+
+    async def stop(self) -> None:
+        """Остановить дорисовку и процессы рендера."""
+        if self._task:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def pop(self) -> Optional[GeneratedCaptcha]:
+        """
+        Взять готовую капчу (O(1), без ожидания рендера).
+
+        Returns:
+            Капча или None, если пул пуст или отключён
+        """
+        if not self._ready:
+            self._refill.set()
+            return None
+
+        captcha = self._ready.popleft()
+        captcha.uses_left -= 1
+        if captcha.uses_left > 0:
+            # Картинка ещё покажется другим — в конец очереди
+            self._ready.append(captcha)
+
+        if len(self._ready) < self.low_water:
+            self._refill.set()
+        return captcha
+
+    async def _run(self) -> None:
+        """Дорисовывать пул до size, когда он опускается ниже low_water."""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            await self._refill.wait()
+            self._refill.clear()
+
+            missing = self.size - len(self._ready)
+            if missing <= 0:
+                continue
+
+            futures = [
+                loop.run_in_executor(self._executor, captcha_render.render_captcha, secrets.randbits(64))
+                for _ in range(missing)
+            ]
+            for future in asyncio.as_completed(futures):
+                try:
+                    image, answer, variants = await future
+                except asyncio.CancelledError:
+                    raise
+                except BrokenProcessPool as e:
+                    # Процессы рендера упали — дальше капча только из assets/
+                    logger.error(f"[captcha] Пул рендера недоступен, генератор остановлен: {e}")
+                    return
+                except Exception as e:
+                    logger.error(f"[captcha] Ошибка рендера капчи: {e}")
+                    continue
+
+                if len(self._ready) < self.size:
+                    self._ready.append(GeneratedCaptcha(image, answer, variants, self.reuse))
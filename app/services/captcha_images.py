@@ -0,0 +1,145 @@
+"""Кэш картинок капчи: загруженные в Telegram file_id по хэшу содержимого."""
+
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, Union
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import BufferedInputFile, InputFile, Message
+from redis.asyncio import Redis
+
+from app.core import get_logger
+
+logger = get_logger(__name__)
+
+# Redis hash: sha256 картинки -> file_id (file_id бота не истекает, TTL не нужен)
+FILE_IDS_KEY = "captcha:file_ids"
+
+# Ошибки Telegram про сам file_id ("wrong file identifier", "wrong remote
+# file identifier", FILE_REFERENCE_EXPIRED) — только после них file_id забывается
+INVALID_FILE_ID_ERRORS = ("file identifier", "file reference", "file_reference")
+
+SendPhoto = Callable[[Union[str, InputFile]], Awaitable[Message]]
+
+
+class CaptchaImageCache:
+    """
+    Отправка картинок капчи без повторной загрузки.
+
+    Картинка загружается в Telegram один раз, полученный file_id
+    сохраняется в памяти и в Redis (общий для всех процессов бота и
+    переживает рестарт) по sha256 содержимого. Дальше отправляется
+    только file_id. Файлы из assets/ читаются с диска один раз и
+    держатся в памяти — если file_id станет недействительным, картинка
+    отправляется заново из буфера без чтения диска.
+    """
+
+    def __init__(self, redis: Optional[Redis] = None):
+        """
+        Args:
+            redis: Общий клиент из dispatcher (None — только память процесса)
+        """
+        self.redis = redis
+        self._file_ids: Dict[str, str] = {}
+        self._files: Dict[Path, bytes] = {}
+        # Одна загрузка на картинку, даже если капчу запросили сразу многие
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    @staticmethod
+    def digest(image: bytes) -> str:
+        return hashlib.sha256(image).hexdigest()
+
+    async def load(self, path: Path) -> bytes:
+        """Содержимое файла (с диска — только при первом обращении)."""
+        image = self._files.get(path)
+        if image is None:
+            image = await asyncio.to_thread(path.read_bytes)
+            self._files[path] = image
+        return image
+
+    async def send(
+            self,
+            image: bytes,
+            filename: str,
+            send_photo: SendPhoto,
+            persistent: bool = True
+    ) -> Message:
+        """
+        Отправить картинку: по file_id, а при первой отправке — загрузкой.
+
+        Args:
+            image: Содержимое картинки
+            filename: Имя файла для загрузки
+            send_photo: Отправка с готовым photo (file_id или файл)
+            persistent: Хранить file_id и в Redis (False — только в памяти,
+                для временных картинок; убираются через forget)
+
+        Returns:
+            Отправленное сообщение
+        """
+        digest = self.digest(image)
+
+        file_id = await self._get_file_id(digest, persistent)
+        if file_id is None:
+            lock = self._locks.setdefault(digest, asyncio.Lock())
+            async with lock:
+                # Пока ждали, картинку мог загрузить параллельный запрос
+                file_id = await self._get_file_id(digest, persistent)
+                if file_id is None:
+                    message = await send_photo(BufferedInputFile(image, filename))
+                    await self._remember(digest, message, persistent)
+                    return message
+
+        try:
+            return await send_photo(file_id)
+        except TelegramBadRequest as e:
+            # Прочие ошибки (chat not found, подпись) к file_id не относятся —
+            # общий file_id остаётся, ошибка уходит вызывающему
+            if not any(marker in str(e).lower() for marker in INVALID_FILE_ID_ERRORS):
+                raise
+
+            # file_id недействителен (другой токен бота, удалён файл) — грузим заново
+            logger.warning(f"[captcha] file_id картинки {digest[:12]} не принят: {e}")
+            await self._forget(digest, persistent)
+            message = await send_photo(BufferedInputFile(image, filename))
+            await self._remember(digest, message, persistent)
+            return message
+
+    def forget(self, image: bytes) -> None:
+        """Забыть file_id временной картинки (хранится только в памяти)."""
+        digest = self.digest(image)
+        self._file_ids.pop(digest, None)
+        self._locks.pop(digest, None)
+
+    async def _get_file_id(self, digest: str, persistent: bool = True) -> Optional[str]:
+        file_id = self._file_ids.get(digest)
+        if file_id is None and persistent and self.redis is not None:
+            try:
+                file_id = await self.redis.hget(FILE_IDS_KEY, digest)
+            except Exception as e:
+                logger.warning(f"[captcha] Redis недоступен, file_id только в памяти: {e}")
+            if file_id is not None:
+                self._file_ids[digest] = file_id
+        return file_id
+
+    async def _remember(self, digest: str, message: Message, persistent: bool = True) -> None:
+        if not message.photo:
+            return
+
+        file_id = message.photo[-1].file_id
+        self._file_ids[digest] = file_id
+        self._locks.pop(digest, None)
+        if persistent and self.redis is not None:
+            try:
+                await self.redis.hset(FILE_IDS_KEY, digest, file_id)
+            except Exception:
+                pass
+
+    async def _forget(self, digest: str, persistent: bool = True) -> None:
+        self._file_ids.pop(digest, None)
+        if persistent and self.redis is not None:
+            try:
+                await self.redis.hdel(FILE_IDS_KEY, digest)
+            except Exception:
+                pass
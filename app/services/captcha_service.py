@@ -2,14 +2,17 @@
 
 import os
 import random
+from functools import partial
 from pathlib import Path
-from typing import Tuple, List
+from typing import List, Optional, Tuple
 
-from aiogram.types import FSInputFile, InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from redis.asyncio import Redis
-
-from app.core import get_logger, get_config
+from app.core import get_logger
+from app.services.captcha_generator import CaptchaPool
+from app.services.captcha_images import CaptchaImageCache
+from app.services.captcha_store import CaptchaStore
+from app.services.rate_limiter import Priority, get_rate_limiter
 
 logger = get_logger(__name__)
 
@@ -40,194 +43,82 @@ def get_random_captcha() -> Tuple[Path, str, List[str]]:
     return image_path, correct_emoji, shuffled_variants
 
 
-def build_captcha_keyboard(variants: List[str], user_id: int, correct_answer: str) -> InlineKeyboardMarkup:
-    """
-    Создать inline-клавиатуру с вариантами капчи.
-
-    Args:
-        variants: Список эмодзи для кнопок
-        user_id: ID пользователя (для callback_data)
-        correct_answer: Правильный ответ
-
-    Returns:
-        InlineKeyboardMarkup с кнопками
-    """
-    builder = InlineKeyboardBuilder()
-
-    # Создаём кнопки по 2 в ряд
-    for i in range(0, len(variants), 2):
-        row_variants = variants[i:i + 2]
-        buttons = []
-
-        for emoji in row_variants:
-            # В callback_data передаём: captcha:user_id:emoji:правильный_ответ
-            callback_data = f"captcha:{user_id}:{emoji}:{correct_answer}"
-            buttons.append(InlineKeyboardButton(text=emoji, callback_data=callback_data))
-
-        builder.row(*buttons)
-
-    return builder.as_markup()
-
-
-async def send_captcha_to_user(bot, user_id: int) -> bool:
+async def send_captcha_to_user(
+        bot,
+        user_id: int,
+        store: CaptchaStore,
+        images: CaptchaImageCache,
+        pool: Optional[CaptchaPool] = None
+) -> bool:
     """
     Отправить капчу пользователю.
 
     Args:
         bot: Экземпляр бота
-        user_id: ID пользователя
-
-    Returns:
-        True если капча отправлена успешно
+        user_id: Пользователь
+        store: Хранилище состояния капчи из dispatcher
+        images: Кэш file_id картинок капчи из dispatcher
+        pool: Пул процедурных капч (пуст или None — фиксированные картинки)
     """
     try:
-        # Получаем случайную капчу
-        image_path, correct_answer, variants = get_random_captcha()
-
-        # Проверяем существование файла
-        if not image_path.exists():
-            logger.error(f"Файл капчи не найден: {image_path}")
-            # Пытаемся отправить без картинки
-            image_path = None
-
-        # Сохраняем правильный ответ в Redis
-        config = get_config()
-        try:
-            redis = Redis.from_url(config.redis_url, decode_responses=True)
-            # Сохраняем на 5 минут (300 секунд) по ТЗ
-            await redis.setex(f"captcha:{user_id}", 300, correct_answer)
-            # Сбрасываем счётчик попыток
-            await redis.setex(f"captcha_attempts:{user_id}", 300, "0")
-            await redis.close()
-        except Exception as e:
-            logger.warning(f"[id{user_id}] Redis недоступен: {e}")
-
-        # Создаём клавиатуру
-        keyboard = build_captcha_keyboard(variants, user_id, correct_answer)
-
-        # Текст капчи
-        caption = (
-            "🔐 <b>Проверка безопасности</b>\n\n"
-            "Выберите эмодзи, которое изображено на картинке:\n\n"
-            "⚠️ У вас есть <b>3 попытки</b>\n"
-            "⚠️ <i>При ответе вы соглашаетесь на получение сообщений от бота</i>"
-        )
-
-        # Отправляем капчу
-        if image_path:
-            photo = FSInputFile(image_path)
-            await bot.send_photo(
-                chat_id=user_id,
-                photo=photo,
-                caption=caption,
-                reply_markup=keyboard
-            )
+        # Процедурная капча из пула (без ожидания рендера), иначе — фиксированная
+        generated = pool.pop() if pool else None
+
+        if generated:
+            image = generated.image
+            filename = "captcha.png"
+            correct_answer, variants = generated.answer, generated.variants
+            question = "Выберите код, который изображён на картинке:"
         else:
-            # Без картинки
-            await bot.send_message(
-                chat_id=user_id,
-                text=caption,
-                reply_markup=keyboard
-            )
-
-        logger.info(f"[id{user_id}] Капча отправлена: {correct_answer}")
-        return True
-
-    except Exception as e:
-        logger.error(f"[id{user_id}] Ошибка отправки капчи: {e}")
-        return False
-
-
-def build_captcha_keyboard(variants: List[str], user_id: int, correct_answer: str) -> InlineKeyboardMarkup:
-    """
-    Создать inline-клавиатуру с вариантами капчи.
-    """
-    builder = InlineKeyboardBuilder()
-
-    # Создаём кнопки по 2 в ряд
-    for i in range(0, len(variants), 2):
-        row_variants = variants[i:i + 2]
-        buttons = []
-
-        for emoji in row_variants:
-            callback_data = f"captcha:{user_id}:{emoji}:{correct_answer}"
-            buttons.append(InlineKeyboardButton(text=emoji, callback_data=callback_data))
-
-        builder.row(*buttons)
-
-    # Добавляем кнопку "Обновить капчу" (если нужно)
-    builder.row(
-        InlineKeyboardButton(
-            text="🔄 Обновить капчу",
-            callback_data=f"captcha_resend:{user_id}"
-        )
-    )
-
-    return builder.as_markup()
-
-
-async def send_captcha_to_user(bot, user_id: int) -> bool:
-    """
-    Отправить капчу пользователю.
-    """
-    try:
-        # Получаем случайную капчу
-        image_path, correct_answer, variants = get_random_captcha()
-
-        # Проверяем существование файла
-        if not image_path.exists():
-            logger.error(f"Файл капчи не найден: {image_path}")
-            image_path = None
-
-        # Пытаемся сохранить в Redis, но если недоступен - продолжаем
-        config = get_config()
-        redis = None
-        try:
-            redis = Redis.from_url(config.redis_url, decode_responses=True)
-            await redis.setex(f"captcha:{user_id}", 300, correct_answer)
-            await redis.setex(f"captcha_attempts:{user_id}", 300, "0")
-            logger.debug(f"[id{user_id}] Ответ сохранён в Redis: {correct_answer}")
-        except Exception as e:
-            logger.warning(f"[id{user_id}] Redis недоступен, работаем без него: {e}")
-            # Сохраняем в памяти как fallback
-            global in_memory_captcha_store
-            if 'in_memory_captcha_store' not in globals():
-                in_memory_captcha_store = {}
-            in_memory_captcha_store[user_id] = {
-                'answer': correct_answer,
-                'attempts': 0,
-                'timestamp': datetime.now()
-            }
-        finally:
-            if redis:
-                await redis.close()
+            # Получаем случайную капчу
+            image_path, correct_answer, variants = get_random_captcha()
+            question = "Выберите эмодзи, которое изображено на картинке:"
+
+            # Проверяем существование файла
+            image = None
+            if image_path.exists():
+                image = await images.load(image_path)
+                filename = image_path.name
+            else:
+                logger.error(f"Файл капчи не найден: {image_path}")
+
+        # Ответ и счётчик попыток — один hash в Redis (или память, если Redis недоступен).
+        # В stateless-режиме ответ не хранится, а подписывается в кнопках
+        token = await store.save(user_id, correct_answer)
 
         # Создаём клавиатуру (без correct_answer в callback_data для безопасности)
-        keyboard = build_captcha_keyboard(variants, user_id)
+        keyboard = build_captcha_keyboard(variants, user_id, token)
 
         # Текст капчи
         caption = (
             "🔐 <b>Проверка безопасности</b>\n\n"
-            "Выберите эмодзи, которое изображено на картинке:\n\n"
+            f"{question}\n\n"
             "⚠️ У вас есть <b>3 попытки</b>\n"
             "⚠️ <i>При ответе вы соглашаетесь на получение сообщений от бота</i>"
         )
 
-        # Отправляем капчу
-        if image_path:
-            photo = FSInputFile(image_path)
-            await bot.send_photo(
-                chat_id=user_id,
-                photo=photo,
-                caption=caption,
-                reply_markup=keyboard
+        # Отправляем капчу через общий ограничитель — вне очереди рассылок
+        if image:
+            # Картинка загружается в Telegram один раз, дальше уходит только file_id.
+            # file_id процедурных картинок живёт в памяти, пока картинка в пуле
+            await images.send(
+                image,
+                filename,
+                lambda photo: get_rate_limiter().send(
+                    user_id,
+                    partial(bot.send_photo, chat_id=user_id, photo=photo, caption=caption, reply_markup=keyboard),
+                    priority=Priority.INTERACTIVE
+                ),
+                persistent=generated is None
             )
+            if generated and not generated.uses_left:
+                images.forget(image)
         else:
             # Без картинки
-            await bot.send_message(
-                chat_id=user_id,
-                text=caption,
-                reply_markup=keyboard
+            await get_rate_limiter().send(
+                user_id,
+                partial(bot.send_message, chat_id=user_id, text=caption, reply_markup=keyboard),
+                priority=Priority.INTERACTIVE
             )
 
         logger.info(f"[id{user_id}] Капча отправлена: {correct_answer}")
@@ -238,10 +129,15 @@ async def send_captcha_to_user(bot, user_id: int) -> bool:
         return False
 
 
-def build_captcha_keyboard(variants: List[str], user_id: int) -> InlineKeyboardMarkup:
+def build_captcha_keyboard(variants: List[str], user_id: int, token: Optional[str] = None) -> InlineKeyboardMarkup:
     """
     Создать inline-клавиатуру с вариантами капчи.
     Без передачи правильного ответа в callback_data.
+
+    Args:
+        variants: Варианты ответа
+        user_id: Пользователь
+        token: Подпись stateless-капчи (CaptchaSigner), одна на все кнопки
     """
     builder = InlineKeyboardBuilder()
 
@@ -251,8 +147,10 @@ def build_captcha_keyboard(variants: List[str], user_id: int) -> InlineKeyboardM
         buttons = []
 
         for emoji in row_variants:
-            # Только user_id и выбранный emoji
+            # Только user_id и выбранный emoji (+ подпись в stateless-режиме)
             callback_data = f"captcha:{user_id}:{emoji}"
+            if token:
+                callback_data = f"{callback_data}:{token}"
             buttons.append(InlineKeyboardButton(text=emoji, callback_data=callback_data))
 
         builder.row(*buttons)
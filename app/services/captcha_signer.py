@@ -0,0 +1,77 @@
+"""Подпись капчи в callback_data: проверка ответа без обращения к хранилищу."""
+
+import base64
+import hashlib
+import hmac
+import secrets
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+# callback_data кнопки Telegram — не больше 64 байт
+CALLBACK_DATA_LIMIT = 64
+
+
+@dataclass
+class SignedAnswer:
+    """Проверенное нажатие кнопки stateless-капчи."""
+    nonce: str  # Идентификатор капчи
+    expires_at: int  # Unix-время истечения
+    correct: bool
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+class CaptchaSigner:
+    """
+    Stateless-капча: правильный ответ хранится в кнопках в виде HMAC.
+
+    Токен "срок.nonce.mac" одинаков у всех кнопок капчи, где
+    mac = HMAC(secret, user_id:срок:nonce:правильный_ответ). Нажатая
+    кнопка передаёт свой вариант, и ответ проверяется пересчётом HMAC —
+    только CPU, без Redis. Не зная secret, по кнопкам нельзя понять,
+    какая из них верная. nonce различает капчи одного пользователя:
+    по нему хранилище считает попытки.
+    """
+
+    def __init__(self, secret: str, ttl: int, mac_size: int = 9):
+        """
+        Args:
+            secret: Ключ HMAC (общий для всех процессов бота)
+            ttl: Время жизни капчи (секунды)
+            mac_size: Длина подписи в байтах (9 -> 12 символов base64)
+        """
+        self._key = hashlib.sha256(f"captcha:{secret}".encode()).digest()
+        self.ttl = ttl
+        self.mac_size = mac_size
+
+    def _mac(self, user_id: int, expires_at: int, nonce: str, answer: str) -> str:
+        message = f"{user_id}:{expires_at}:{nonce}:{answer}".encode()
+        return _b64(hmac.new(self._key, message, hashlib.sha256).digest()[:self.mac_size])
+
+    def issue(self, user_id: int, answer: str) -> str:
+        """Токен новой капчи для callback_data её кнопок."""
+        expires_at = int(time.time()) + self.ttl
+        nonce = secrets.token_urlsafe(6)
+        return f"{expires_at:x}.{nonce}.{self._mac(user_id, expires_at, nonce, answer)}"
+
+    def verify(self, user_id: int, token: str, answer: str) -> Optional[SignedAnswer]:
+        """
+        Проверить выбранный вариант.
+
+        Returns:
+            SignedAnswer или None, если токен испорчен или капча истекла
+        """
+        try:
+            expires_hex, nonce, mac = token.split(".")
+            expires_at = int(expires_hex, 16)
+        except ValueError:
+            return None
+
+        if expires_at <= time.time():
+            return None
+
+        correct = hmac.compare_digest(mac, self._mac(user_id, expires_at, nonce, answer))
+        return SignedAnswer(nonce, expires_at, correct)
@@ -0,0 +1,339 @@
+"""Хранилище состояния капчи: Redis hash + Lua, fallback в памяти."""
+
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import suppress
+from dataclasses import dataclass
+from enum import Enum
+from typing import Callable, Dict, Hashable, Optional
+
+from redis.asyncio import Redis
+
+from app.core import get_logger
+from app.services.captcha_signer import CaptchaSigner
+
+logger = get_logger(__name__)
+
+# Проверка ответа целиком на стороне Redis: чтение, инкремент попыток,
+# правило max_attempts и удаление — одна атомарная команда
+CHECK_ANSWER_LUA = """
+local answer = redis.call('HGET', KEYS[1], 'answer')
+if not answer then
+    return {'expired', 0}
+end
+
+local attempts = redis.call('HINCRBY', KEYS[1], 'attempts', 1)
+if answer == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    return {'correct', attempts}
+end
+
+if attempts >= tonumber(ARGV[2]) then
+    redis.call('DEL', KEYS[1])
+    return {'exhausted', attempts}
+end
+
+return {'wrong', attempts}
+"""
+
+# Счётчик попыток stateless-капчи: верность ответа уже проверена по HMAC,
+# здесь только попытка, лимит и отметка «решена» (-1) атомарно
+COUNT_ATTEMPT_LUA = """
+local attempts = tonumber(redis.call('GET', KEYS[1]) or '0')
+if attempts < 0 then
+    return {'expired', 0}
+end
+
+attempts = attempts + 1
+if ARGV[1] == '1' then
+    redis.call('SET', KEYS[1], -1, 'EX', ARGV[3])
+    return {'correct', attempts}
+end
+
+if attempts >= tonumber(ARGV[2]) then
+    redis.call('SET', KEYS[1], -1, 'EX', ARGV[3])
+    return {'exhausted', attempts}
+end
+
+redis.call('SET', KEYS[1], attempts, 'EX', ARGV[3])
+return {'wrong', attempts}
+"""
+
+
+class CaptchaVerdict(str, Enum):
+    """Результат проверки ответа."""
+    CORRECT = "correct"  # Верно, капча удалена
+    WRONG = "wrong"  # Неверно, попытки ещё есть
+    EXHAUSTED = "exhausted"  # Неверно, попытки кончились, капча удалена
+    EXPIRED = "expired"  # Капчи нет (истекла или уже решена)
+
+
+@dataclass
+class CaptchaCheck:
+    """Вердикт и номер попытки (включая текущую)."""
+    verdict: CaptchaVerdict
+    attempts: int
+
+
+class MemoryCaptchaStore:
+    """
+    Капчи в памяти процесса на время недоступности Redis.
+
+    Запись живёт ttl секунд, как и ключ в Redis. Число записей ограничено
+    max_size: при переполнении вытесняется давно не использованная (LRU),
+    поэтому рейд ботов во время падения Redis не раздувает память.
+    Истёкшие записи удаляются при обращении и периодически через sweep().
+    Между чтением и записью нет await — операции атомарны в event loop.
+    """
+
+    def __init__(self, ttl: int, max_size: int = 10000, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            ttl: Время жизни капчи (секунды)
+            max_size: Максимум капч в памяти
+            clock: Источник времени (для тестов)
+        """
+        self.ttl = ttl
+        self.max_size = max(1, max_size)
+        self._clock = clock
+        # user_id -> {answer, attempts, expires_at}; порядок — от давно использованных.
+        # Счётчики stateless-капч — под ключом (user_id, nonce) без answer
+        self._entries: OrderedDict[Hashable, Dict] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, user_id: int) -> bool:
+        state = self._entries.get(user_id)
+        return state is not None and state["expires_at"] > self._clock()
+
+    def save(self, user_id: int, answer: str) -> None:
+        """Сохранить новую капчу (сбрасывает попытки)."""
+        self._put(user_id, answer, self.ttl)
+
+    def _put(self, key: Hashable, answer: Optional[str], ttl: float) -> Dict:
+        self._entries.pop(key, None)
+        state = self._entries[key] = {
+            "answer": answer,
+            "attempts": 0,
+            "expires_at": self._clock() + ttl,
+        }
+
+        evicted = 0
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            evicted += 1
+        if evicted:
+            logger.warning(f"[captcha] Fallback в памяти переполнен, вытеснено капч: {evicted}")
+        return state
+
+    def check(self, user_id: int, answer: str, max_attempts: int) -> CaptchaCheck:
+        """Проверить ответ и засчитать попытку (логика как в CHECK_ANSWER_LUA)."""
+        state = self._entries.get(user_id)
+        if state is None or state["expires_at"] <= self._clock():
+            self._entries.pop(user_id, None)
+            return CaptchaCheck(CaptchaVerdict.EXPIRED, 0)
+
+        self._entries.move_to_end(user_id)
+        state["attempts"] += 1
+        attempts = state["attempts"]
+
+        if answer == state["answer"]:
+            del self._entries[user_id]
+            return CaptchaCheck(CaptchaVerdict.CORRECT, attempts)
+
+        if attempts >= max_attempts:
+            del self._entries[user_id]
+            return CaptchaCheck(CaptchaVerdict.EXHAUSTED, attempts)
+
+        return CaptchaCheck(CaptchaVerdict.WRONG, attempts)
+
+    def count(self, key: Hashable, correct: bool, max_attempts: int, ttl: float) -> CaptchaCheck:
+        """Засчитать попытку stateless-капчи (логика как в COUNT_ATTEMPT_LUA)."""
+        state = self._entries.get(key)
+        if state is None or state["expires_at"] <= self._clock():
+            state = self._put(key, None, ttl)
+        else:
+            self._entries.move_to_end(key)
+
+        if state["attempts"] < 0:
+            return CaptchaCheck(CaptchaVerdict.EXPIRED, 0)
+
+        state["attempts"] += 1
+        attempts = state["attempts"]
+        if correct or attempts >= max_attempts:
+            state["attempts"] = -1
+            verdict = CaptchaVerdict.CORRECT if correct else CaptchaVerdict.EXHAUSTED
+            return CaptchaCheck(verdict, attempts)
+
+        return CaptchaCheck(CaptchaVerdict.WRONG, attempts)
+
+    def pop(self, user_id: int) -> None:
+        self._entries.pop(user_id, None)
+
+    def sweep(self) -> int:
+        """
+        Удалить истёкшие капчи.
+
+        Returns:
+            Сколько удалено
+        """
+        now = self._clock()
+        expired = [user_id for user_id, state in self._entries.items() if state["expires_at"] <= now]
+        for user_id in expired:
+            del self._entries[user_id]
+        return len(expired)
+
+
+class CaptchaStore:
+    """
+    Состояние капчи пользователя.
+
+    В Redis это один hash captcha:state:{user_id} с полями answer и
+    attempts. Ответ проверяется Lua-скриптом за один round-trip, поэтому
+    параллельные нажатия не считаются дважды и не обходят лимит попыток.
+    Если Redis недоступен, используется MemoryCaptchaStore с той же
+    логикой; фоновая задача (start) периодически чистит в нём истёкшие
+    капчи.
+
+    С signer капча stateless: ответ не сохраняется, а подписывается в
+    callback_data кнопок (CaptchaSigner) и проверяется без хранилища.
+    В Redis остаётся только счётчик попыток captcha:attempts:{user_id}:{nonce}.
+    """
+
+    def __init__(
+            self,
+            redis: Optional[Redis],
+            ttl: int = 300,
+            max_attempts: int = 3,
+            memory_max_size: int = 10000,
+            sweep_interval: float = 30.0,
+            signer: Optional[CaptchaSigner] = None
+    ):
+        """
+        Args:
+            redis: Общий клиент из dispatcher (None — только память)
+            ttl: Время жизни капчи (секунды)
+            max_attempts: Попыток до провала
+            memory_max_size: Максимум капч в памяти без Redis
+            sweep_interval: Период очистки истёкших капч в памяти (секунды)
+            signer: Подпись ответа в кнопках (None — ответ хранится в store)
+        """
+        self.redis = redis
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self.sweep_interval = sweep_interval
+        self.signer = signer
+        self._check_script = redis.register_script(CHECK_ANSWER_LUA) if redis is not None else None
+        self._count_script = redis.register_script(COUNT_ATTEMPT_LUA) if redis is not None else None
+        self._memory = MemoryCaptchaStore(ttl, memory_max_size)
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def key(user_id: int) -> str:
+        return f"captcha:state:{user_id}"
+
+    def start(self) -> None:
+        """Запустить периодическую очистку fallback-хранилища."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def save(self, user_id: int, answer: str) -> Optional[str]:
+        """
+        Сохранить новую капчу (сбрасывает попытки).
+
+        Returns:
+            Токен для callback_data кнопок в stateless-режиме, иначе None
+        """
+        if self.signer is not None:
+            # Хранить нечего: ответ подписан в кнопках, попытки считаются по nonce
+            return self.signer.issue(user_id, answer)
+
+        if self.redis is not None:
+            try:
+                key = self.key(user_id)
+                async with self.redis.pipeline(transaction=True) as pipe:
+                    pipe.delete(key)
+                    pipe.hset(key, mapping={"answer": answer, "attempts": 0})
+                    pipe.expire(key, self.ttl)
+                    await pipe.execute()
+                return None
+            except Exception as e:
+                logger.warning(f"[id{user_id}] Redis недоступен, капча хранится в памяти: {e}")
+
+        self._memory.save(user_id, answer)
+        return None
+
+    async def check(self, user_id: int, answer: str) -> CaptchaCheck:
+        """Проверить ответ и засчитать попытку."""
+        if self._check_script is not None:
+            try:
+                verdict, attempts = await self._check_script(
+                    keys=[self.key(user_id)],
+                    args=[answer, self.max_attempts]
+                )
+                if isinstance(verdict, bytes):
+                    verdict = verdict.decode()
+                check = CaptchaCheck(CaptchaVerdict(verdict), int(attempts))
+                # Капча могла быть выдана, пока Redis лежал
+                if check.verdict != CaptchaVerdict.EXPIRED or user_id not in self._memory:
+                    return check
+            except Exception as e:
+                logger.warning(f"[id{user_id}] Redis недоступен, проверяем капчу в памяти: {e}")
+
+        return self._memory.check(user_id, answer, self.max_attempts)
+
+    async def check_signed(self, user_id: int, token: str, answer: str) -> CaptchaCheck:
+        """
+        Проверить ответ stateless-капчи.
+
+        Верность ответа и срок проверяются по подписи без обращения к
+        хранилищу; в Redis (или память) идёт только счётчик попыток.
+        """
+        if self.signer is None:
+            # Кнопки от stateless-режима, а он выключен
+            return CaptchaCheck(CaptchaVerdict.EXPIRED, 0)
+
+        signed = self.signer.verify(user_id, token, answer)
+        if signed is None:
+            return CaptchaCheck(CaptchaVerdict.EXPIRED, 0)
+
+        ttl = max(1, signed.expires_at - int(time.time()))
+        if self._count_script is not None:
+            try:
+                verdict, attempts = await self._count_script(
+                    keys=[f"captcha:attempts:{user_id}:{signed.nonce}"],
+                    args=[int(signed.correct), self.max_attempts, ttl]
+                )
+                if isinstance(verdict, bytes):
+                    verdict = verdict.decode()
+                return CaptchaCheck(CaptchaVerdict(verdict), int(attempts))
+            except Exception as e:
+                logger.warning(f"[id{user_id}] Redis недоступен, попытки капчи считаются в памяти: {e}")
+
+        return self._memory.count((user_id, signed.nonce), signed.correct, self.max_attempts, ttl)
+
+    async def clear(self, user_id: int) -> None:
+        """Удалить капчу пользователя."""
+        if self.redis is not None:
+            try:
+                await self.redis.delete(self.key(user_id))
+            except Exception:
+                pass
+
+        self._memory.pop(user_id)
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            removed = self._memory.sweep()
+            if removed:
+                logger.debug(f"[captcha] Удалено истёкших капч из памяти: {removed}")
@@ -0,0 +1,114 @@
+"""Истечение капч: одна фоновая задача на все выданные капчи."""
+
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import suppress
+from typing import Awaitable, Callable, List, Optional
+
+from app.core import get_logger
+
+logger = get_logger(__name__)
+
+
+class CaptchaTimeouts:
+    """
+    Очередь сроков выданных капч.
+
+    Срок у всех капч одинаковый (timeout), поэтому порядок постановки
+    совпадает с порядком истечения: OrderedDict user_id -> срок уже
+    отсортирован. Постановка, перепостановка (move_to_end) и отмена — O(1),
+    одна задача спит до ближайшего срока, а не по задаче на пользователя.
+    Истёкшие капчи передаются в on_expire не более concurrency за раз.
+    """
+
+    def __init__(
+            self,
+            timeout: float,
+            on_expire: Callable[[int], Awaitable[None]],
+            concurrency: int = 10
+    ):
+        """
+        Args:
+            timeout: Время на ответ (секунды)
+            on_expire: Обработка истёкшей капчи (получает user_id)
+            concurrency: Одновременных обработок истечения
+        """
+        self.timeout = timeout
+        self.on_expire = on_expire
+        self.concurrency = max(1, concurrency)
+
+        self._deadlines: OrderedDict[int, float] = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._deadlines
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def schedule(self, user_id: int) -> None:
+        """Отсчитать timeout с текущего момента (повторная капча — заново)."""
+        self._deadlines.pop(user_id, None)
+        self._deadlines[user_id] = time.monotonic() + self.timeout
+        self._wakeup.set()
+
+    def cancel(self, user_id: int) -> bool:
+        """
+        Снять срок (капча решена или провалена).
+
+        Returns:
+            False если срока не было (уже истёк или не ставился)
+        """
+        return self._deadlines.pop(user_id, None) is not None
+
+    def pop_expired(self) -> List[int]:
+        """Забрать пользователей с истёкшим сроком."""
+        now = time.monotonic()
+        expired = []
+        while self._deadlines:
+            user_id, deadline = next(iter(self._deadlines.items()))
+            if deadline > now:
+                break
+            del self._deadlines[user_id]
+            expired.append(user_id)
+        return expired
+
+    async def _run(self) -> None:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def expire(user_id: int) -> None:
+            async with semaphore:
+                try:
+                    await self.on_expire(user_id)
+                except Exception as e:
+                    logger.error(f"[id{user_id}] Ошибка обработки истёкшей капчи: {e}")
+
+        while True:
+            if not self._deadlines:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            # Новые сроки всегда позже текущего первого — спим до него
+            delay = next(iter(self._deadlines.values())) - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            expired = self.pop_expired()
+            if expired:
+                logger.info(f"[captcha] Истекло капч: {len(expired)}")
+                await asyncio.gather(*(expire(user_id) for user_id in expired))
@@ -0,0 +1,97 @@
+"""Буферизованный журнал доставки рассылок."""
+
+import asyncio
+from contextlib import suppress
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.core import get_logger
+from app.database import DeliveryStatus, crud, get_session
+
+logger = get_logger(__name__)
+
+
+class DeliveryLog:
+    """
+    Буфер строк broadcast_deliveries.
+
+    Воркеры только добавляют строку в список (без await), а запись в БД
+    идёт фоном одним многострочным INSERT каждые batch_size строк или
+    flush_interval секунд — отправка не ждёт базу.
+
+    Журнал вспомогательный: счётчики рассылки в broadcast_jobs остаются
+    основным источником, поэтому ошибка записи пачки только логируется.
+    """
+
+    def __init__(self, job_id: int, batch_size: int = 200, flush_interval: float = 0.5):
+        """
+        Args:
+            job_id: Рассылка
+            batch_size: Строк в одном INSERT
+            flush_interval: Максимальная задержка записи (секунды)
+        """
+        self.job_id = job_id
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+
+        self._rows: List[Dict] = []
+        self._full = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._closing = False
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Запустить фоновую запись."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def add(
+            self,
+            chat_id: int,
+            status: DeliveryStatus,
+            error_code: Optional[int] = None,
+            latency_ms: int = 0
+    ) -> None:
+        """Добавить результат доставки (без ожидания БД)."""
+        self._rows.append({
+            "job_id": self.job_id,
+            "chat_id": chat_id,
+            "status": status,
+            "error_code": error_code,
+            "latency_ms": latency_ms,
+            "created_at": datetime.utcnow(),
+        })
+        if len(self._rows) >= self.batch_size:
+            self._full.set()
+
+    async def flush(self) -> None:
+        """Записать накопленные строки (пачками по batch_size)."""
+        async with self._lock:
+            rows, self._rows = self._rows, []
+            if not rows:
+                return
+
+            try:
+                async for session in get_session():
+                    for start in range(0, len(rows), self.batch_size):
+                        await crud.add_broadcast_deliveries(session, rows[start:start + self.batch_size])
+            except Exception as e:
+                logger.error(f"[broadcast #{self.job_id}] Не удалось записать журнал доставки ({len(rows)} строк): {e}")
+
+    async def close(self) -> None:
+        """Остановить фоновую запись и дописать остаток."""
+        # Без cancel(): прерванная запись потеряла бы уже забранную пачку
+        self._closing = True
+        self._full.set()
+        if self._task:
+            await self._task
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        """Писать по заполнению пачки или по таймеру."""
+        while not self._closing:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._full.wait(), self.flush_interval)
+            self._full.clear()
+            await self.flush()
@@ -0,0 +1,109 @@
+"""Очистка реестра заявок, ожидающих капчи."""
+
+import asyncio
+from contextlib import suppress
+from datetime import datetime, timedelta
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+
+from app.core import get_logger
+from app.database import crud, get_session
+from app.services.bulk_approve import decline_join_request
+from app.services.rate_limiter import Priority
+
+logger = get_logger(__name__)
+
+
+class JoinRequestCleaner:
+    """
+    Периодическая очистка таблицы join_requests.
+
+    Обычно заявку забирает капча (решена, провалена или истекла по
+    CaptchaTimeouts). Если срок капчи потерялся — рестарт, падение
+    процесса — заявка остаётся в реестре. Раз в interval такие заявки
+    старше ttl отклоняются в Telegram и удаляются пачками, поэтому
+    таблица не растёт без ограничений.
+    """
+
+    def __init__(self, bot: Bot, ttl: timedelta, interval: float = 300.0, batch_size: int = 500):
+        """
+        Args:
+            bot: Экземпляр бота
+            ttl: Сколько заявка может ждать капчу
+            interval: Период очистки (секунды)
+            batch_size: Заявок за один запрос к БД
+        """
+        self.bot = bot
+        self.ttl = ttl
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def cleanup(self) -> int:
+        """
+        Отклонить и удалить заявки старше ttl.
+
+        Отклонение идёт через общий ограничитель с приоритетом BULK.
+        Заявка, которую не удалось отклонить из-за временной ошибки
+        (сеть, RetryAfter сверх повторов ограничителя), возвращается
+        в реестр и отклоняется при следующей очистке после ttl.
+
+        Returns:
+            Сколько удалено
+        """
+        before = datetime.utcnow() - self.ttl
+        removed = 0
+
+        while True:
+            async for session in get_session():
+                expired = await crud.pop_expired_join_requests(session, before, limit=self.batch_size)
+
+            restored = []
+            for join_request in expired:
+                try:
+                    await decline_join_request(self.bot, join_request.chat_id, join_request.user_id, Priority.BULK)
+                except (TelegramBadRequest, TelegramForbiddenError):
+                    # Заявки уже нет — удаляем из реестра
+                    pass
+                except Exception as e:
+                    logger.warning(f"[id{join_request.user_id}] Заявка не отклонена, вернём в реестр: {e}")
+                    restored.append(join_request)
+
+            if restored:
+                async for session in get_session():
+                    for join_request in restored:
+                        await crud.save_join_request(
+                            session,
+                            user_id=join_request.user_id,
+                            chat_id=join_request.chat_id,
+                            username=join_request.username,
+                            first_name=join_request.first_name
+                        )
+
+            removed += len(expired) - len(restored)
+            if len(expired) < self.batch_size:
+                return removed
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                removed = await self.cleanup()
+                if removed:
+                    logger.info(f"🧹 Отклонено заявок без капчи: {removed}")
+            except Exception as e:
+                logger.error(f"Ошибка очистки заявок: {e}")
+
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,222 @@
+"""Глобальный ограничитель исходящих сообщений (token bucket)."""
+
+import asyncio
+import heapq
+import itertools
+import time
+from enum import IntEnum
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from aiogram.exceptions import TelegramRetryAfter
+
+from app.core import get_config, get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class Priority(IntEnum):
+    """Классы исходящих сообщений (меньше — важнее)."""
+    INTERACTIVE = 0  # Капча и ответы пользователю в процессе вступления
+    NORMAL = 1  # Приветствие, админка, уведомления
+    BULK = 2  # Рассылки — только свободная ёмкость
+
+
+class RateLimiter:
+    """
+    Token bucket для всех исходящих отправок бота.
+
+    - Глобальный лимит: ~30 сообщений в секунду на бота
+    - Лимит на чат: ~1 сообщение в секунду
+    - TelegramRetryAfter замораживает весь bucket, а не одну корутину
+    - Токены выдаются по приоритету: капча вперёд приветствия, приветствие
+      вперёд рассылки. BULK не трогает резерв bulk_reserve токенов, поэтому
+      новая заявка получает токен сразу, даже пока идёт большая рассылка
+    """
+
+    def __init__(
+            self,
+            rate: float = 30.0,
+            per_chat_rate: float = 1.0,
+            burst: Optional[float] = None,
+            max_retries: int = 3,
+            bulk_reserve: float = 0.0
+    ):
+        """
+        Args:
+            rate: Глобальный лимит (сообщений в секунду)
+            per_chat_rate: Лимит для одного чата (сообщений в секунду)
+            burst: Ёмкость bucket (по умолчанию равна rate)
+            max_retries: Сколько раз повторять отправку после RetryAfter
+            bulk_reserve: Токены, которые BULK оставляет для более важных сообщений
+        """
+        self.rate = rate
+        self.capacity = burst or rate
+        self.per_chat_interval = 1.0 / per_chat_rate if per_chat_rate > 0 else 0.0
+        self.max_retries = max_retries
+        self.bulk_reserve = min(bulk_reserve, max(0.0, self.capacity - 1))
+
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._frozen_until = 0.0
+        self._chat_next: Dict[int, float] = {}
+
+        # Очередь ожидающих: (приоритет, порядок, future) — FIFO внутри класса
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def _refill(self, now: float) -> None:
+        """Пополнить bucket по прошедшему времени."""
+        if now > self._updated:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def freeze(self, seconds: float) -> None:
+        """
+        Заморозить все отправки на seconds секунд (ответ 429).
+
+        Bucket обнуляется, чтобы после паузы не ушла пачка накопленных токенов.
+        """
+        until = time.monotonic() + seconds
+        if until > self._frozen_until:
+            self._frozen_until = until
+            self._tokens = 0.0
+            self._updated = until
+            self._wakeup.set()
+
+    async def _wait_chat(self, chat_id: int) -> None:
+        """Выдержать интервал между сообщениями в один чат."""
+        if not self.per_chat_interval:
+            return
+
+        now = time.monotonic()
+        slot = max(now, self._chat_next.get(chat_id, 0.0))
+        self._chat_next[chat_id] = slot + self.per_chat_interval
+
+        # Очищаем старые записи (если накопилось > 10000)
+        if len(self._chat_next) > 10000:
+            self._chat_next = {cid: ts for cid, ts in self._chat_next.items() if ts > now}
+
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def _needed(self, priority: int) -> float:
+        """Сколько токенов должно быть в bucket, чтобы выдать один этому классу."""
+        return 1 + self.bulk_reserve if priority >= Priority.BULK else 1
+
+    def _try_take(self, priority: int) -> bool:
+        """Забрать токен без ожидания, если bucket позволяет."""
+        now = time.monotonic()
+        if now < self._frozen_until:
+            return False
+
+        self._refill(now)
+        if self._tokens >= self._needed(priority):
+            self._tokens -= 1
+            return True
+        return False
+
+    async def _take_token(self, priority: int = Priority.NORMAL) -> None:
+        """Забрать один токен из глобального bucket (по приоритету, FIFO внутри класса)."""
+        # Быстрый путь: никто более важный (или такой же, но раньше) не ждёт
+        if (not self._waiters or priority < self._waiters[0][0]) and self._try_take(priority):
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        else:
+            self._wakeup.set()
+
+        await future
+
+    async def _dispatch(self) -> None:
+        """Раздавать токены ожидающим по мере пополнения bucket."""
+        while self._waiters:
+            self._wakeup.clear()
+
+            priority, _, future = self._waiters[0]
+            if future.done():
+                # Ожидающий отменён
+                heapq.heappop(self._waiters)
+                continue
+
+            if self._try_take(priority):
+                heapq.heappop(self._waiters)
+                future.set_result(None)
+                continue
+
+            now = time.monotonic()
+            if now < self._frozen_until:
+                delay = self._frozen_until - now
+            else:
+                delay = (self._needed(priority) - self._tokens) / self.rate
+
+            # Просыпаемся по таймеру или раньше, если пришёл более важный ожидающий
+            # (call_later вместо wait_for — без лишней задачи на каждый токен)
+            timer = asyncio.get_running_loop().call_later(delay, self._wakeup.set)
+            try:
+                await self._wakeup.wait()
+            finally:
+                timer.cancel()
+
+    async def acquire(self, chat_id: Optional[int] = None, priority: Priority = Priority.NORMAL) -> None:
+        """Дождаться разрешения на отправку в chat_id."""
+        if chat_id is not None:
+            await self._wait_chat(chat_id)
+        await self._take_token(priority)
+
+    async def send(
+            self,
+            chat_id: Optional[int],
+            call: Callable[[], Awaitable[T]],
+            priority: Priority = Priority.NORMAL
+    ) -> T:
+        """
+        Выполнить отправку с учётом лимитов.
+
+        Args:
+            chat_id: Получатель (для лимита на чат)
+            call: Фабрика корутины отправки, например partial(bot.send_message, ...)
+            priority: Класс сообщения (INTERACTIVE, NORMAL или BULK)
+
+        Returns:
+            Результат вызова API
+
+        Raises:
+            TelegramRetryAfter: если флуд-контроль не отпустил после max_retries повторов
+        """
+        attempt = 0
+        while True:
+            await self.acquire(chat_id, priority)
+            try:
+                return await call()
+            except TelegramRetryAfter as e:
+                self.freeze(e.retry_after)
+                logger.warning(f"[rate_limiter] Флуд-контроль: пауза {e.retry_after} сек для всех отправок")
+
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+
+
+# Глобальный экземпляр ограничителя
+_limiter: RateLimiter | None = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Получение общего ограничителя (singleton)."""
+    global _limiter
+    if _limiter is None:
+        config = get_config()
+        _limiter = RateLimiter(
+            rate=config.telegram_global_rate,
+            per_chat_rate=config.telegram_per_chat_rate,
+            bulk_reserve=config.telegram_bulk_reserve
+        )
+    return _limiter
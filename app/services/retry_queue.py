@@ -0,0 +1,97 @@
+"""Отложенные повторы отправок с экспоненциальной задержкой."""
+
+import heapq
+import itertools
+import random
+import time
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+
+class RetryQueue:
+    """
+    Очередь повторов для временных ошибок отправки.
+
+    Получатель с сетевой ошибкой или неснятым флуд-контролем не держит
+    воркер: он кладётся сюда со временем следующей попытки, а рассылка
+    идёт дальше. Задержка растёт экспоненциально (base * 2^attempt,
+    не больше max_delay) со случайным разбросом, чтобы повторы не
+    приходили в Telegram одной пачкой. Число попыток на получателя
+    ограничено max_attempts.
+    """
+
+    def __init__(
+            self,
+            max_attempts: int,
+            base_delay: float = 1.0,
+            max_delay: float = 30.0,
+            rand: Callable[[], float] = random.random
+    ):
+        """
+        Args:
+            max_attempts: Повторов на одного получателя
+            base_delay: Задержка перед первым повтором (секунды)
+            max_delay: Максимальная задержка (секунды)
+            rand: Источник случайности [0, 1) (для тестов)
+        """
+        self.max_attempts = max(0, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._rand = rand
+
+        # (время попытки, порядковый номер, элемент, номер попытки, код последней ошибки)
+        self._heap: List[Tuple[float, int, Any, int, Optional[int]]] = []
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Задержка перед попыткой attempt (1, 2, ...).
+
+        Половина задержки фиксирована, половина случайна: повторы
+        разносятся во времени, но не приходят раньше половины срока.
+        """
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay / 2 + self._rand() * delay / 2
+
+    def push(self, item: Any, attempt: int, error_code: Optional[int] = None, min_delay: float = 0.0) -> bool:
+        """
+        Запланировать повтор.
+
+        Args:
+            item: Получатель
+            attempt: Номер повтора (1 — первый)
+            error_code: Код ошибки, из-за которой нужен повтор
+            min_delay: Нижняя граница задержки (например, retry_after)
+
+        Returns:
+            False если попытки исчерпаны — получатель не добавлен
+        """
+        if attempt > self.max_attempts:
+            return False
+
+        due = time.monotonic() + max(min_delay, self.backoff(attempt))
+        heapq.heappush(self._heap, (due, next(self._seq), item, attempt, error_code))
+        return True
+
+    def delay(self) -> float:
+        """Секунд до ближайшего повтора (0 — уже пора)."""
+        if not self._heap:
+            return 0.0
+        return max(0.0, self._heap[0][0] - time.monotonic())
+
+    def pop(self) -> Tuple[Any, int]:
+        """Ближайший повтор: (элемент, номер попытки)."""
+        _, _, item, attempt, _ = heapq.heappop(self._heap)
+        return item, attempt
+
+    def pending(self) -> List[Tuple[Any, int]]:
+        """Ждущие повторы без извлечения: (элемент, номер попытки) по времени."""
+        return [(item, attempt) for _, _, item, attempt, _ in sorted(self._heap)]
+
+    def drain(self) -> Iterator[Tuple[Any, Optional[int]]]:
+        """Забрать все оставшиеся повторы: (элемент, код последней ошибки)."""
+        heap, self._heap = self._heap, []
+        for _, _, item, _, error_code in sorted(heap):
+            yield item, error_code
@@ -0,0 +1,105 @@
+"""Планировщик отложенных рассылок."""
+
+import asyncio
+from contextlib import suppress
+from datetime import datetime
+from typing import List, Optional
+
+from app.core import get_logger
+from app.database import BroadcastJob, Segment, crud, get_session
+from app.services.broadcast_service import BroadcastManager
+
+logger = get_logger(__name__)
+
+
+class BroadcastScheduler:
+    """
+    Запуск рассылок по расписанию.
+
+    Запланированные рассылки хранятся в broadcast_jobs (статус SCHEDULED),
+    поэтому переживают рестарт. Планировщик не опрашивает таблицу: он спит
+    ровно до ближайшего scheduled_at и просыпается раньше, только если
+    расписание изменилось (notify). Наступившие рассылки переводятся
+    в QUEUED и выполняются очередью BroadcastManager через send_broadcast.
+    """
+
+    def __init__(self, broadcasts: BroadcastManager):
+        self.broadcasts = broadcasts
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Запустить планировщик (просроченные за время простоя запустятся сразу)."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info("✅ Планировщик рассылок запущен")
+
+    async def stop(self) -> None:
+        """Остановить планировщик (расписание остаётся в БД)."""
+        if self._task:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def notify(self) -> None:
+        """Пересчитать время пробуждения (расписание изменилось)."""
+        self._wakeup.set()
+
+    async def schedule(
+            self,
+            admin_id: int,
+            run_at: datetime,
+            text: str,
+            photo_id: Optional[str] = None,
+            buttons: str = "[]",
+            source_chat_id: Optional[int] = None,
+            source_message_ids: Optional[List[int]] = None,
+            segment: Optional[Segment] = None
+    ) -> BroadcastJob:
+        """
+        Запланировать рассылку.
+
+        Args:
+            admin_id: Автор рассылки
+            run_at: Время запуска (UTC)
+            segment: Фильтр аудитории (None — все пользователи)
+
+        Returns:
+            Рассылка в статусе SCHEDULED
+        """
+        async for session in get_session():
+            job = await crud.create_broadcast_job(
+                session, admin_id, text, photo_id, buttons,
+                source_chat_id, source_message_ids, scheduled_at=run_at, segment=segment
+            )
+
+        logger.info(f"[id{admin_id}] Рассылка #{job.id} запланирована на {run_at:%d.%m.%Y %H:%M} UTC")
+        self.notify()
+        return job
+
+    async def _run(self) -> None:
+        """Спать до ближайшей рассылки и передавать наступившие в очередь."""
+        while True:
+            self._wakeup.clear()
+
+            try:
+                async for session in get_session():
+                    released = await crud.release_due_broadcast_jobs(session, datetime.utcnow())
+                    next_at = await crud.get_next_scheduled_time(session)
+            except Exception as e:
+                logger.error(f"Ошибка чтения расписания рассылок: {e}")
+                await asyncio.sleep(5)
+                continue
+
+            if released:
+                logger.info(f"[scheduler] Наступило время рассылок: {released}")
+                self.broadcasts.notify()
+
+            # Без запланированных рассылок спим до notify()
+            timeout = None
+            if next_at is not None:
+                timeout = max(0.0, (next_at - datetime.utcnow()).total_seconds())
+
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
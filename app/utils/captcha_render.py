@@ -0,0 +1,102 @@
+"""
+Рендер процедурной капчи.
+
+Функции модуля выполняются в дочерних процессах пула, поэтому модуль
+не импортирует ничего из бота. Pillow — необязательная зависимость
+(pip install .[captcha]): без неё генератор отключается и используются
+фиксированные картинки из assets/.
+"""
+
+import io
+import random
+from typing import List, Tuple
+
+try:
+    from PIL import Image, ImageDraw, ImageFilter, ImageFont
+except ImportError:  # pragma: no cover - зависит от окружения
+    Image = None
+
+# Без похожих символов: 0/O, 1/I/L, 5/S, 8/B
+ALPHABET = "ACDEFGHJKMNPQRTUVWXYZ2345679"
+
+WIDTH, HEIGHT = 320, 120
+CODE_LENGTH = 4
+OPTIONS = 4
+
+
+def is_available() -> bool:
+    """Установлен ли Pillow."""
+    return Image is not None
+
+
+def _random_code(rng: random.Random) -> str:
+    return "".join(rng.choice(ALPHABET) for _ in range(CODE_LENGTH))
+
+
+def _decoys(rng: random.Random, code: str, count: int) -> List[str]:
+    """Похожие неверные варианты: тот же код с 1–2 заменёнными символами."""
+    decoys = set()
+    while len(decoys) < count:
+        chars = list(code)
+        for index in rng.sample(range(CODE_LENGTH), rng.randint(1, 2)):
+            chars[index] = rng.choice(ALPHABET.replace(code[index], ""))
+        decoys.add("".join(chars))
+    return list(decoys)
+
+
+def render_captcha(seed: int) -> Tuple[bytes, str, List[str]]:
+    """
+    Нарисовать капчу с кодом из CODE_LENGTH символов.
+
+    Args:
+        seed: Зерно случайности (у каждой картинки своё)
+
+    Returns:
+        Tuple[PNG, правильный_ответ, варианты_для_кнопок]
+    """
+    rng = random.Random(seed)
+    code = _random_code(rng)
+
+    background = tuple(rng.randint(200, 255) for _ in range(3))
+    image = Image.new("RGB", (WIDTH, HEIGHT), background)
+    draw = ImageDraw.Draw(image)
+
+    # Шум под символами
+    for _ in range(6):
+        color = tuple(rng.randint(90, 200) for _ in range(3))
+        points = [(rng.randint(0, WIDTH), rng.randint(0, HEIGHT)) for _ in range(2)]
+        draw.line(points, fill=color, width=rng.randint(1, 3))
+
+    font = ImageFont.load_default(size=rng.randint(52, 64))
+    step = WIDTH // (CODE_LENGTH + 1)
+
+    # Каждый символ на своём слое: поворот и смещение
+    for index, char in enumerate(code):
+        layer = Image.new("RGBA", (90, 90), (0, 0, 0, 0))
+        color = tuple(rng.randint(0, 110) for _ in range(3)) + (255,)
+        ImageDraw.Draw(layer).text((18, 8), char, font=font, fill=color)
+        layer = layer.rotate(rng.uniform(-30, 30), resample=Image.BICUBIC, expand=False)
+
+        x = step // 2 + index * step + rng.randint(-6, 6)
+        y = rng.randint(0, HEIGHT - 90)
+        image.paste(layer, (x, y), layer)
+
+    # Шум поверх символов
+    for _ in range(300):
+        color = tuple(rng.randint(0, 255) for _ in range(3))
+        draw.point((rng.randint(0, WIDTH - 1), rng.randint(0, HEIGHT - 1)), fill=color)
+    for _ in range(2):
+        color = tuple(rng.randint(40, 140) for _ in range(3))
+        draw.arc(
+            (rng.randint(-40, 40), rng.randint(-20, 40), rng.randint(240, 360), rng.randint(80, 160)),
+            start=rng.randint(0, 180), end=rng.randint(180, 360), fill=color, width=2
+        )
+
+    image = image.filter(ImageFilter.SMOOTH)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+
+    variants = _decoys(rng, code, OPTIONS - 1) + [code]
+    rng.shuffle(variants)
+    return buffer.getvalue(), code, variants
@@ -1,7 +1,9 @@
 """Вспомогательные функции."""
 
-from datetime import datetime
-from typing import Optional
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional, Tuple
+from zoneinfo import ZoneInfo
 
 
 def time_ago(dt: datetime) -> str:
@@ -57,6 +59,108 @@ def format_time_in_queue(dt: datetime) -> str:
         return "только что"
 
 
+def format_duration(seconds: float) -> str:
+    """
+    Форматировать длительность.
+
+    Args:
+        seconds: Длительность в секундах
+
+    Returns:
+        Строка вида "1 ч 12 мин", "5 мин 3 сек", "40 сек"
+    """
+    total_seconds = max(0, int(seconds))
+    hours = total_seconds // 3600
+    minutes = (total_seconds % 3600) // 60
+    secs = total_seconds % 60
+
+    if hours > 0:
+        return f"{hours} ч {minutes} мин"
+    elif minutes > 0:
+        return f"{minutes} мин {secs} сек"
+    else:
+        return f"{secs} сек"
+
+
+_RELATIVE_UNITS = {
+    "м": 60, "мин": 60, "m": 60, "min": 60,
+    "ч": 3600, "h": 3600,
+    "д": 86400, "d": 86400,
+}
+# Только перечисленные суффиксы: "5 mo" или "5 months" — не минуты
+_RELATIVE_RE = re.compile(r"^(\d+)\s*(мин|min|м|m|ч|h|д|d)$", re.IGNORECASE)
+_ABSOLUTE_FORMATS = ("%H:%M", "%d.%m %H:%M", "%d.%m.%Y %H:%M")
+
+
+def parse_schedule_time(text: str, tz_name: str = "UTC", now: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    Разобрать время запуска, введённое админом.
+
+    Поддерживаются форматы:
+    - относительный: "30м", "30мин", "2ч", "1д" (или 30m, 30min, 2h, 1d)
+    - "ЧЧ:ММ" — сегодня, а если время прошло — завтра
+    - "ДД.ММ ЧЧ:ММ" — в этом году, а если дата прошла — в следующем
+    - "ДД.ММ.ГГГГ ЧЧ:ММ"
+
+    Args:
+        text: Ввод админа
+        tz_name: Часовой пояс, в котором указано время
+        now: Текущее время UTC (для тестов)
+
+    Returns:
+        Время запуска в UTC (naive, как остальные даты в БД) или None,
+        если формат не распознан или время уже прошло
+    """
+    text = text.strip()
+    now = now or datetime.utcnow()
+
+    match = _RELATIVE_RE.match(text)
+    if match:
+        amount, unit = int(match.group(1)), match.group(2).lower()
+        if amount <= 0:
+            return None
+        try:
+            return now + timedelta(seconds=amount * _RELATIVE_UNITS[unit])
+        except OverflowError:
+            # За пределами datetime — как любой неверный ввод
+            return None
+
+    tz = ZoneInfo(tz_name)
+    local_now = now.replace(tzinfo=timezone.utc).astimezone(tz)
+
+    for fmt in _ABSOLUTE_FORMATS:
+        try:
+            parsed = datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+
+        if fmt == "%H:%M":
+            local = local_now.replace(hour=parsed.hour, minute=parsed.minute, second=0, microsecond=0)
+            if local <= local_now:
+                local += timedelta(days=1)
+        elif fmt == "%d.%m %H:%M":
+            local = parsed.replace(year=local_now.year, tzinfo=tz)
+            if local <= local_now:
+                local = local.replace(year=local.year + 1)
+        else:
+            local = parsed.replace(tzinfo=tz)
+
+        run_at = local.astimezone(timezone.utc).replace(tzinfo=None)
+        return run_at if run_at > now else None
+
+    return None
+
+
+def format_local_time(dt: datetime, tz_name: str = "UTC") -> str:
+    """
+    Показать время из БД (UTC) в часовом поясе админа.
+
+    Returns:
+        Строка вида "17.10.2026 21:30"
+    """
+    return dt.replace(tzinfo=timezone.utc).astimezone(ZoneInfo(tz_name)).strftime("%d.%m.%Y %H:%M")
+
+
 def validate_url(url: str) -> bool:
     """
     Проверить корректность URL.
@@ -112,4 +216,54 @@ def truncate_text(text: str, max_length: int = 100, suffix: str = "...") -> str:
     if len(text) <= max_length:
         return text
 
-    return text[:max_length - len(suffix)] + suffix
\ No newline at end of file
+    return text[:max_length - len(suffix)] + suffix
+
+
+def parse_date_range(
+        text: str,
+        today: Optional[date] = None
+) -> Optional[Tuple[Optional[date], Optional[date]]]:
+    """
+    Разобрать период, введённый админом.
+
+    Поддерживаются форматы:
+    - "30" — последние 30 дней, включая сегодня
+    - "01.09.2026-30.09.2026" — диапазон дат (включительно)
+    - "01.09.2026-" или "-30.09.2026" — открытый диапазон
+
+    Returns:
+        (с, по) или None, если формат не распознан
+    """
+    text = text.strip()
+    today = today or datetime.utcnow().date()
+
+    if text.isdigit():
+        days = int(text)
+        if days <= 0:
+            return None
+        try:
+            return today - timedelta(days=days - 1), today
+        except OverflowError:
+            # Раньше date.min — как любой неверный ввод
+            return None
+
+    if "-" not in text:
+        return None
+
+    bounds = []
+    for part in text.split("-", 1):
+        part = part.strip()
+        if not part:
+            bounds.append(None)
+            continue
+        try:
+            bounds.append(datetime.strptime(part, "%d.%m.%Y").date())
+        except ValueError:
+            return None
+
+    start, end = bounds
+    if start is None and end is None:
+        return None
+    if start and end and start > end:
+        return None
+    return start, end
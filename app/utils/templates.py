@@ -0,0 +1,135 @@
+"""Шаблоны сообщений с персонализацией ({name}, {username}, ...)."""
+
+import html
+import re
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Tuple
+
+# Поля, доступные в шаблонах рассылок и приветствия
+TEMPLATE_FIELDS: FrozenSet[str] = frozenset({"name", "username", "first_name", "id"})
+
+# {{ и }} — экранированные фигурные скобки, {field} — подстановка
+_TOKEN_RE = re.compile(r"\{\{|\}\}|\{(\w+)\}")
+
+
+class TemplateError(ValueError):
+    """Шаблон содержит неизвестную переменную."""
+
+
+class MessageTemplate:
+    """
+    Скомпилированный шаблон сообщения.
+
+    Текст разбирается один раз на литеральные сегменты и подстановки,
+    поэтому рендер для каждого получателя — это один join без повторного
+    поиска плейсхолдеров. Значения экранируются для parse_mode=HTML.
+    """
+
+    __slots__ = ("source", "fields", "_parts", "_slots")
+
+    def __init__(self, source: str, allowed: FrozenSet[str] = TEMPLATE_FIELDS):
+        """
+        Args:
+            source: Текст шаблона
+            allowed: Допустимые имена переменных
+
+        Raises:
+            TemplateError: если в тексте есть переменная не из allowed
+        """
+        self.source = source
+        self._parts: List[str] = []
+        # (индекс в _parts, имя поля)
+        self._slots: List[Tuple[int, str]] = []
+
+        literal = []
+        position = 0
+        for match in _TOKEN_RE.finditer(source):
+            literal.append(source[position:match.start()])
+            position = match.end()
+
+            field = match.group(1)
+            if field is None:
+                # Экранированная скобка
+                literal.append(match.group(0)[0])
+                continue
+
+            if field not in allowed:
+                raise TemplateError(
+                    f"Неизвестная переменная {{{field}}}. "
+                    f"Доступны: {', '.join('{' + name + '}' for name in sorted(allowed))}"
+                )
+
+            self._parts.append("".join(literal))
+            literal = []
+            self._slots.append((len(self._parts), field))
+            self._parts.append("")
+
+        literal.append(source[position:])
+        self._parts.append("".join(literal))
+
+        self.fields: FrozenSet[str] = frozenset(field for _, field in self._slots)
+
+    @property
+    def is_static(self) -> bool:
+        """Шаблон без переменных (одинаковый текст для всех)."""
+        return not self._slots
+
+    def render(self, values: Mapping[str, Any]) -> str:
+        """
+        Подставить значения.
+
+        Args:
+            values: Значения полей (отсутствующие заменяются пустой строкой)
+
+        Returns:
+            Готовый текст с HTML-экранированными значениями
+        """
+        if not self._slots:
+            return self._parts[0]
+
+        parts = self._parts.copy()
+        for index, field in self._slots:
+            value = values.get(field)
+            parts[index] = html.escape(str(value), quote=False) if value is not None else ""
+        return "".join(parts)
+
+
+@lru_cache(maxsize=128)
+def compile_template(source: str) -> MessageTemplate:
+    """
+    Скомпилировать шаблон (с кэшем по тексту).
+
+    Повторные вызовы с тем же текстом (приветствие при наплыве заявок)
+    не разбирают текст заново.
+
+    Raises:
+        TemplateError: если в тексте есть неизвестная переменная
+    """
+    return MessageTemplate(source)
+
+
+def user_template_values(
+        user_id: int,
+        username: Optional[str] = None,
+        first_name: Optional[str] = None,
+        default_name: str = "Пользователь"
+) -> Dict[str, Any]:
+    """
+    Значения полей шаблона для пользователя.
+
+    Args:
+        user_id: Telegram ID
+        username: Username без @ (если есть)
+        first_name: Имя (если известно)
+        default_name: Подстановка, когда имя неизвестно
+
+    Returns:
+        Словарь для MessageTemplate.render
+    """
+    name = first_name or default_name
+    return {
+        "id": user_id,
+        "name": name,
+        "first_name": name,
+        "username": f"@{username}" if username else name,
+    }
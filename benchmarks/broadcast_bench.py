@@ -0,0 +1,229 @@
+"""
+Нагрузочный тест рассылки против локальной заглушки Bot API.
+
+Каждый размер аудитории прогоняется в отдельном процессе на свежей
+SQLite базе, поэтому пиковая память не накапливается между прогонами.
+
+Пример:
+    python -m benchmarks.broadcast_bench --users 10000 100000 --latency 0.02 --forbidden-rate 0.05
+
+По умолчанию глобальный лимит отправок снят (--rate 0), чтобы мерить
+пропускную способность самого сервиса. С --rate 30 видно поведение
+при реальном лимите Telegram.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+from benchmarks.fake_bot_api import FakeApiOptions, run_server
+
+ADMIN_ID = 1
+CHAT_ID_BASE = 10_000_000
+INSERT_CHUNK = 50_000
+
+
+def _api_call(base_url: str, path: str, method: str = "GET") -> Dict[str, Any]:
+    request = urllib.request.Request(f"{base_url}{path}", method=method)
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return json.loads(response.read())
+
+
+def _wait_server(base_url: str, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _api_call(base_url, "/stats")
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+async def _scenario(users: int, args: argparse.Namespace, base_url: str) -> Dict[str, Any]:
+    import psutil
+    from aiogram import Bot
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+    from sqlalchemy import event, insert
+
+    from app.core import load_config
+
+    load_config()
+
+    # Пакет бота импортируется до сервисов (они используют его клавиатуры)
+    import app.bot  # noqa: F401
+    from app.database import Base, crud, get_session, init_db
+    from app.database import session as db_session
+    from app.database.models import User
+    from app.services.broadcast_service import send_broadcast
+
+    init_db()
+    engine = db_session.engine
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        for start in range(0, users, INSERT_CHUNK):
+            await conn.execute(insert(User), [
+                {"chat_id": CHAT_ID_BASE + i, "username": f"user{i}", "registration_date": "01.01.2026"}
+                for i in range(start, min(users, start + INSERT_CHUNK))
+            ])
+
+    async for session in get_session():
+        if args.mode == "copy":
+            job = await crud.create_broadcast_job(session, ADMIN_ID, "bench", None, "[]", ADMIN_ID, [1])
+        else:
+            job = await crud.create_broadcast_job(session, ADMIN_ID, "Привет, {name}! Ваш {username}", None, "[]")
+
+    # Счётчики: SQL запросы и созданные задачи только на время рассылки
+    queries = 0
+
+    def count_query(*_: Any) -> None:
+        nonlocal queries
+        queries += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count_query)
+
+    loop = asyncio.get_running_loop()
+    tasks = 0
+
+    def task_factory(loop: asyncio.AbstractEventLoop, coro: Any, **kwargs: Any) -> asyncio.Task:
+        nonlocal tasks
+        tasks += 1
+        return asyncio.Task(coro, loop=loop, **kwargs)
+
+    loop.set_task_factory(task_factory)
+
+    process = psutil.Process()
+    peak_rss = process.memory_info().rss
+    rss_before = peak_rss
+
+    async def sample_rss() -> None:
+        nonlocal peak_rss
+        while True:
+            peak_rss = max(peak_rss, process.memory_info().rss)
+            await asyncio.sleep(0.05)
+
+    bot = Bot(token="42:BENCH", session=AiohttpSession(api=TelegramAPIServer.from_base(base_url)))
+    _api_call(base_url, "/reset", method="POST")
+
+    sampler = asyncio.create_task(sample_rss())
+    started = time.perf_counter()
+    try:
+        status = await send_broadcast(bot, job)
+    finally:
+        elapsed = time.perf_counter() - started
+        sampler.cancel()
+        loop.set_task_factory(None)
+        event.remove(engine.sync_engine, "before_cursor_execute", count_query)
+        await bot.session.close()
+        await engine.dispose()
+
+    async for session in get_session():
+        job = await crud.get_broadcast_job(session, job.id)
+
+    processed = job.sent_count + job.failed_count
+    return {
+        "users": users,
+        "status": status.value,
+        "sent": job.sent_count,
+        "failed": job.failed_count,
+        "elapsed": elapsed,
+        "msgs_per_sec": processed / elapsed if elapsed else 0.0,
+        "peak_rss_mb": peak_rss / 2 ** 20,
+        "rss_growth_mb": (peak_rss - rss_before) / 2 ** 20,
+        "tasks": tasks,
+        "queries": queries,
+        "api": _api_call(base_url, "/stats"),
+    }
+
+
+def run_scenario(users: int, args: argparse.Namespace, base_url: str, db_path: str) -> Dict[str, Any]:
+    """Прогон одного размера аудитории (выполняется в дочернем процессе)."""
+    os.environ.update({
+        "BOT_TOKEN": "42:BENCH",
+        "DATABASE_URL": f"sqlite+aiosqlite:///{db_path}",
+        "TELEGRAM_GLOBAL_RATE": str(args.rate or 1_000_000_000),
+        "TELEGRAM_PER_CHAT_RATE": "1",
+        "BROADCAST_SEMAPHORE_LIMIT": str(args.workers),
+        "BROADCAST_BATCH_SIZE": str(args.batch_size),
+        "DEBUG": "false",
+    })
+    return asyncio.run(_scenario(users, args, base_url))
+
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    header = (
+        f"{'users':>9} {'sent':>9} {'failed':>7} {'sec':>8} {'msg/s':>9} "
+        f"{'peakMB':>7} {'+MB':>6} {'tasks':>7} {'queries':>8} {'429':>5} {'net':>5}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        api = r["api"]
+        print(
+            f"{r['users']:>9} {r['sent']:>9} {r['failed']:>7} {r['elapsed']:>8.2f} {r['msgs_per_sec']:>9.0f} "
+            f"{r['peak_rss_mb']:>7.1f} {r['rss_growth_mb']:>6.1f} {r['tasks']:>7} {r['queries']:>8} "
+            f"{api.get('retry_after', 0):>5} {api.get('network_error', 0):>5}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк рассылки")
+    parser.add_argument("--users", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--mode", choices=["render", "copy"], default="render")
+    parser.add_argument("--workers", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=0.0, help="Глобальный лимит сообщений/сек (0 — без лимита)")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--retry-after-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--forbidden-rate", type=float, default=0.0)
+    parser.add_argument("--network-error-rate", type=float, default=0.0)
+    parser.add_argument("--json", action="store_true", help="Вывести результаты в JSON")
+    args = parser.parse_args()
+
+    options = FakeApiOptions(
+        latency=args.latency,
+        jitter=args.jitter,
+        retry_after_rate=args.retry_after_rate,
+        retry_after=args.retry_after,
+        forbidden_rate=args.forbidden_rate,
+        network_error_rate=args.network_error_rate,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    context = multiprocessing.get_context("spawn")
+    server = context.Process(target=run_server, args=(options, "127.0.0.1", args.port), daemon=True)
+    server.start()
+
+    results = []
+    try:
+        _wait_server(base_url)
+        with tempfile.TemporaryDirectory() as tmp:
+            for users in args.users:
+                db_path = os.path.join(tmp, f"bench_{users}.db")
+                # Свежий процесс на каждый прогон — честная пиковая память
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    results.append(pool.submit(run_scenario, users, args, base_url, db_path).result())
+    finally:
+        server.terminate()
+        server.join()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+
+
+if __name__ == "__main__":
+    main()
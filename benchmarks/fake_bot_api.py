@@ -0,0 +1,156 @@
+"""
+Локальная заглушка Telegram Bot API для нагрузочных тестов.
+
+Отвечает на методы отправки как настоящий API и умеет имитировать:
+- задержку ответа (latency + jitter)
+- флуд-контроль 429 с retry_after
+- 403 для доли chat_id (бот заблокирован)
+- сетевые ошибки (обрыв соединения)
+
+Запуск отдельно:
+    python -m benchmarks.fake_bot_api --port 8081 --latency 0.05 --forbidden-rate 0.1
+
+Статистика запросов: GET /stats, сброс: POST /reset.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict
+
+from aiohttp import web
+
+
+@dataclass
+class FakeApiOptions:
+    """Параметры имитации."""
+
+    latency: float = 0.0  # Задержка ответа (секунды)
+    jitter: float = 0.0  # Случайная добавка к задержке (секунды)
+    retry_after_rate: float = 0.0  # Доля запросов с ответом 429
+    retry_after: int = 1  # retry_after в ответе 429 (секунды)
+    forbidden_rate: float = 0.0  # Доля chat_id, заблокировавших бота
+    network_error_rate: float = 0.0  # Доля запросов с обрывом соединения
+    seed: int = 0
+
+
+def is_forbidden(chat_id: int, rate: float) -> bool:
+    """Детерминированно: одни и те же chat_id всегда «заблокировали» бота."""
+    return (chat_id * 2654435761) % 10_000 < rate * 10_000
+
+
+def _message(chat_id: int, message_id: int, text: str = "") -> Dict[str, Any]:
+    return {
+        "message_id": message_id,
+        "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "private"},
+        "text": text,
+    }
+
+
+class FakeBotApi:
+    """aiohttp-приложение, совместимое с TelegramAPIServer aiogram."""
+
+    def __init__(self, options: FakeApiOptions):
+        self.options = options
+        self.stats: Counter = Counter()
+        self._random = random.Random(options.seed)
+        self._message_id = 0
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle_method)
+        app.router.add_get("/stats", self.handle_stats)
+        app.router.add_post("/reset", self.handle_reset)
+        return app
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(dict(self.stats))
+
+    async def handle_reset(self, request: web.Request) -> web.Response:
+        self.stats.clear()
+        return web.json_response({"ok": True})
+
+    async def handle_method(self, request: web.Request) -> web.StreamResponse:
+        method = request.match_info["method"]
+        params = await request.post()
+        options = self.options
+
+        self.stats["requests"] += 1
+        self.stats[f"method:{method}"] += 1
+
+        if options.latency or options.jitter:
+            await asyncio.sleep(options.latency + self._random.random() * options.jitter)
+
+        if self._random.random() < options.network_error_rate:
+            # Обрыв соединения без ответа — у клиента TelegramNetworkError
+            self.stats["network_error"] += 1
+            request.transport.close()
+            return web.Response()
+
+        if method != "getMe" and self._random.random() < options.retry_after_rate:
+            self.stats["retry_after"] += 1
+            return web.json_response({
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {options.retry_after}",
+                "parameters": {"retry_after": options.retry_after},
+            }, status=429)
+
+        chat_id = int(params.get("chat_id", 0) or 0)
+        if chat_id and is_forbidden(chat_id, options.forbidden_rate):
+            self.stats["forbidden"] += 1
+            return web.json_response({
+                "ok": False,
+                "error_code": 403,
+                "description": "Forbidden: bot was blocked by the user",
+            }, status=403)
+
+        self.stats["ok"] += 1
+        self._message_id += 1
+        return web.json_response({"ok": True, "result": self._result(method, chat_id, params)})
+
+    def _result(self, method: str, chat_id: int, params: Any) -> Any:
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+        if method == "copyMessage":
+            return {"message_id": self._message_id}
+        if method == "copyMessages":
+            return [{"message_id": self._message_id}]
+        return _message(chat_id, self._message_id, params.get("text", ""))
+
+
+def run_server(options: FakeApiOptions, host: str = "127.0.0.1", port: int = 8081) -> None:
+    """Запустить заглушку (блокирующе — для отдельного процесса)."""
+    web.run_app(FakeBotApi(options).build_app(), host=host, port=port, print=None)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Заглушка Telegram Bot API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--retry-after-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--forbidden-rate", type=float, default=0.0)
+    parser.add_argument("--network-error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    options = FakeApiOptions(
+        latency=args.latency,
+        jitter=args.jitter,
+        retry_after_rate=args.retry_after_rate,
+        retry_after=args.retry_after,
+        forbidden_rate=args.forbidden_rate,
+        network_error_rate=args.network_error_rate,
+    )
+    print(f"Fake Bot API: http://{args.host}:{args.port}")
+    run_server(options, args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
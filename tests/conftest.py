@@ -0,0 +1,55 @@
+# tests/conftest.py
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+import app.bot  # noqa: F401 — сервисы рассылки импортируются через пакет бота
+import app.core.config as config_module
+from app.core.config import Config
+from app.database import Base
+from app.database import session as session_module
+from app.services import rate_limiter
+from app.services.rate_limiter import RateLimiter
+
+
+@pytest.fixture
+def config(monkeypatch):
+    """Конфиг без .env: быстрые повторы и маленькие порции."""
+    config = Config(
+        _env_file=None,
+        bot_token="123:test",
+        database_url="sqlite+aiosqlite:///:memory:",
+        broadcast_semaphore_limit=3,
+        broadcast_batch_size=4,
+        broadcast_retry_attempts=2,
+        broadcast_retry_base_delay=0.01,
+        broadcast_retry_max_delay=0.02,
+        broadcast_log_flush_interval=0.01,
+    )
+    monkeypatch.setattr(config_module, "config", config)
+    # Общий ограничитель без задержек
+    monkeypatch.setattr(rate_limiter, "_limiter", RateLimiter(rate=100000, per_chat_rate=100000))
+    return config
+
+
+@pytest.fixture
+async def db(config, monkeypatch):
+    """Схема в in-memory aiosqlite; get_session() работает с ней."""
+    # StaticPool — одно соединение, иначе у каждой сессии своя пустая БД
+    engine = create_async_engine(
+        config.database_url,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    monkeypatch.setattr(session_module, "engine", engine)
+    monkeypatch.setattr(
+        session_module,
+        "async_session_factory",
+        async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
+    )
+    yield engine
+    await engine.dispose()
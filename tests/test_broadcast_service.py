@@ -0,0 +1,196 @@
+# tests/test_broadcast_service.py
+
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import pytest
+from aiogram.exceptions import TelegramForbiddenError, TelegramNetworkError
+
+from app.database import BroadcastStatus, Segment, User, crud, get_session
+from app.services.broadcast_service import BroadcastHandle, send_broadcast
+
+ADMIN_ID = 1
+
+
+class FakeBot:
+    """Записывает отправки; ошибки и остановка задаются по chat_id."""
+
+    def __init__(self, blocked=(), flaky=(), stop_on=None, handle=None, stop_status=BroadcastStatus.PAUSED):
+        self.sent = []
+        self.calls = {}
+        self.blocked = set(blocked)  # Всегда 403
+        self.flaky = set(flaky)  # Сетевая ошибка на первой попытке
+        self.stop_on = stop_on  # После этого chat_id запрашивается остановка
+        self.handle = handle
+        self.stop_status = stop_status
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if chat_id == ADMIN_ID:
+            return
+        attempt = self.calls[chat_id] = self.calls.get(chat_id, 0) + 1
+
+        if chat_id == self.stop_on:
+            self.handle.request_stop(self.stop_status)
+        if chat_id in self.blocked:
+            raise TelegramForbiddenError(method=MagicMock(), message="bot was blocked by the user")
+        if chat_id in self.flaky and attempt == 1:
+            raise TelegramNetworkError(method=MagicMock(), message="timeout")
+        self.sent.append(chat_id)
+
+    async def edit_message_text(self, **kwargs):
+        pass
+
+
+async def add_users(count: int, **fields) -> list:
+    async for session in get_session():
+        users = [User(chat_id=100 + i, registration_date="01.01.2026", **fields) for i in range(count)]
+        session.add_all(users)
+        await session.flush()
+    return [user.id for user in users]
+
+
+async def create_job(**kwargs):
+    async for session in get_session():
+        job = await crud.create_broadcast_job(session, ADMIN_ID, "Привет, {name}!", **kwargs)
+    return job
+
+
+async def reload_job(job_id: int):
+    async for session in get_session():
+        job = await crud.get_broadcast_job(session, job_id)
+    return job
+
+
+class TestBroadcastJob:
+
+    async def test_create_queued_or_scheduled(self, db):
+        """Без scheduled_at рассылка сразу в очереди, с ним — запланирована."""
+        queued = await create_job()
+        scheduled = await create_job(scheduled_at=datetime(2030, 1, 1), segment=Segment(has_username=True))
+
+        assert queued.status == BroadcastStatus.QUEUED
+        assert queued.last_user_id == 0
+        assert scheduled.status == BroadcastStatus.SCHEDULED
+        assert Segment.from_json(scheduled.segment) == Segment(has_username=True)
+
+        async for session in get_session():
+            next_job = await crud.get_next_broadcast_job(session)
+        assert next_job.id == queued.id
+
+    async def test_completed(self, db):
+        """Все получатели обработаны: курсор на последнем, журнал доставки записан."""
+        user_ids = await add_users(10)
+        job = await create_job()
+        bot = FakeBot(blocked={103})
+
+        assert await send_broadcast(bot, job) == BroadcastStatus.COMPLETED
+
+        job = await reload_job(job.id)
+        assert job.status == BroadcastStatus.COMPLETED
+        assert (job.sent_count, job.failed_count) == (9, 1)
+        assert job.last_user_id == user_ids[-1]
+        assert sorted(bot.sent) == [100 + i for i in range(10) if i != 3]
+
+        async for session in get_session():
+            stats = await crud.get_delivery_stats(session, [job.id])
+            # Заблокировавший бота больше не попадает в рассылки
+            assert await crud.count_broadcast_recipients(session) == 9
+        assert stats[job.id]["sent"] == 9
+        assert stats[job.id]["errors"] == {403: 1}
+
+    async def test_resume_from_checkpoint(self, db):
+        """Продолжение с last_user_id: уже обработанным повторно не отправляется."""
+        user_ids = await add_users(10)
+        job = await create_job()
+        async for session in get_session():
+            await crud.checkpoint_broadcast_job(session, job.id, user_ids[5], sent_count=6, failed_count=0)
+        bot = FakeBot()
+
+        assert await send_broadcast(bot, await reload_job(job.id)) == BroadcastStatus.COMPLETED
+
+        job = await reload_job(job.id)
+        assert sorted(bot.sent) == [106, 107, 108, 109]
+        assert job.sent_count == 10
+
+    async def test_pause_then_resume(self, db):
+        """Пауза сохраняет курсор; возобновление доставляет остальным ровно один раз."""
+        await add_users(10)
+        job = await create_job()
+        handle = BroadcastHandle(job.id)
+        first = FakeBot(stop_on=104, handle=handle)
+
+        assert await send_broadcast(first, job, handle) == BroadcastStatus.PAUSED
+
+        paused = await reload_job(job.id)
+        # Статус PAUSED выставляет менеджер, send_broadcast — только чекпоинт
+        assert paused.status == BroadcastStatus.QUEUED
+        assert paused.sent_count == len(first.sent)
+        assert 0 < paused.last_user_id < 10
+
+        second = FakeBot()
+        assert await send_broadcast(second, paused) == BroadcastStatus.COMPLETED
+
+        assert sorted(first.sent + second.sent) == list(range(100, 110))
+        assert (await reload_job(job.id)).sent_count == 10
+
+    async def test_cancel_stops_sending(self, db):
+        """Остановка прекращает отправку; остальные получатели не обрабатываются."""
+        await add_users(10)
+        job = await create_job()
+        handle = BroadcastHandle(job.id)
+        bot = FakeBot(stop_on=102, handle=handle, stop_status=BroadcastStatus.CANCELLED)
+
+        assert await send_broadcast(bot, job, handle) == BroadcastStatus.CANCELLED
+
+        job = await reload_job(job.id)
+        assert 102 in bot.sent
+        assert len(bot.sent) < 10
+        assert job.sent_count == len(bot.sent)
+
+    async def test_pause_keeps_pending_retries(self, db):
+        """Ждущий повтора получатель переживает паузу и получает сообщение после неё."""
+        await add_users(4)
+        job = await create_job()
+        handle = BroadcastHandle(job.id)
+        first = FakeBot(flaky={101}, stop_on=101, handle=handle)
+
+        assert await send_broadcast(first, job, handle) == BroadcastStatus.PAUSED
+
+        paused = await reload_job(job.id)
+        assert 101 not in first.sent
+        assert paused.failed_count == 0
+        assert paused.pending_retries is not None
+
+        second = FakeBot()
+        assert await send_broadcast(second, paused) == BroadcastStatus.COMPLETED
+
+        job = await reload_job(job.id)
+        assert 101 in second.sent
+        assert sorted(first.sent + second.sent) == [100, 101, 102, 103]
+        assert (job.sent_count, job.failed_count, job.pending_retries) == (4, 0, None)
+
+    async def test_cancel_gives_up_retries(self, db):
+        """Остановка считает ждущих повтора неудачными."""
+        await add_users(4)
+        job = await create_job()
+        handle = BroadcastHandle(job.id)
+        bot = FakeBot(flaky={101}, stop_on=101, handle=handle, stop_status=BroadcastStatus.CANCELLED)
+
+        assert await send_broadcast(bot, job, handle) == BroadcastStatus.CANCELLED
+
+        job = await reload_job(job.id)
+        assert 101 not in bot.sent
+        assert job.failed_count == 1
+        assert job.pending_retries is None
+
+    @pytest.mark.parametrize("flaky", [set(), {102}])
+    async def test_transient_error_retried(self, db, flaky):
+        """Временная ошибка повторяется после основного прохода."""
+        await add_users(4)
+        job = await create_job()
+        bot = FakeBot(flaky=flaky)
+
+        assert await send_broadcast(bot, job) == BroadcastStatus.COMPLETED
+
+        assert sorted(bot.sent) == [100, 101, 102, 103]
+        assert (await reload_job(job.id)).failed_count == 0
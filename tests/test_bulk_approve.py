@@ -0,0 +1,105 @@
+# tests/test_bulk_approve.py
+
+from unittest.mock import MagicMock
+
+from aiogram.exceptions import TelegramBadRequest, TelegramNetworkError
+from sqlalchemy import select
+
+from app.database import PendingRequest, RequestStatus, crud, get_session
+from app.services.bulk_approve import ApproveProgress, BulkApprover
+
+ADMIN_ID = 1
+
+
+class FakeBot:
+    """Одобряет заявки; ошибки задаются по user_id."""
+
+    def __init__(self, missing=(), broken=()):
+        self.approved = []
+        self.missing = set(missing)  # Заявки уже нет — BadRequest
+        self.broken = set(broken)  # Сетевая ошибка
+
+    async def approve_chat_join_request(self, chat_id, user_id):
+        if user_id in self.missing:
+            raise TelegramBadRequest(method=MagicMock(), message="HIDE_REQUESTER_MISSING")
+        if user_id in self.broken:
+            raise TelegramNetworkError(method=MagicMock(), message="timeout")
+        self.approved.append(user_id)
+
+
+async def add_requests(count: int, with_username=lambda user_id: True) -> None:
+    async for session in get_session():
+        for user_id in range(1, count + 1):
+            await crud.create_pending_request(
+                session,
+                user_id=user_id,
+                chat_id=-100,
+                username=f"user{user_id}" if with_username(user_id) else None
+            )
+
+
+async def statuses() -> dict:
+    async for session in get_session():
+        result = await session.execute(select(PendingRequest))
+        requests = {request.user_id: (request.status, request.processed_by) for request in result.scalars()}
+    return requests
+
+
+class TestBulkApprover:
+
+    async def test_chunks_and_status_split(self, db):
+        """Все пачки обработаны; статусы разделены на одобренные, неактуальные и оставшиеся."""
+        await add_requests(7)
+        bot = FakeBot(missing={2}, broken={5})
+
+        progress = await BulkApprover(bot, concurrency=2, batch_size=3).run(ADMIN_ID)
+
+        assert (progress.total, progress.approved, progress.missing, progress.failed) == (7, 5, 1, 1)
+        assert progress.remaining == 0
+        assert sorted(bot.approved) == [1, 3, 4, 6, 7]
+
+        result = await statuses()
+        assert result[1] == (RequestStatus.APPROVED, ADMIN_ID)
+        assert result[2] == (RequestStatus.DECLINED, ADMIN_ID)
+        # Временная ошибка — заявка остаётся в очереди до следующего раза
+        assert result[5] == (RequestStatus.PENDING, None)
+
+    async def test_username_filter(self, db):
+        """has_username=True — только заявки с username, остальные не трогаются."""
+        await add_requests(6, with_username=lambda user_id: user_id % 2 == 0)
+        bot = FakeBot()
+
+        progress = await BulkApprover(bot, batch_size=2).run(ADMIN_ID, has_username=True)
+
+        assert progress.approved == 3
+        assert sorted(bot.approved) == [2, 4, 6]
+        assert [user_id for user_id, (status, _) in sorted((await statuses()).items())
+                if status == RequestStatus.PENDING] == [1, 3, 5]
+
+    async def test_processed_requests_not_repeated(self, db):
+        """Повторный запуск берёт только оставшиеся PENDING."""
+        await add_requests(4)
+        await BulkApprover(FakeBot(broken={3}), batch_size=2).run(ADMIN_ID)
+        bot = FakeBot()
+
+        progress = await BulkApprover(bot, batch_size=2).run(ADMIN_ID)
+
+        assert bot.approved == [3]
+        assert progress.approved == 1
+
+
+class TestApproveProgress:
+
+    def test_counters(self):
+        """Счётчики и отчёт без деления на ноль."""
+        progress = ApproveProgress(total=0)
+
+        assert progress.remaining == 0
+        assert "100%" in progress.render()
+
+        progress = ApproveProgress(total=4)
+        progress.approved, progress.missing, progress.failed = 1, 1, 1
+
+        assert progress.processed == 3
+        assert progress.remaining == 1
+        assert "75%" in progress.render()
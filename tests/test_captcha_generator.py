@@ -0,0 +1,41 @@
+# tests/test_captcha_generator.py
+
+import pytest
+
+from app.services.captcha_generator import CaptchaPool, GeneratedCaptcha
+from app.utils import captcha_render
+
+
+class TestRenderCaptcha:
+
+    def test_png_and_variants(self):
+        """PNG, ответ из алфавита и среди вариантов, варианты различны."""
+        pytest.importorskip("PIL")
+        image, answer, variants = captcha_render.render_captcha(42)
+
+        assert image.startswith(b"\x89PNG")
+        assert len(answer) == captcha_render.CODE_LENGTH
+        assert set(answer) <= set(captcha_render.ALPHABET)
+        assert answer in variants
+        assert len(set(variants)) == captcha_render.OPTIONS
+
+    def test_seed_is_deterministic(self):
+        pytest.importorskip("PIL")
+        assert captcha_render.render_captcha(7) == captcha_render.render_captcha(7)
+
+
+class TestCaptchaPool:
+
+    def test_empty_pool_returns_none(self):
+        """Пул не запущен — pop() не ждёт рендера, капча берётся из assets."""
+        assert CaptchaPool().pop() is None
+
+    def test_reuse(self):
+        """Картинка выдаётся reuse раз, затем уходит из пула."""
+        pool = CaptchaPool(size=2, low_water=0, reuse=2)
+        pool._ready.extend(GeneratedCaptcha(bytes([i]), str(i), [str(i)], 2) for i in range(2))
+
+        issued = [pool.pop().answer for _ in range(4)]
+
+        assert issued == ["0", "1", "0", "1"]
+        assert pool.pop() is None
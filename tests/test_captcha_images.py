@@ -0,0 +1,65 @@
+# tests/test_captcha_images.py
+
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import BufferedInputFile
+
+from app.services.captcha_images import CaptchaImageCache
+
+
+class FakeTelegram:
+    """send_photo, который выдаёт новый file_id на каждую загрузку."""
+
+    def __init__(self, invalid=(), error="wrong file identifier"):
+        self.sent = []
+        self.invalid = set(invalid)
+        self.error = error
+
+    async def send_photo(self, photo):
+        await asyncio.sleep(0.01)
+        if isinstance(photo, str) and photo in self.invalid:
+            raise TelegramBadRequest(method=MagicMock(), message=self.error)
+        self.sent.append(photo)
+        file_id = photo if isinstance(photo, str) else f"file{len(self.sent)}"
+        return MagicMock(photo=[MagicMock(file_id=file_id)])
+
+
+class TestCaptchaImageCache:
+
+    async def test_uploads_once(self):
+        """Параллельные первые отправки — одна загрузка, дальше только file_id."""
+        cache = CaptchaImageCache()
+        telegram = FakeTelegram()
+
+        await asyncio.gather(*(cache.send(b"png", "a.png", telegram.send_photo) for _ in range(5)))
+
+        uploads = [p for p in telegram.sent if isinstance(p, BufferedInputFile)]
+        assert len(uploads) == 1
+        assert telegram.sent[1:] == ["file1"] * 4
+
+    async def test_invalid_file_id_reuploads(self):
+        """Недействительный file_id — повторная загрузка из буфера."""
+        cache = CaptchaImageCache()
+        telegram = FakeTelegram(invalid={"file1"})
+
+        await cache.send(b"png", "a.png", telegram.send_photo)
+        await cache.send(b"png", "a.png", telegram.send_photo)
+        await cache.send(b"png", "a.png", telegram.send_photo)
+
+        assert isinstance(telegram.sent[1], BufferedInputFile)
+        assert telegram.sent[2] == "file2"
+
+    async def test_other_errors_keep_file_id(self):
+        """Ошибка не про file_id пробрасывается, кэш не сбрасывается и повторной загрузки нет."""
+        cache = CaptchaImageCache()
+        telegram = FakeTelegram(invalid={"file1"}, error="Bad Request: chat not found")
+
+        await cache.send(b"png", "a.png", telegram.send_photo)
+        with pytest.raises(TelegramBadRequest):
+            await cache.send(b"png", "a.png", telegram.send_photo)
+
+        assert len(telegram.sent) == 1
+        assert await cache._get_file_id(cache.digest(b"png")) == "file1"
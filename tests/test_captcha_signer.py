@@ -0,0 +1,32 @@
+# tests/test_captcha_signer.py
+
+from app.services.captcha_service import CAPTCHA_VARIANTS, build_captcha_keyboard
+from app.services.captcha_signer import CALLBACK_DATA_LIMIT, CaptchaSigner
+
+
+class TestCaptchaSigner:
+
+    def test_verify(self):
+        """Верным признаётся только подписанный ответ своего пользователя."""
+        signer = CaptchaSigner("secret", ttl=60)
+        token = signer.issue(1, "😎")
+
+        assert signer.verify(1, token, "😎").correct
+        assert not signer.verify(1, token, "⭐").correct
+        assert not signer.verify(2, token, "😎").correct
+        assert not CaptchaSigner("other", ttl=60).verify(1, token, "😎").correct
+
+    def test_expired_or_broken(self):
+        signer = CaptchaSigner("secret", ttl=-1)
+        assert signer.verify(1, signer.issue(1, "😎"), "😎") is None
+        assert signer.verify(1, "garbage", "😎") is None
+
+    def test_callback_data_limit(self):
+        """callback_data с подписью укладывается в 64 байта."""
+        token = CaptchaSigner("secret", ttl=300).issue(10 ** 13, "😎")
+        variants = [emoji for _, _, options in CAPTCHA_VARIANTS for emoji in options] + ["ACDE"]
+        keyboard = build_captcha_keyboard(variants, 10 ** 13, token)
+
+        for row in keyboard.inline_keyboard:
+            for button in row:
+                assert len(button.callback_data.encode()) <= CALLBACK_DATA_LIMIT
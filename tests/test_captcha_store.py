@@ -0,0 +1,109 @@
+# tests/test_captcha_store.py
+
+import asyncio
+
+import pytest
+
+from app.services.captcha_signer import CaptchaSigner
+from app.services.captcha_store import CaptchaStore, CaptchaVerdict, MemoryCaptchaStore
+
+
+@pytest.fixture
+async def redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    yield client
+    await client.aclose()
+
+
+class TestCaptchaStore:
+
+    async def test_memory_verdicts(self):
+        """Без Redis: неверно, верно, затем капчи уже нет."""
+        store = CaptchaStore(None, ttl=60, max_attempts=3)
+        await store.save(1, "😎")
+
+        assert (await store.check(1, "⭐")).verdict == CaptchaVerdict.WRONG
+        result = await store.check(1, "😎")
+        assert (result.verdict, result.attempts) == (CaptchaVerdict.CORRECT, 2)
+        assert (await store.check(1, "😎")).verdict == CaptchaVerdict.EXPIRED
+
+    async def test_memory_expiry(self):
+        """Истёкшая капча не принимается."""
+        store = CaptchaStore(None, ttl=0, max_attempts=3)
+        await store.save(1, "😎")
+
+        assert (await store.check(1, "😎")).verdict == CaptchaVerdict.EXPIRED
+
+    async def test_lua_single_hash(self, redis):
+        """Капча — один hash с TTL, решённая удаляется."""
+        store = CaptchaStore(redis, ttl=300, max_attempts=3)
+        await store.save(1, "😎")
+
+        assert await redis.hgetall(store.key(1)) == {"answer": "😎", "attempts": "0"}
+        assert 0 < await redis.ttl(store.key(1)) <= 300
+
+        assert (await store.check(1, "😎")).verdict == CaptchaVerdict.CORRECT
+        assert not await redis.exists(store.key(1))
+
+    async def test_lua_concurrent_taps(self, redis):
+        """Параллельные нажатия не обходят лимит попыток и не считаются дважды."""
+        store = CaptchaStore(redis, ttl=300, max_attempts=3)
+        await store.save(1, "😎")
+
+        results = await asyncio.gather(*(store.check(1, "⭐") for _ in range(5)))
+        verdicts = [r.verdict for r in results]
+
+        assert sorted(r.attempts for r in results if r.attempts) == [1, 2, 3]
+        assert verdicts.count(CaptchaVerdict.EXHAUSTED) == 1
+        assert verdicts.count(CaptchaVerdict.EXPIRED) == 2
+
+    async def test_signed_attempts(self, redis):
+        """Stateless: ответ не хранится, Redis только считает попытки."""
+        store = CaptchaStore(redis, ttl=300, max_attempts=3, signer=CaptchaSigner("secret", ttl=300))
+        token = await store.save(1, "😎")
+
+        assert await redis.keys("captcha:state:*") == []
+        assert (await store.check_signed(1, token, "⭐")).verdict == CaptchaVerdict.WRONG
+        result = await store.check_signed(1, token, "😎")
+        assert (result.verdict, result.attempts) == (CaptchaVerdict.CORRECT, 2)
+        # Повторное нажатие верной кнопки не засчитывается второй раз
+        assert (await store.check_signed(1, token, "😎")).verdict == CaptchaVerdict.EXPIRED
+
+    async def test_signed_memory_fallback(self):
+        """Без Redis попытки stateless-капчи считаются в памяти."""
+        store = CaptchaStore(None, ttl=300, max_attempts=2, signer=CaptchaSigner("secret", ttl=300))
+        token = await store.save(1, "😎")
+
+        assert (await store.check_signed(1, token, "⭐")).verdict == CaptchaVerdict.WRONG
+        assert (await store.check_signed(1, token, "⭐")).verdict == CaptchaVerdict.EXHAUSTED
+        assert (await store.check_signed(1, token, "😎")).verdict == CaptchaVerdict.EXPIRED
+
+
+class TestMemoryCaptchaStore:
+
+    def test_lru_eviction(self):
+        """При переполнении вытесняется давно не использованная капча."""
+        memory = MemoryCaptchaStore(ttl=60, max_size=2)
+        memory.save(1, "a")
+        memory.save(2, "b")
+        memory.check(1, "x", max_attempts=3)  # 1 использована позже 2
+        memory.save(3, "c")
+
+        assert len(memory) == 2
+        assert 1 in memory and 3 in memory
+        assert 2 not in memory
+
+    def test_sweep(self):
+        """sweep() удаляет только истёкшие капчи."""
+        now = [0.0]
+        memory = MemoryCaptchaStore(ttl=10, clock=lambda: now[0])
+        memory.save(1, "a")
+        now[0] = 5.0
+        memory.save(2, "b")
+        now[0] = 12.0
+
+        assert memory.sweep() == 1
+        assert len(memory) == 1
+        assert memory.check(2, "b", max_attempts=3).verdict == CaptchaVerdict.CORRECT
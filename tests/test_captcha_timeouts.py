@@ -0,0 +1,41 @@
+# tests/test_captcha_timeouts.py
+
+import asyncio
+
+from app.services.captcha_timeouts import CaptchaTimeouts
+
+
+class TestCaptchaTimeouts:
+
+    async def test_expire_and_cancel(self):
+        """Истекают только неотменённые сроки, одной задачей."""
+        expired = []
+
+        async def on_expire(user_id):
+            expired.append(user_id)
+
+        timeouts = CaptchaTimeouts(0.05, on_expire)
+        timeouts.start()
+        for user_id in range(1000):
+            timeouts.schedule(user_id)
+        for user_id in range(0, 1000, 2):
+            assert timeouts.cancel(user_id)
+
+        await asyncio.sleep(0.2)
+        await timeouts.stop()
+
+        assert sorted(expired) == list(range(1, 1000, 2))
+        assert len(timeouts) == 0
+        assert not timeouts.cancel(1)
+
+    async def test_reschedule_moves_deadline(self):
+        """Повторная капча отсчитывает срок заново."""
+        timeouts = CaptchaTimeouts(0.05, on_expire=None)
+        timeouts.schedule(1)
+        timeouts.schedule(2)
+        await asyncio.sleep(0.03)
+        timeouts.schedule(1)
+        await asyncio.sleep(0.03)
+
+        assert timeouts.pop_expired() == [2]
+        assert 1 in timeouts
@@ -0,0 +1,71 @@
+# tests/test_helpers.py
+
+from datetime import date, datetime
+
+from app.utils.helpers import format_local_time, parse_date_range, parse_schedule_time
+
+NOW = datetime(2026, 10, 17, 12, 0)  # UTC
+
+
+class TestParseScheduleTime:
+
+    def test_relative(self):
+        """Относительное время: минуты, часы, дни."""
+        assert parse_schedule_time("30м", now=NOW) == datetime(2026, 10, 17, 12, 30)
+        assert parse_schedule_time("2h", now=NOW) == datetime(2026, 10, 17, 14, 0)
+        assert parse_schedule_time("1д", now=NOW) == datetime(2026, 10, 18, 12, 0)
+        assert parse_schedule_time("15 мин", now=NOW) == datetime(2026, 10, 17, 12, 15)
+        assert parse_schedule_time("15min", now=NOW) == datetime(2026, 10, 17, 12, 15)
+
+    def test_relative_unknown_unit(self):
+        """Незадокументированный суффикс не читается как минуты."""
+        assert parse_schedule_time("5 months", now=NOW) is None
+        assert parse_schedule_time("5 mo", now=NOW) is None
+        assert parse_schedule_time("5мес", now=NOW) is None
+
+    def test_time_of_day_rolls_over(self):
+        """ЧЧ:ММ в прошлом переносится на завтра."""
+        assert parse_schedule_time("13:15", now=NOW) == datetime(2026, 10, 17, 13, 15)
+        assert parse_schedule_time("03:30", now=NOW) == datetime(2026, 10, 18, 3, 30)
+
+    def test_date_without_year_rolls_over(self):
+        """ДД.ММ в прошлом переносится на следующий год."""
+        assert parse_schedule_time("20.10 10:00", now=NOW) == datetime(2026, 10, 20, 10, 0)
+        assert parse_schedule_time("05.01 10:00", now=datetime(2026, 12, 20, 12, 0)) == datetime(2027, 1, 5, 10, 0)
+        assert parse_schedule_time("17.10 11:00", now=NOW) == datetime(2027, 10, 17, 11, 0)
+
+    def test_timezone_converted_to_utc(self):
+        """Время в часовом поясе админа сохраняется в UTC."""
+        run_at = parse_schedule_time("25.12.2026 10:00", "Europe/Moscow", now=NOW)
+
+        assert run_at == datetime(2026, 12, 25, 7, 0)
+        assert format_local_time(run_at, "Europe/Moscow") == "25.12.2026 10:00"
+
+    def test_invalid_or_past(self):
+        """Нераспознанный ввод и прошедшее время отклоняются."""
+        assert parse_schedule_time("завтра", now=NOW) is None
+        assert parse_schedule_time("01.01.2026 10:00", now=NOW) is None
+        assert parse_schedule_time("0м", now=NOW) is None
+        assert parse_schedule_time("99999999999д", now=NOW) is None
+
+
+class TestParseDateRange:
+
+    def test_last_days(self):
+        """Число — последние N дней, включая сегодня."""
+        assert parse_date_range("7", today=NOW.date()) == (date(2026, 10, 11), date(2026, 10, 17))
+
+    def test_ranges(self):
+        """Закрытый и открытые диапазоны."""
+        assert parse_date_range("01.09.2026-30.09.2026") == (date(2026, 9, 1), date(2026, 9, 30))
+        assert parse_date_range("01.09.2026-") == (date(2026, 9, 1), None)
+        assert parse_date_range("- 30.09.2026") == (None, date(2026, 9, 30))
+
+    def test_invalid(self):
+        """Неверный формат и перевёрнутый диапазон."""
+        assert parse_date_range("вчера") is None
+        assert parse_date_range("9999999") is None
+        assert parse_date_range("99999999999") is None
+        assert parse_date_range("0") is None
+        assert parse_date_range("-") is None
+        assert parse_date_range("30.09.2026-01.09.2026") is None
@@ -0,0 +1,186 @@
+# tests/test_join_registry.py
+
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+from aiogram.exceptions import TelegramBadRequest, TelegramNetworkError, TelegramRetryAfter
+from sqlalchemy import select
+
+from app.bot.handlers.user.commands.join_requests import process_after_captcha
+from app.database import JoinRequest, PendingRequest, RequestStatus, crud, get_session
+from app.services.join_registry import JoinRequestCleaner
+
+
+class FakeBot:
+    """Записывает approve/decline; ошибки задаются по chat_id."""
+
+    def __init__(self, missing=(), broken=(), flooded=()):
+        self.approved = []
+        self.declined = []
+        self.messages = []
+        self.missing = set(missing)  # Заявки уже нет — BadRequest
+        self.broken = set(broken)  # Сетевая ошибка
+        self.flooded = set(flooded)  # Флуд-контроль не снимается
+
+    def _check(self, chat_id):
+        if chat_id in self.missing:
+            raise TelegramBadRequest(method=MagicMock(), message="HIDE_REQUESTER_MISSING")
+        if chat_id in self.broken:
+            raise TelegramNetworkError(method=MagicMock(), message="timeout")
+        if chat_id in self.flooded:
+            raise TelegramRetryAfter(method=MagicMock(), message="Too Many Requests", retry_after=0)
+
+    async def approve_chat_join_request(self, chat_id, user_id):
+        self._check(chat_id)
+        self.approved.append((chat_id, user_id))
+
+    async def decline_chat_join_request(self, chat_id, user_id):
+        self._check(chat_id)
+        self.declined.append((chat_id, user_id))
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.messages.append(chat_id)
+
+
+async def save(user_id: int, chat_id: int, age: timedelta = timedelta(0)) -> None:
+    async for session in get_session():
+        request = await crud.save_join_request(session, user_id, chat_id, username="user", first_name="Имя")
+        request.created_at = datetime.utcnow() - age
+
+
+async def registry() -> list:
+    async for session in get_session():
+        result = await session.execute(select(JoinRequest.user_id, JoinRequest.chat_id))
+        pairs = sorted(tuple(row) for row in result.all())
+    return pairs
+
+
+async def queue() -> list:
+    async for session in get_session():
+        result = await session.execute(select(PendingRequest).order_by(PendingRequest.id))
+        requests = [(request.chat_id, request.status) for request in result.scalars()]
+    return requests
+
+
+class TestJoinRegistry:
+
+    async def test_save_is_idempotent(self, db):
+        """Повторная заявка в тот же чат не дублируется."""
+        await save(7, -100)
+        await save(7, -100)
+        await save(7, -200)
+
+        assert await registry() == [(7, -200), (7, -100)]
+        async for session in get_session():
+            assert await crud.has_join_request(session, 7)
+            assert not await crud.has_join_request(session, 8)
+
+    async def test_pop_claims_once(self, db):
+        """Заявку забирает только первый pop — повторное завершение капчи её не найдёт."""
+        await save(7, -100)
+        await save(7, -200)
+        await save(8, -100)
+
+        async for session in get_session():
+            one_chat = await crud.pop_join_requests(session, 7, chat_id=-100)
+        async for session in get_session():
+            rest = await crud.pop_join_requests(session, 7)
+            again = await crud.pop_join_requests(session, 7)
+
+        assert [row.chat_id for row in one_chat] == [-100]
+        assert [(row.chat_id, row.first_name) for row in rest] == [(-200, "Имя")]
+        assert again == []
+        assert await registry() == [(8, -100)]
+
+    async def test_pop_expired_limited(self, db):
+        """Истёкшие заявки забираются пачкой не больше limit, старые первыми."""
+        await save(1, -100, age=timedelta(hours=3))
+        await save(2, -100, age=timedelta(hours=2))
+        await save(3, -100)
+
+        async for session in get_session():
+            expired = await crud.pop_expired_join_requests(
+                session, datetime.utcnow() - timedelta(hours=1), limit=1
+            )
+
+        assert [row.user_id for row in expired] == [1]
+        assert await registry() == [(2, -100), (3, -100)]
+
+
+class TestJoinRequestCleaner:
+
+    async def test_cleanup_declines_expired(self, db):
+        """Старше ttl — отклоняются в Telegram и удаляются, свежие остаются."""
+        for user_id in range(1, 6):
+            await save(user_id, -100, age=timedelta(hours=2))
+        await save(10, -100)
+        bot = FakeBot()
+        cleaner = JoinRequestCleaner(bot, ttl=timedelta(hours=1), batch_size=2)
+
+        assert await cleaner.cleanup() == 5
+
+        assert sorted(user_id for _, user_id in bot.declined) == [1, 2, 3, 4, 5]
+        assert await registry() == [(10, -100)]
+
+    async def test_cleanup_ignores_missing_requests(self, db):
+        """Заявки, которых уже нет в Telegram, просто удаляются."""
+        await save(1, -100, age=timedelta(hours=2))
+        bot = FakeBot(missing={-100})
+
+        assert await JoinRequestCleaner(bot, ttl=timedelta(hours=1)).cleanup() == 1
+        assert await registry() == []
+
+
+    async def test_cleanup_keeps_requests_on_transient_errors(self, db):
+        """Сбой сети или флуд-контроль: заявка возвращается в реестр, очистка идёт дальше."""
+        for chat_id in (-100, -200, -300, -400):
+            await save(1, chat_id, age=timedelta(hours=2))
+        bot = FakeBot(broken={-200}, flooded={-300})
+
+        assert await JoinRequestCleaner(bot, ttl=timedelta(hours=1), batch_size=2).cleanup() == 2
+
+        assert sorted(bot.declined) == [(-400, 1), (-100, 1)]
+        assert await registry() == [(1, -300), (1, -200)]
+
+class TestProcessAfterCaptcha:
+
+    async def test_failed_captcha_declines(self, db):
+        """Проваленная капча: заявки отклоняются, сбой сети возвращает заявку в реестр."""
+        await save(7, -100)
+        await save(7, -200)
+        await save(7, -300)
+        bot = FakeBot(missing={-200}, broken={-300})
+
+        await process_after_captcha(bot, 7, False)
+
+        assert bot.declined == [(-100, 7)]
+        # Её повторит очистка реестра
+        assert await registry() == [(7, -300)]
+        assert await queue() == []
+
+    async def test_passed_captcha_queued_for_admin(self, db, config):
+        """Автоприём выключен: заявки уходят в очередь администратору."""
+        config.auto_accept_default = False
+        await save(7, -100)
+        bot = FakeBot()
+
+        await process_after_captcha(bot, 7, True)
+
+        assert bot.approved == []
+        assert await queue() == [(-100, RequestStatus.PENDING)]
+        assert bot.messages == [7]
+        assert await registry() == []
+
+    async def test_passed_captcha_auto_accept(self, db, config):
+        """Автоприём: одобренные записываются APPROVED, при сбое сети — в очередь."""
+        config.auto_accept_default = True
+        await save(7, -100)
+        await save(7, -200)
+        await save(7, -300)
+        bot = FakeBot(missing={-200}, broken={-300})
+
+        await process_after_captcha(bot, 7, True)
+
+        assert bot.approved == [(-100, 7)]
+        assert await queue() == [(-100, RequestStatus.APPROVED), (-300, RequestStatus.PENDING)]
+        assert await registry() == []
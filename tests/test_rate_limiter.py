@@ -0,0 +1,93 @@
+# tests/test_rate_limiter.py
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+
+from app.services.rate_limiter import Priority, RateLimiter
+
+
+def retry_after(seconds: int) -> TelegramRetryAfter:
+    return TelegramRetryAfter(method=MagicMock(), message="Too Many Requests", retry_after=seconds)
+
+
+class TestRateLimiter:
+
+    async def test_global_rate(self):
+        """Глобальный лимит: после исчерпания burst отправки идут с частотой rate."""
+        limiter = RateLimiter(rate=50, per_chat_rate=0, burst=1)
+
+        start = time.monotonic()
+        for chat_id in range(6):
+            await limiter.acquire(chat_id)
+        elapsed = time.monotonic() - start
+
+        assert elapsed >= 5 / 50 * 0.9
+
+    async def test_per_chat_interval(self):
+        """Два сообщения в один чат разделены интервалом per_chat."""
+        limiter = RateLimiter(rate=1000, per_chat_rate=20)
+
+        start = time.monotonic()
+        await limiter.acquire(1)
+        await limiter.acquire(2)
+        fast = time.monotonic() - start
+        await limiter.acquire(1)
+        elapsed = time.monotonic() - start
+
+        assert fast < 0.04
+        assert elapsed >= 0.05 * 0.9
+
+    async def test_retry_after_freezes_bucket(self):
+        """RetryAfter замораживает все отправки и повторяет вызов."""
+        limiter = RateLimiter(rate=1000, per_chat_rate=0)
+        call = AsyncMock(side_effect=[retry_after(1), "ok"])
+
+        start = time.monotonic()
+        result = await limiter.send(1, call)
+
+        assert result == "ok"
+        assert call.await_count == 2
+        assert time.monotonic() - start >= 0.9
+
+    async def test_retry_after_gives_up(self):
+        """После max_retries ошибка пробрасывается наружу."""
+        limiter = RateLimiter(rate=1000, per_chat_rate=0, max_retries=0)
+        call = AsyncMock(side_effect=retry_after(0))
+
+        with pytest.raises(TelegramRetryAfter):
+            await limiter.send(1, call)
+
+    async def test_priority_order(self):
+        """Ожидающие получают токены по приоритету, а не по времени прихода."""
+        limiter = RateLimiter(rate=100, per_chat_rate=0, burst=1)
+        await limiter.acquire()  # bucket пуст
+        order = []
+
+        async def take(name: str, priority: Priority) -> None:
+            await limiter.acquire(priority=priority)
+            order.append(name)
+
+        bulk = [asyncio.create_task(take(f"bulk{i}", Priority.BULK)) for i in range(3)]
+        await asyncio.sleep(0)
+        captcha = asyncio.create_task(take("captcha", Priority.INTERACTIVE))
+        welcome = asyncio.create_task(take("welcome", Priority.NORMAL))
+
+        await asyncio.gather(*bulk, captcha, welcome)
+
+        assert order == ["captcha", "welcome", "bulk0", "bulk1", "bulk2"]
+
+    async def test_bulk_leaves_reserve(self):
+        """BULK не забирает резерв — капча получает токен без ожидания."""
+        limiter = RateLimiter(rate=10, per_chat_rate=0, burst=3, bulk_reserve=1)
+
+        await limiter.acquire(priority=Priority.BULK)
+        await limiter.acquire(priority=Priority.BULK)
+
+        start = time.monotonic()
+        await limiter.acquire(priority=Priority.INTERACTIVE)
+        assert time.monotonic() - start < 0.02
+
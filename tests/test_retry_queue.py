@@ -0,0 +1,49 @@
+# tests/test_retry_queue.py
+
+from app.services.retry_queue import RetryQueue
+
+
+class TestRetryQueue:
+
+    def test_backoff_grows_and_caps(self):
+        """Задержка удваивается с каждой попыткой и не превышает max_delay."""
+        queue = RetryQueue(max_attempts=10, base_delay=1.0, max_delay=8.0, rand=lambda: 1.0)
+
+        assert [queue.backoff(attempt) for attempt in range(1, 6)] == [1.0, 2.0, 4.0, 8.0, 8.0]
+
+    def test_jitter_bounds(self):
+        """Разброс — от половины до полной задержки."""
+        low = RetryQueue(max_attempts=3, base_delay=4.0, rand=lambda: 0.0)
+        high = RetryQueue(max_attempts=3, base_delay=4.0, rand=lambda: 0.999)
+
+        assert low.backoff(1) == 2.0
+        assert 3.99 < high.backoff(1) < 4.0
+
+    def test_attempts_capped(self):
+        """После max_attempts получатель в очередь не попадает."""
+        queue = RetryQueue(max_attempts=2)
+
+        assert queue.push("a", 1)
+        assert queue.push("a", 2)
+        assert not queue.push("a", 3)
+        assert len(queue) == 2
+
+    def test_order_and_drain(self):
+        """pop отдаёт ближайший повтор, drain — остаток с кодом ошибки."""
+        queue = RetryQueue(max_attempts=3, base_delay=1.0, rand=lambda: 0.0)
+        queue.push("late", 1, error_code=429, min_delay=10)
+        queue.push("soon", 1)
+
+        assert queue.delay() > 0
+        assert queue.pop() == ("soon", 1)
+        assert list(queue.drain()) == [("late", 429)]
+        assert len(queue) == 0
+
+    def test_pending_keeps_queue(self):
+        """pending отдаёт повторы с номером попытки по времени и не извлекает их."""
+        queue = RetryQueue(max_attempts=3, base_delay=1.0, rand=lambda: 0.0)
+        queue.push("late", 2, min_delay=10)
+        queue.push("soon", 1)
+
+        assert queue.pending() == [("soon", 1), ("late", 2)]
+        assert len(queue) == 2
@@ -0,0 +1,103 @@
+# tests/test_segments.py
+
+from datetime import date, datetime
+
+from app.database import BroadcastStatus, DeliveryStatus, RequestStatus, Segment, User, crud, get_session
+from app.database.models import CaptchaType
+
+
+async def seed() -> None:
+    """
+    Пять пользователей chat_id 1..5:
+    1 — март, с username, заявка PENDING, прошёл капчу, получил последнюю рассылку
+    2 — март, без username, заявка APPROVED
+    3 — апрель, с username, провалил капчу
+    4 — май, с username, недоступен
+    5 — май, пустой username
+    """
+    async for session in get_session():
+        session.add_all([
+            User(chat_id=1, username="one", registration_date="10.03.2026", registered_at=datetime(2026, 3, 10, 9)),
+            User(chat_id=2, registration_date="31.03.2026", registered_at=datetime(2026, 3, 31, 23)),
+            User(chat_id=3, username="three", registration_date="01.04.2026", registered_at=datetime(2026, 4, 1)),
+            User(chat_id=4, username="four", registration_date="01.05.2026", registered_at=datetime(2026, 5, 1),
+                 is_reachable=False),
+            User(chat_id=5, username="", registration_date="02.05.2026", registered_at=datetime(2026, 5, 2)),
+        ])
+
+        await crud.create_pending_request(session, user_id=1, chat_id=-100)
+        approved = await crud.create_pending_request(session, user_id=2, chat_id=-100)
+        await crud.update_request_status(session, approved.id, RequestStatus.APPROVED)
+
+        await crud.create_captcha_attempt(session, 1, 1, CaptchaType.EMOJI, is_successful=True)
+        await crud.create_captcha_attempt(session, 3, 3, CaptchaType.EMOJI, is_successful=False)
+
+        job = await crud.create_broadcast_job(session, 1, "старая рассылка")
+        await crud.update_broadcast_status(session, job.id, BroadcastStatus.COMPLETED)
+        await crud.add_broadcast_deliveries(session, [
+            {"job_id": job.id, "chat_id": 1, "status": DeliveryStatus.SENT},
+            {"job_id": job.id, "chat_id": 2, "status": DeliveryStatus.FAILED, "error_code": 400},
+        ])
+
+
+async def recipients(segment: Segment) -> list:
+    async for session in get_session():
+        rows = await crud.get_broadcast_recipients(session, segment=segment)
+        count = await crud.count_broadcast_recipients(session, segment=segment)
+    assert count == len(rows)
+    return [row.chat_id for row in rows]
+
+
+class TestSegmentQueries:
+
+    async def test_empty_segment_is_all_reachable(self, db):
+        """Пустой сегмент — все доступные пользователи."""
+        await seed()
+
+        assert await recipients(Segment()) == [1, 2, 3, 5]
+
+    async def test_registration_range_inclusive(self, db):
+        """Границы диапазона регистрации включаются целыми днями."""
+        await seed()
+
+        segment = Segment(registered_from=date(2026, 3, 10), registered_to=date(2026, 3, 31))
+        assert await recipients(segment) == [1, 2]
+        assert await recipients(Segment(registered_from=date(2026, 4, 1))) == [3, 5]
+
+    async def test_request_status_and_captcha(self, db):
+        """Заявка в статусе и успешная капча проверяются через EXISTS."""
+        await seed()
+
+        assert await recipients(Segment(request_status=RequestStatus.PENDING)) == [1]
+        assert await recipients(Segment(request_status=RequestStatus.APPROVED)) == [2]
+        assert await recipients(Segment(passed_captcha=True)) == [1]
+
+    async def test_skip_recent_and_username(self, db):
+        """Получившие последнюю рассылку и пользователи без username отсеиваются."""
+        await seed()
+
+        assert await recipients(Segment(skip_recent=1)) == [2, 3, 5]
+        assert await recipients(Segment(has_username=True)) == [1, 3]
+
+    async def test_conditions_combined(self, db):
+        """Условия сегмента объединяются через AND."""
+        await seed()
+
+        segment = Segment(registered_to=date(2026, 4, 30), has_username=True, skip_recent=1)
+        assert await recipients(segment) == [3]
+
+
+class TestSegmentSerialization:
+
+    def test_json_roundtrip(self):
+        """Сегмент переживает сохранение в broadcast_jobs.segment."""
+        segment = Segment(
+            registered_from=date(2026, 1, 1),
+            request_status=RequestStatus.APPROVED,
+            skip_recent=3,
+            has_username=True
+        )
+
+        assert Segment.from_json(segment.to_json()) == segment
+        assert Segment().to_json() is None
+        assert Segment.from_json(None).is_empty
@@ -0,0 +1,41 @@
+# tests/test_templates.py
+
+import pytest
+
+from app.utils.templates import MessageTemplate, TemplateError, user_template_values
+
+
+class TestMessageTemplate:
+
+    def test_render_placeholders(self):
+        """Подстановки заменяются, литеральный текст сохраняется."""
+        template = MessageTemplate("Привет, {name}! Ваш {username}, id {id}")
+
+        text = template.render(user_template_values(42, "durov", "Павел"))
+
+        assert text == "Привет, Павел! Ваш @durov, id 42"
+        assert template.fields == {"name", "username", "id"}
+
+    def test_values_are_html_escaped(self):
+        """Значения экранируются, разметка шаблона — нет."""
+        template = MessageTemplate("<b>{name}</b>")
+
+        assert template.render({"name": "<i>&</i>"}) == "<b>&lt;i&gt;&amp;&lt;/i&gt;</b>"
+
+    def test_unknown_placeholder(self):
+        """Неизвестная переменная — ошибка при компиляции."""
+        with pytest.raises(TemplateError):
+            MessageTemplate("Привет, {surname}")
+
+    def test_escaped_braces_and_static(self):
+        """{{ и }} дают литеральные скобки, шаблон без переменных статичен."""
+        template = MessageTemplate("JSON: {{\"a\": 1}}")
+
+        assert template.is_static
+        assert template.render({}) == "JSON: {\"a\": 1}"
+
+    def test_missing_username_falls_back_to_name(self):
+        """Без username подставляется имя."""
+        template = MessageTemplate("{username}")
+
+        assert template.render(user_template_values(1)) == "Пользователь"